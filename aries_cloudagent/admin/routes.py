@@ -19,6 +19,9 @@ from ..messaging.credential_definitions.routes import (
 )
 from ..messaging.basicmessage.routes import register as register_basicmessages
 from ..messaging.discovery.routes import register as register_discovery
+from ..messaging.federatedlearningmessage.routes import (
+    register as register_federatedlearningmessages
+)
 from ..messaging.trustping.routes import register as register_trustping
 from ..wallet.routes import register as register_wallet
 from ..ledger.routes import register as register_ledger
@@ -39,6 +42,7 @@ async def register_module_routes(app: web.Application):
     await register_schemas(app)
     await register_credential_definitions(app)
     await register_basicmessages(app)
+    await register_federatedlearningmessages(app)
     await register_discovery(app)
     await register_trustping(app)
     await register_v10_issue_credential(app)
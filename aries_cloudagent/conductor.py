@@ -79,7 +79,9 @@ class Conductor:
             self.undelivered_queue = DeliveryQueue()
 
         # Register all inbound transports
-        self.inbound_transport_manager = InboundTransportManager()
+        self.inbound_transport_manager = InboundTransportManager(
+            context.settings.get("fl.model_dir")
+        )
         inbound_transports = context.settings.get("transport.inbound_configs") or []
         for transport in inbound_transports:
             try:
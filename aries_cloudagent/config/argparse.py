@@ -510,6 +510,22 @@ class ProtocolGroup(ArgumentGroup):
             action="store_true",
             help="Include timing information in response messages.",
         )
+        parser.add_argument(
+            "--fl-model-dir",
+            type=str,
+            metavar="<path>",
+            help="Directory in which to store federated learning model files\
+            exchanged with other agents. The HTTP inbound transport serves\
+            these files by sha256 hash at /blobs/<sha256>. Default: a directory\
+            under the system temporary directory.",
+        )
+        parser.add_argument(
+            "--fl-max-model-size",
+            type=int,
+            metavar="<bytes>",
+            help="Largest federated learning model, in bytes, to receive from\
+            another agent, whether sent in chunks or by link. Default: 1 GiB.",
+        )
 
     def get_settings(self, args: Namespace) -> dict:
         """Get protocol settings."""
@@ -524,6 +540,12 @@ class ProtocolGroup(ArgumentGroup):
             settings["public_invites"] = True
         if args.timing:
             settings["timing.enabled"] = True
+        if args.fl_model_dir:
+            settings["fl.model_dir"] = args.fl_model_dir
+        if args.fl_max_model_size is not None:
+            if args.fl_max_model_size <= 0:
+                raise ArgsParseError("--fl-max-model-size must be positive")
+            settings["fl.max_model_size"] = args.fl_max_model_size
         return settings
 
 
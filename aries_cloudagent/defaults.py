@@ -9,6 +9,9 @@ from .messaging.actionmenu.message_types import (
 from .messaging.basicmessage.message_types import MESSAGE_TYPES as BASICMESSAGE_MESSAGES
 from .messaging.connections.message_types import MESSAGE_TYPES as CONNECTION_MESSAGES
 from .messaging.discovery.message_types import MESSAGE_TYPES as DISCOVERY_MESSAGES
+from .messaging.federatedlearningmessage.message_types import (
+    MESSAGE_TYPES as FEDERATEDLEARNING_MESSAGES,
+)
 from .messaging.introduction.message_types import MESSAGE_TYPES as INTRODUCTION_MESSAGES
 from .messaging.presentations.message_types import (
     MESSAGE_TYPES as PRESENTATION_MESSAGES,
@@ -38,6 +41,7 @@ def default_protocol_registry() -> ProtocolRegistry:
         BASICMESSAGE_MESSAGES,
         CONNECTION_MESSAGES,
         DISCOVERY_MESSAGES,
+        FEDERATEDLEARNING_MESSAGES,
         INTRODUCTION_MESSAGES,
         PRESENTATION_MESSAGES,
         V10_PRESENT_PROOF_MESSAGES,
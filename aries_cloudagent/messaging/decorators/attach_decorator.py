@@ -6,6 +6,7 @@ An attach decorator embeds content or specifies appended content.
 
 
 import base64
+import hashlib
 import json
 
 from typing import Union
@@ -38,13 +39,15 @@ class AttachDecoratorData(BaseModel):
 
             - `base64_`
             - `json_`
-            - `links_` and optionally `sha256_`.
+            - `links_`
+
+        and optionally `sha256_`.
 
         Args:
             base64_: base64 encoded content for inclusion.
             json_: json-dumped content for inclusion.
             links_: list or single URL of hyperlinks.
-            sha256_: sha-256 hash for URL content, if `links_` specified.
+            sha256_: sha-256 hash of the (decoded or linked) content.
 
         """
         if base64_:
@@ -54,8 +57,8 @@ class AttachDecoratorData(BaseModel):
         else:
             assert isinstance(links_, (str, list))
             self.links_ = [links_] if isinstance(links_, str) else list(links_)
-            if sha256_:
-                self.sha256_ = sha256_
+        if sha256_:
+            self.sha256_ = sha256_
 
     @property
     def base64(self):
@@ -117,7 +120,7 @@ class AttachDecoratorDataSchema(BaseModelSchema):
         data_key="links"
     )
     sha256_ = fields.Str(
-        description="SHA256 hash of linked data",
+        description="SHA256 hash of attached or linked data",
         required=False,
         attribute="sha256_",
         data_key="sha256",
@@ -199,6 +202,73 @@ class AttachDecorator(BaseModel):
             )
         )
 
+    @property
+    def binary(self) -> bytes:
+        """
+        Return binary content embedded in attachment.
+
+        Returns: bytes decoded from base64 data attachment
+
+        """
+        assert hasattr(self.data, "base64_")
+        return base64.b64decode(self.data.base64_.encode())
+
+    @classmethod
+    def from_binary(
+        cls,
+        content: bytes,
+        *,
+        mime_type: str = "application/octet-stream",
+        filename: str = None,
+    ):
+        """
+        Create `AttachDecorator` instance from binary content.
+
+        Base64-encode the content once, embed it as data and record its
+        byte count and sha-256 hash for the recipient to check.
+
+        Args:
+            content: raw bytes to attach
+            mime_type: MIME type of the content
+            filename: optional file name hint
+        """
+        return AttachDecorator(
+            mime_type=mime_type,
+            filename=filename,
+            byte_count=len(content),
+            data=AttachDecoratorData(
+                base64_=base64.b64encode(content).decode(),
+                sha256_=hashlib.sha256(content).hexdigest(),
+            )
+        )
+
+    @classmethod
+    def from_link(
+        cls,
+        links: Union[list, str],
+        sha256: str,
+        *,
+        mime_type: str = "application/octet-stream",
+        filename: str = None,
+        byte_count: int = None,
+    ):
+        """
+        Create `AttachDecorator` instance referring to content by hyperlink.
+
+        Args:
+            links: URL or list of URLs from which to fetch the content
+            sha256: sha-256 hash of the content, for the recipient to check
+            mime_type: MIME type of the content
+            filename: optional file name hint
+            byte_count: optional size of the content in bytes
+        """
+        return AttachDecorator(
+            mime_type=mime_type,
+            filename=filename,
+            byte_count=byte_count,
+            data=AttachDecoratorData(links_=links, sha256_=sha256),
+        )
+
 
 class AttachDecoratorSchema(BaseModelSchema):
     """Attach decorator schema used in serialization/deserialization."""
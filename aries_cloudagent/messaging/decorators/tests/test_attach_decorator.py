@@ -2,6 +2,7 @@ from datetime import datetime, timezone
 from unittest import TestCase
 
 import base64
+import hashlib
 import json
 
 from ..attach_decorator import AttachDecorator, AttachDecoratorData
@@ -164,6 +165,31 @@ class TestAttachDecorator(TestCase):
         assert loaded.description == self.description
         assert loaded.data == self.data_links
 
+    def test_binary(self):
+        content = b"\x00\x01binary content\xff"
+        deco_bin = AttachDecorator.from_binary(content, filename="model.pt")
+        assert deco_bin.mime_type == "application/octet-stream"
+        assert deco_bin.byte_count == len(content)
+        assert deco_bin.binary == content
+        assert deco_bin.data.sha256 == hashlib.sha256(content).hexdigest()
+
+        loaded = AttachDecorator.deserialize(deco_bin.serialize())
+        assert loaded.binary == content
+        assert loaded.data == deco_bin.data
+
+    def test_link(self):
+        sha256 = hashlib.sha256(b"model").hexdigest()
+        deco_link = AttachDecorator.from_link(
+            f"http://localhost:8020/blobs/{sha256}", sha256, byte_count=5
+        )
+        assert deco_link.data.links == [f"http://localhost:8020/blobs/{sha256}"]
+        assert deco_link.data.sha256 == sha256
+        assert not hasattr(deco_link.data, "base64_")
+
+        loaded = AttachDecorator.deserialize(deco_link.serialize())
+        assert loaded.data == deco_link.data
+        assert loaded.byte_count == 5
+
     def test_indy_dict(self):
         deco_indy = AttachDecorator.from_indy_dict(self.indy_cred)
         assert deco_indy.mime_type == 'application/json'
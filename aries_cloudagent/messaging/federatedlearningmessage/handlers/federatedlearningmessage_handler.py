@@ -1,8 +1,18 @@
 """FederatedLearning message handler."""
 
-from ...base_handler import BaseHandler, BaseResponder, RequestContext
+import base64
+import hashlib
+
+from ...base_handler import (
+    BaseHandler,
+    BaseResponder,
+    HandlerException,
+    RequestContext,
+)
 from ...connections.manager import ConnectionManager
+from ...decorators.attach_decorator import AttachDecorator
 
+from ..manager import ModelTransferManager, ModelTransferManagerError
 from ..messages.federatedlearningmessage import FederatedLearningMessage
 
 
@@ -17,16 +27,45 @@ class FederatedLearningMessageHandler(BaseHandler):
             context: request context
             responder: responder callback
         """
-        self._logger.debug(f"FederatedLearningMessageHandler called with context {context}")
+        self._logger.debug(
+            f"FederatedLearningMessageHandler called with context {context}"
+        )
         assert isinstance(context.message, FederatedLearningMessage)
 
-        self._logger.info("Received federated learnning message: %s", context.message.content)
+        self._logger.info(
+            "Received federated learning message: %s", context.message.content
+        )
 
-        body = context.message.content
+        body = context.message.content or ""
         meta = {"content": body}
+        webhook = {
+            "connection_id": context.connection_record.connection_id,
+            "message_id": context.message._id,
+            "content": body,
+            "state": "received",
+        }
+
+        linked = None
+        if context.message.model_attach:
+            attach = context.message.model_attach[0]
+            if attach.data.links:
+                if not attach.data.sha256:
+                    raise HandlerException("Linked model attachment has no sha256")
+                linked = attach
+            else:
+                # Pass the attached model through as received: the controller
+                # decodes the base64 once, with no re-encoding in the agent
+                if attach.data.sha256:
+                    model = base64.b64decode(attach.data.base64)
+                    if hashlib.sha256(model).hexdigest() != attach.data.sha256:
+                        raise HandlerException("Model attachment failed sha256 check")
+                webhook["model"] = attach.data.base64
+            meta["model_sha256"] = attach.data.sha256
+            webhook["model_sha256"] = attach.data.sha256
+            webhook["mime_type"] = attach.mime_type
 
         # For Workshop: mark invitations as copyable
-        if context.message.content and context.message.content.startswith("http"):
+        if body.startswith("http"):
             meta["copy_invite"] = True
 
         conn_mgr = ConnectionManager(context)
@@ -37,15 +76,13 @@ class FederatedLearningMessageHandler(BaseHandler):
             meta,
         )
 
-        await responder.send_webhook(
-            "federeatedlearningmessages",
-            {
-                "connection_id": context.connection_record.connection_id,
-                "message_id": context.message._id,
-                "content": body,
-                "state": "received"
-            },
-        )
+        if linked:
+            # Download in the background: the sender's delivery waits on this handler
+            ModelTransferManager.fetch_in_background(
+                self.fetch_linked_model(context, responder, linked, webhook)
+            )
+        else:
+            await responder.send_webhook("federatedlearningmessages", webhook)
 
         reply = None
         if context.settings.get("debug.auto_respond_messages"):
@@ -53,7 +90,7 @@ class FederatedLearningMessageHandler(BaseHandler):
                 "received your message" not in body
                 and "received your invitation" not in body
             ):
-                if context.message.content.startswith("http"):
+                if body.startswith("http"):
                     reply = f"{context.default_label} received your invitation"
                 else:
                     reply = f"{context.default_label} received your message"
@@ -71,3 +108,26 @@ class FederatedLearningMessageHandler(BaseHandler):
                 context.connection_record.DIRECTION_SENT,
                 {"content": reply},
             )
+
+    async def fetch_linked_model(
+        self,
+        context: RequestContext,
+        responder: BaseResponder,
+        attach: AttachDecorator,
+        webhook: dict,
+    ):
+        """
+        Fetch a linked model into the model store, then notify the controller.
+
+        Args:
+            context: request context
+            responder: responder callback
+            attach: attachment decorator linking to the model
+            webhook: webhook payload to send once the model is stored
+        """
+        try:
+            await ModelTransferManager(context).fetch_model(attach)
+        except ModelTransferManagerError:
+            self._logger.exception("Error fetching linked model")
+            webhook["state"] = "fetch_failed"
+        await responder.send_webhook("federatedlearningmessages", webhook)
@@ -0,0 +1,80 @@
+"""FL evaluation request handler."""
+
+from ...base_handler import (
+    BaseHandler,
+    BaseResponder,
+    HandlerException,
+    RequestContext,
+)
+from ...decorators.attach_decorator import AttachDecorator
+
+from ..manager import ModelTransferManager, ModelTransferManagerError
+from ..messages.fl_evaluation_request import FLEvaluationRequest
+
+
+class FLEvaluationRequestHandler(BaseHandler):
+    """Message handler class for FL evaluation requests."""
+
+    async def handle(self, context: RequestContext, responder: BaseResponder):
+        """
+        Message handler logic for FL evaluation requests.
+
+        Args:
+            context: request context
+            responder: responder callback
+        """
+        self._logger.debug(
+            f"FLEvaluationRequestHandler called with context {context}"
+        )
+        assert isinstance(context.message, FLEvaluationRequest)
+        self._logger.info(
+            "Received FL evaluation request for model %s",
+            context.message.model_sha256,
+        )
+
+        if not context.connection_ready:
+            raise HandlerException("No connection established for FL evaluation")
+
+        webhook = {
+            "connection_id": context.connection_record.connection_id,
+            "thread_id": context.message._thread_id,
+            "model_sha256": context.message.model_sha256,
+            "job_id": context.message.job_id,
+            "round_number": context.message.round_number,
+            "content": context.message.content,
+            "state": "received",
+        }
+
+        if context.message.model_attach:
+            attach = context.message.model_attach[0]
+            if attach.data.sha256 != context.message.model_sha256:
+                raise HandlerException("Linked model does not match the model_sha256")
+            # A model already in the store is not downloaded again
+            ModelTransferManager.fetch_in_background(
+                self.fetch_linked_model(context, responder, attach, webhook)
+            )
+        else:
+            await responder.send_webhook("fl_evaluation_requests", webhook)
+
+    async def fetch_linked_model(
+        self,
+        context: RequestContext,
+        responder: BaseResponder,
+        attach: AttachDecorator,
+        webhook: dict,
+    ):
+        """
+        Fetch the linked model into the model store, then notify the controller.
+
+        Args:
+            context: request context
+            responder: responder callback
+            attach: attachment decorator linking to the model
+            webhook: webhook payload to send once the model is stored
+        """
+        try:
+            await ModelTransferManager(context).fetch_model(attach)
+        except ModelTransferManagerError:
+            self._logger.exception("Error fetching linked model")
+            webhook["state"] = "fetch_failed"
+        await responder.send_webhook("fl_evaluation_requests", webhook)
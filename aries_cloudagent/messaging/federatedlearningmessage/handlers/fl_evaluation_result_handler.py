@@ -0,0 +1,43 @@
+"""FL evaluation result handler."""
+
+from ...base_handler import (
+    BaseHandler,
+    BaseResponder,
+    HandlerException,
+    RequestContext,
+)
+
+from ..messages.fl_evaluation_result import FLEvaluationResult
+
+
+class FLEvaluationResultHandler(BaseHandler):
+    """Message handler class for FL evaluation results."""
+
+    async def handle(self, context: RequestContext, responder: BaseResponder):
+        """
+        Message handler logic for FL evaluation results.
+
+        Args:
+            context: request context
+            responder: responder callback
+        """
+        self._logger.debug(f"FLEvaluationResultHandler called with context {context}")
+        assert isinstance(context.message, FLEvaluationResult)
+        self._logger.info(
+            "Received FL evaluation result for model %s",
+            context.message.model_sha256,
+        )
+
+        if not context.connection_ready:
+            raise HandlerException("No connection established for FL evaluation")
+
+        await responder.send_webhook(
+            "fl_evaluation_results",
+            {
+                "connection_id": context.connection_record.connection_id,
+                "thread_id": context.message._thread_id,
+                "model_sha256": context.message.model_sha256,
+                "metrics": context.message.metrics,
+                "error": context.message.error,
+            },
+        )
@@ -0,0 +1,39 @@
+"""Model chunk ack handler."""
+
+from ...base_handler import (
+    BaseHandler,
+    BaseResponder,
+    HandlerException,
+    RequestContext,
+)
+
+from ..manager import ModelTransferManager
+from ..messages.model_chunk_ack import ModelChunkAck
+
+
+class ModelChunkAckHandler(BaseHandler):
+    """Message handler class for model chunk acks."""
+
+    async def handle(self, context: RequestContext, responder: BaseResponder):
+        """
+        Message handler logic for model chunk acks.
+
+        Args:
+            context: request context
+            responder: responder callback
+        """
+        self._logger.debug(f"ModelChunkAckHandler called with context {context}")
+        assert isinstance(context.message, ModelChunkAck)
+        self._logger.info(
+            "Received model chunk ack: complete=%s, missing=%s",
+            context.message.complete,
+            context.message.missing,
+        )
+
+        if not context.connection_ready:
+            raise HandlerException("No connection established for model transfer")
+
+        transfer_mgr = ModelTransferManager(context)
+        _, chunks = await transfer_mgr.receive_ack()
+        for chunk in chunks:
+            await responder.send_reply(chunk)
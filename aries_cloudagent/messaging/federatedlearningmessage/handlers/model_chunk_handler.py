@@ -0,0 +1,34 @@
+"""Model chunk handler."""
+
+from ...base_handler import (
+    BaseHandler,
+    BaseResponder,
+    HandlerException,
+    RequestContext,
+)
+
+from ..manager import ModelTransferManager
+from ..messages.model_chunk import ModelChunk
+
+
+class ModelChunkHandler(BaseHandler):
+    """Message handler class for model chunks."""
+
+    async def handle(self, context: RequestContext, responder: BaseResponder):
+        """
+        Message handler logic for model chunks.
+
+        Args:
+            context: request context
+            responder: responder callback
+        """
+        self._logger.debug(f"ModelChunkHandler called with context {context}")
+        assert isinstance(context.message, ModelChunk)
+
+        if not context.connection_ready:
+            raise HandlerException("No connection established for model transfer")
+
+        transfer_mgr = ModelTransferManager(context)
+        _, ack = await transfer_mgr.receive_chunk()
+        if ack:
+            await responder.send_reply(ack)
@@ -0,0 +1,38 @@
+"""Model chunk manifest handler."""
+
+from ...base_handler import (
+    BaseHandler,
+    BaseResponder,
+    HandlerException,
+    RequestContext,
+)
+
+from ..manager import ModelTransferManager
+from ..messages.model_chunk_manifest import ModelChunkManifest
+
+
+class ModelChunkManifestHandler(BaseHandler):
+    """Message handler class for model chunk manifests."""
+
+    async def handle(self, context: RequestContext, responder: BaseResponder):
+        """
+        Message handler logic for model chunk manifests.
+
+        Args:
+            context: request context
+            responder: responder callback
+        """
+        self._logger.debug(f"ModelChunkManifestHandler called with context {context}")
+        assert isinstance(context.message, ModelChunkManifest)
+        self._logger.info(
+            "Received model chunk manifest: %s (%s bytes)",
+            context.message.sha256,
+            context.message.total_size,
+        )
+
+        if not context.connection_ready:
+            raise HandlerException("No connection established for model transfer")
+
+        transfer_mgr = ModelTransferManager(context)
+        _, ack = await transfer_mgr.receive_manifest()
+        await responder.send_reply(ack)
@@ -0,0 +1,118 @@
+import asyncio
+import hashlib
+
+import pytest
+from asynctest import mock as async_mock
+
+from ....base_handler import HandlerException
+from ....decorators.attach_decorator import AttachDecorator
+from ....request_context import RequestContext
+from ....responder import MockResponder
+
+from ...handlers import federatedlearningmessage_handler as handler
+from ...manager import ModelTransferManager
+from ...messages.federatedlearningmessage import FederatedLearningMessage
+
+TEST_MODEL = b"\x80\x02model-bytes"
+
+
+@pytest.fixture()
+def request_context() -> RequestContext:
+    ctx = RequestContext()
+    ctx.connection_record = async_mock.MagicMock(connection_id="dummy")
+    yield ctx
+
+
+class TestFederatedLearningMessageHandler:
+    @pytest.mark.asyncio
+    @async_mock.patch.object(handler, "ConnectionManager")
+    async def test_called(self, mock_conn_mgr, request_context):
+        mock_conn_mgr.return_value.log_activity = async_mock.CoroutineMock()
+        request_context.message = FederatedLearningMessage(
+            content="hello", model_attach=[AttachDecorator.from_binary(TEST_MODEL)]
+        )
+        handler_inst = handler.FederatedLearningMessageHandler()
+        responder = MockResponder()
+        await handler_inst.handle(request_context, responder)
+
+        assert len(responder.webhooks) == 1
+        topic, payload = responder.webhooks[0]
+        assert topic == "federatedlearningmessages"
+        assert payload["content"] == "hello"
+        assert payload["model"] == request_context.message.model_attach[0].data.base64
+        assert payload["model_sha256"] == (
+            request_context.message.model_attach[0].data.sha256
+        )
+        assert not responder.messages
+
+    @pytest.mark.asyncio
+    @async_mock.patch.object(handler, "ConnectionManager")
+    async def test_no_model(self, mock_conn_mgr, request_context):
+        mock_conn_mgr.return_value.log_activity = async_mock.CoroutineMock()
+        request_context.message = FederatedLearningMessage(content="hello")
+        handler_inst = handler.FederatedLearningMessageHandler()
+        responder = MockResponder()
+        await handler_inst.handle(request_context, responder)
+
+        topic, payload = responder.webhooks[0]
+        assert "model" not in payload
+
+    @pytest.mark.asyncio
+    @async_mock.patch.object(handler, "ConnectionManager")
+    async def test_bad_sha256(self, mock_conn_mgr, request_context):
+        mock_conn_mgr.return_value.log_activity = async_mock.CoroutineMock()
+        attach = AttachDecorator.from_binary(TEST_MODEL)
+        attach.data.sha256_ = "0" * 64
+        request_context.message = FederatedLearningMessage(model_attach=[attach])
+        handler_inst = handler.FederatedLearningMessageHandler()
+        responder = MockResponder()
+        with pytest.raises(HandlerException):
+            await handler_inst.handle(request_context, responder)
+        assert not responder.webhooks
+
+    @pytest.mark.asyncio
+    @async_mock.patch.object(handler, "ModelTransferManager")
+    @async_mock.patch.object(handler, "ConnectionManager")
+    async def test_linked_model(self, mock_conn_mgr, mock_transfer_mgr, request_context):
+        mock_conn_mgr.return_value.log_activity = async_mock.CoroutineMock()
+        mock_transfer_mgr.fetch_in_background = (
+            ModelTransferManager.fetch_in_background
+        )
+        mock_transfer_mgr.return_value.fetch_model = async_mock.CoroutineMock()
+        sha256 = hashlib.sha256(TEST_MODEL).hexdigest()
+        attach = AttachDecorator.from_link(f"http://localhost/blobs/{sha256}", sha256)
+        request_context.message = FederatedLearningMessage(model_attach=[attach])
+        handler_inst = handler.FederatedLearningMessageHandler()
+        responder = MockResponder()
+        await handler_inst.handle(request_context, responder)
+        await asyncio.sleep(0.01)
+
+        mock_transfer_mgr.return_value.fetch_model.assert_called_once_with(attach)
+        topic, payload = responder.webhooks[0]
+        assert payload["state"] == "received"
+        assert payload["model_sha256"] == sha256
+        assert "model" not in payload
+
+    @pytest.mark.asyncio
+    @async_mock.patch.object(handler, "ModelTransferManager")
+    @async_mock.patch.object(handler, "ConnectionManager")
+    async def test_linked_model_fetch_failed(
+        self, mock_conn_mgr, mock_transfer_mgr, request_context
+    ):
+        mock_conn_mgr.return_value.log_activity = async_mock.CoroutineMock()
+        mock_transfer_mgr.fetch_in_background = (
+            ModelTransferManager.fetch_in_background
+        )
+        mock_transfer_mgr.return_value.fetch_model = async_mock.CoroutineMock(
+            side_effect=handler.ModelTransferManagerError()
+        )
+        sha256 = hashlib.sha256(TEST_MODEL).hexdigest()
+        attach = AttachDecorator.from_link(f"http://localhost/blobs/{sha256}", sha256)
+        request_context.message = FederatedLearningMessage(model_attach=[attach])
+        handler_inst = handler.FederatedLearningMessageHandler()
+        responder = MockResponder()
+        await handler_inst.handle(request_context, responder)
+        await asyncio.sleep(0.01)
+
+        topic, payload = responder.webhooks[0]
+        assert payload["state"] == "fetch_failed"
@@ -0,0 +1,113 @@
+import asyncio
+
+import pytest
+from asynctest import mock as async_mock
+
+from ....base_handler import HandlerException
+from ....decorators.attach_decorator import AttachDecorator
+from ....request_context import RequestContext
+from ....responder import MockResponder
+
+from ...handlers import fl_evaluation_request_handler, fl_evaluation_result_handler
+from ...manager import ModelTransferManager
+from ...messages.fl_evaluation_request import FLEvaluationRequest
+from ...messages.fl_evaluation_result import FLEvaluationResult
+
+
+@pytest.fixture()
+def request_context() -> RequestContext:
+    ctx = RequestContext()
+    ctx.connection_record = async_mock.MagicMock(connection_id="dummy")
+    ctx.connection_ready = True
+    yield ctx
+
+
+class TestFLEvaluationHandlers:
+    @pytest.mark.asyncio
+    async def test_request_held_model(self, request_context):
+        request_context.message = FLEvaluationRequest(
+            model_sha256="a" * 64, job_id="job-id", round_number=2
+        )
+        handler_inst = fl_evaluation_request_handler.FLEvaluationRequestHandler()
+        responder = MockResponder()
+        await handler_inst.handle(request_context, responder)
+
+        topic, payload = responder.webhooks[0]
+        assert topic == "fl_evaluation_requests"
+        assert payload["state"] == "received"
+        assert payload["thread_id"] == request_context.message._id
+        assert payload["round_number"] == 2
+
+    @pytest.mark.asyncio
+    @async_mock.patch.object(fl_evaluation_request_handler, "ModelTransferManager")
+    async def test_request_linked_model(self, mock_transfer_mgr, request_context):
+        mock_transfer_mgr.fetch_in_background = (
+            ModelTransferManager.fetch_in_background
+        )
+        mock_transfer_mgr.return_value.fetch_model = async_mock.CoroutineMock()
+        attach = AttachDecorator.from_link("http://localhost/blobs/x", "a" * 64)
+        request_context.message = FLEvaluationRequest(
+            model_sha256="a" * 64, model_attach=[attach]
+        )
+        handler_inst = fl_evaluation_request_handler.FLEvaluationRequestHandler()
+        responder = MockResponder()
+        await handler_inst.handle(request_context, responder)
+        await asyncio.sleep(0.01)
+
+        mock_transfer_mgr.return_value.fetch_model.assert_called_once_with(attach)
+        topic, payload = responder.webhooks[0]
+        assert payload["state"] == "received"
+
+    @pytest.mark.asyncio
+    @async_mock.patch.object(fl_evaluation_request_handler, "ModelTransferManager")
+    async def test_request_fetch_failed(self, mock_transfer_mgr, request_context):
+        mock_transfer_mgr.fetch_in_background = (
+            ModelTransferManager.fetch_in_background
+        )
+        mock_transfer_mgr.return_value.fetch_model = async_mock.CoroutineMock(
+            side_effect=fl_evaluation_request_handler.ModelTransferManagerError()
+        )
+        attach = AttachDecorator.from_link("http://localhost/blobs/x", "a" * 64)
+        request_context.message = FLEvaluationRequest(
+            model_sha256="a" * 64, model_attach=[attach]
+        )
+        handler_inst = fl_evaluation_request_handler.FLEvaluationRequestHandler()
+        responder = MockResponder()
+        await handler_inst.handle(request_context, responder)
+        await asyncio.sleep(0.01)
+
+        topic, payload = responder.webhooks[0]
+        assert payload["state"] == "fetch_failed"
+
+    @pytest.mark.asyncio
+    async def test_request_hash_mismatch(self, request_context):
+        attach = AttachDecorator.from_link("http://localhost/blobs/x", "b" * 64)
+        request_context.message = FLEvaluationRequest(
+            model_sha256="a" * 64, model_attach=[attach]
+        )
+        handler_inst = fl_evaluation_request_handler.FLEvaluationRequestHandler()
+        with pytest.raises(HandlerException):
+            await handler_inst.handle(request_context, MockResponder())
+
+    @pytest.mark.asyncio
+    async def test_result(self, request_context):
+        request_context.message = FLEvaluationResult(
+            model_sha256="a" * 64, metrics={"samples": 10}
+        )
+        request_context.message.assign_thread_id("request-id")
+        handler_inst = fl_evaluation_result_handler.FLEvaluationResultHandler()
+        responder = MockResponder()
+        await handler_inst.handle(request_context, responder)
+
+        topic, payload = responder.webhooks[0]
+        assert topic == "fl_evaluation_results"
+        assert payload["thread_id"] == "request-id"
+        assert payload["metrics"] == {"samples": 10}
+
+    @pytest.mark.asyncio
+    async def test_result_no_connection(self, request_context):
+        request_context.connection_ready = False
+        request_context.message = FLEvaluationResult(model_sha256="a" * 64)
+        handler_inst = fl_evaluation_result_handler.FLEvaluationResultHandler()
+        with pytest.raises(HandlerException):
+            await handler_inst.handle(request_context, MockResponder())
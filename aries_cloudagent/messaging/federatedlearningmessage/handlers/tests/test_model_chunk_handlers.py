@@ -0,0 +1,56 @@
+import pytest
+from asynctest import mock as async_mock
+
+from ....base_handler import HandlerException
+from ....request_context import RequestContext
+from ....responder import MockResponder
+
+from ...handlers import model_chunk_ack_handler, model_chunk_manifest_handler
+from ...messages.model_chunk_ack import ModelChunkAck
+from ...messages.model_chunk_manifest import ModelChunkManifest
+
+
+@pytest.fixture()
+def request_context() -> RequestContext:
+    ctx = RequestContext()
+    ctx.connection_record = async_mock.MagicMock(connection_id="dummy")
+    ctx.connection_ready = True
+    yield ctx
+
+
+class TestModelChunkHandlers:
+    @pytest.mark.asyncio
+    @async_mock.patch.object(model_chunk_manifest_handler, "ModelTransferManager")
+    async def test_manifest(self, mock_transfer_mgr, request_context):
+        mock_transfer_mgr.return_value.receive_manifest = async_mock.CoroutineMock(
+            return_value=("transfer", "ack")
+        )
+        request_context.message = ModelChunkManifest(
+            sha256="a" * 64, total_size=1, chunk_size=1, chunk_hashes=["b" * 64]
+        )
+        handler_inst = model_chunk_manifest_handler.ModelChunkManifestHandler()
+        responder = MockResponder()
+        await handler_inst.handle(request_context, responder)
+
+        assert responder.messages == [("ack", {})]
+
+    @pytest.mark.asyncio
+    async def test_manifest_no_connection(self, request_context):
+        request_context.connection_ready = False
+        request_context.message = ModelChunkManifest(sha256="a" * 64)
+        handler_inst = model_chunk_manifest_handler.ModelChunkManifestHandler()
+        with pytest.raises(HandlerException):
+            await handler_inst.handle(request_context, MockResponder())
+
+    @pytest.mark.asyncio
+    @async_mock.patch.object(model_chunk_ack_handler, "ModelTransferManager")
+    async def test_ack_resends(self, mock_transfer_mgr, request_context):
+        mock_transfer_mgr.return_value.receive_ack = async_mock.CoroutineMock(
+            return_value=("transfer", ["chunk-3", "chunk-7"])
+        )
+        request_context.message = ModelChunkAck(complete=False, missing=[3, 7])
+        handler_inst = model_chunk_ack_handler.ModelChunkAckHandler()
+        responder = MockResponder()
+        await handler_inst.handle(request_context, responder)
+
+        assert [msg for (msg, _) in responder.messages] == ["chunk-3", "chunk-7"]
@@ -0,0 +1,503 @@
+"""Classes to manage chunked model transfers."""
+
+import asyncio
+import hashlib
+import logging
+import time
+
+from typing import AsyncIterable, Awaitable, Iterable, Iterator, Sequence, Tuple
+from urllib.parse import urlparse
+
+from aiohttp import ClientError, ClientSession, ClientTimeout
+
+from ...config.injection_context import InjectionContext
+from ...error import BaseError
+from ...storage.blob_store import BlobStore, BlobStoreError
+from ...storage.error import StorageNotFoundError
+from ..decorators.attach_decorator import AttachDecorator
+
+from .messages.model_chunk import ModelChunk
+from .messages.model_chunk_ack import ModelChunkAck
+from .messages.model_chunk_manifest import ModelChunkManifest
+from .models.model_transfer import ModelTransfer
+
+# Keep each chunk message under the inbound transports' 1 MiB message limit,
+# after base64 encoding of the chunk and of the encrypted envelope
+DEFAULT_CHUNK_SIZE = 256 * 1024
+MAX_CHUNK_SIZE = 384 * 1024
+
+# Linked downloads may run long, but not forever
+FETCH_TIMEOUT = ClientTimeout(total=3600, sock_connect=30, sock_read=60)
+
+# Largest model accepted from another agent, unless set by fl.max_model_size
+DEFAULT_MAX_MODEL_SIZE = 1024 * 1024 * 1024
+
+# A receiver saves its progress every so many chunks, and with every ack it
+# sends; chunks received after the last save are asked for again on resume
+SAVE_EVERY_CHUNKS = 32
+
+# The in-memory state of a transfer idle this long is dropped
+TRANSFER_IDLE_TIMEOUT = 600
+
+
+class ModelTransferManagerError(BaseError):
+    """Model transfer error."""
+
+
+class TransferState:
+    """In-memory state of the transfer on one thread."""
+
+    def __init__(self):
+        """Initialize a new TransferState."""
+        self.lock = asyncio.Lock()
+        # receiver transfer record, ahead of the one stored by unsaved chunks
+        self.transfer = None
+        self.unsaved = 0
+        self.last_used = time.monotonic()
+
+
+class ModelTransferManager:
+    """Class for managing chunked model transfers."""
+
+    # chunks of one transfer are handled concurrently: serialize record updates
+    _states = {}
+    # linked model downloads running in the background, kept until they finish
+    _fetches = set()
+
+    def __init__(self, context: InjectionContext):
+        """
+        Initialize a ModelTransferManager.
+
+        Args:
+            context: The context for this model transfer
+        """
+        self._context = context
+        self._logger = logging.getLogger(__name__)
+
+    @property
+    def context(self) -> InjectionContext:
+        """
+        Accessor for the current request context.
+
+        Returns:
+            The injection context for this model transfer manager
+
+        """
+        return self._context
+
+    @property
+    def blob_store(self) -> BlobStore:
+        """Accessor for the store holding the model files."""
+        return BlobStore(self.context.settings.get("fl.model_dir"))
+
+    @property
+    def max_model_size(self) -> int:
+        """Accessor for the size in bytes of the largest model to receive."""
+        return self.context.settings.get("fl.max_model_size") or DEFAULT_MAX_MODEL_SIZE
+
+    @classmethod
+    def _state(cls, thread_id: str) -> TransferState:
+        """Return the state, and lock, of the transfer on the given thread."""
+        now = time.monotonic()
+        for other_id, state in list(cls._states.items()):
+            # abandoned transfers: resuming one reads its saved record again
+            idle = now - state.last_used > TRANSFER_IDLE_TIMEOUT
+            if idle and not state.lock.locked():
+                del cls._states[other_id]
+        if thread_id not in cls._states:
+            cls._states[thread_id] = TransferState()
+        state = cls._states[thread_id]
+        state.last_used = now
+        return state
+
+    @classmethod
+    def _forget(cls, thread_id: str):
+        """Drop the state of a transfer that ended or failed."""
+        cls._states.pop(thread_id, None)
+
+    @classmethod
+    def fetch_in_background(cls, fetch: Awaitable) -> asyncio.Future:
+        """Run a model fetch in the background, logging it if it fails."""
+        task = asyncio.ensure_future(fetch)
+        cls._fetches.add(task)
+        task.add_done_callback(cls._fetch_done)
+        return task
+
+    @classmethod
+    def _fetch_done(cls, task: asyncio.Future):
+        """Drop a finished background fetch, logging its failure."""
+        cls._fetches.discard(task)
+        if not task.cancelled() and task.exception():
+            logging.getLogger(__name__).error(
+                "Background model fetch failed", exc_info=task.exception()
+            )
+
+    async def _retrieve(self, thread_id: str, role: str) -> ModelTransfer:
+        """Retrieve the transfer on a thread of the current connection."""
+        return await ModelTransfer.retrieve_by_tag_filter(
+            self.context,
+            {
+                "thread_id": thread_id,
+                "connection_id": self.context.connection_record.connection_id,
+                "role": role,
+            },
+        )
+
+    async def _receiving(self, state: TransferState, thread_id: str) -> ModelTransfer:
+        """Retrieve the receiver transfer on a thread, from memory if it is there."""
+        transfer = state.transfer
+        if transfer and transfer.connection_id == (
+            self.context.connection_record.connection_id
+        ):
+            return transfer
+        return await self._retrieve(thread_id, ModelTransfer.ROLE_RECEIVER)
+
+    async def create_model_link(
+        self, stream: AsyncIterable[bytes], mime_type: str = None
+    ) -> AttachDecorator:
+        """
+        Store a model and create an attachment linking to it.
+
+        The model is served by hash from the agent's HTTP endpoint, so that the
+        message itself carries only the link and the hash.
+
+        Args:
+            stream: async iterable over the model bytes
+            mime_type: MIME type of the model
+
+        Returns:
+            The attachment decorator
+
+        """
+        endpoint = self.context.settings.get("default_endpoint") or ""
+        if not endpoint.startswith("http"):
+            raise ModelTransferManagerError(
+                "Linked models need an HTTP endpoint to be served from"
+            )
+        sha256, total_size, _ = await self.blob_store.write_stream(stream)
+        if not total_size:
+            raise ModelTransferManagerError("No model bytes to send")
+        return AttachDecorator.from_link(
+            f"{endpoint.rstrip('/')}/blobs/{sha256}",
+            sha256,
+            mime_type=mime_type or "application/octet-stream",
+            byte_count=total_size,
+        )
+
+    async def fetch_model(self, attach: AttachDecorator) -> str:
+        """
+        Download a linked model into the store and check its hash.
+
+        Args:
+            attach: attachment decorator with links and sha256 data
+
+        Returns:
+            The path of the stored model
+
+        """
+        sha256 = attach.data.sha256
+        try:
+            if self.blob_store.has_blob(sha256):
+                return self.blob_store.blob_path(sha256)
+        except BlobStoreError as err:
+            raise ModelTransferManagerError(err.message) from err
+        max_size = attach.byte_count or self.max_model_size
+        if max_size > self.max_model_size:
+            raise ModelTransferManagerError(
+                f"Model of {max_size} bytes exceeds {self.max_model_size} bytes"
+            )
+
+        async with ClientSession(timeout=FETCH_TIMEOUT) as session:
+            for link in attach.data.links or ():
+                if urlparse(link).scheme not in ("http", "https"):
+                    self._logger.warning("Not fetching model link %s", link)
+                    continue
+                try:
+                    async with session.get(link) as resp:
+                        if resp.status != 200:
+                            self._logger.warning(
+                                "Unexpected HTTP response %s fetching %s",
+                                resp.status,
+                                link,
+                            )
+                            continue
+                        await self.blob_store.write_stream(
+                            resp.content.iter_chunked(BlobStore.READ_SIZE),
+                            sha256=sha256,
+                            max_size=max_size,
+                        )
+                    return self.blob_store.blob_path(sha256)
+                except (ClientError, asyncio.TimeoutError, BlobStoreError) as err:
+                    self._logger.warning("Error fetching %s: %s", link, err)
+
+        raise ModelTransferManagerError(f"Unable to fetch model {sha256}")
+
+    async def create_transfer(
+        self,
+        connection_id: str,
+        stream: AsyncIterable[bytes],
+        content: str = None,
+        mime_type: str = None,
+        chunk_size: int = None,
+    ) -> Tuple[ModelTransfer, ModelChunkManifest]:
+        """
+        Store a model and create the manifest offering it in chunks.
+
+        The receiver answers the manifest with an ack listing the chunks to send.
+
+        Args:
+            connection_id: connection to send the model to
+            stream: async iterable over the model bytes
+            content: message content accompanying the model
+            mime_type: MIME type of the model
+            chunk_size: size of each chunk in bytes
+
+        Returns:
+            A tuple (transfer record, model chunk manifest)
+
+        """
+        chunk_size = chunk_size or DEFAULT_CHUNK_SIZE
+        if not 0 < chunk_size <= MAX_CHUNK_SIZE:
+            raise ModelTransferManagerError(
+                f"Chunk size must be between 1 and {MAX_CHUNK_SIZE} bytes"
+            )
+
+        sha256, total_size, chunk_hashes = await self.blob_store.write_stream(
+            stream, chunk_size
+        )
+        if not total_size:
+            raise ModelTransferManagerError("No model bytes to send")
+        manifest = ModelChunkManifest(
+            content=content,
+            mime_type=mime_type or "application/octet-stream",
+            sha256=sha256,
+            total_size=total_size,
+            chunk_size=chunk_size,
+            chunk_hashes=chunk_hashes,
+        )
+        transfer = ModelTransfer(
+            connection_id=connection_id,
+            thread_id=manifest._thread_id,
+            role=ModelTransfer.ROLE_SENDER,
+            state=ModelTransfer.STATE_MANIFEST_SENT,
+            content=manifest.content,
+            mime_type=manifest.mime_type,
+            sha256=sha256,
+            total_size=total_size,
+            chunk_size=chunk_size,
+            chunk_hashes=chunk_hashes,
+        )
+        await transfer.save(self.context, reason="Create model transfer")
+        return transfer, manifest
+
+    def create_manifest(self, transfer: ModelTransfer) -> ModelChunkManifest:
+        """
+        Recreate the manifest of a transfer, to resume it.
+
+        Args:
+            transfer: sender transfer record
+
+        Returns:
+            The manifest, bearing the original message identifier
+
+        """
+        return ModelChunkManifest(
+            _id=transfer.thread_id,
+            content=transfer.content,
+            mime_type=transfer.mime_type,
+            sha256=transfer.sha256,
+            total_size=transfer.total_size,
+            chunk_size=transfer.chunk_size,
+            chunk_hashes=transfer.chunk_hashes,
+        )
+
+    def create_chunks(
+        self, transfer: ModelTransfer, indices: Sequence[int] = None
+    ) -> Iterator[ModelChunk]:
+        """
+        Create chunk messages for a transfer, reading each chunk as it is needed.
+
+        Args:
+            transfer: sender transfer record
+            indices: chunks to create, all by default
+
+        Returns:
+            Iterator over chunk messages threaded to the manifest
+
+        """
+        if indices is None:
+            indices = range(transfer.chunk_count)
+        for index in indices:
+            if not 0 <= index < transfer.chunk_count:
+                continue
+            chunk = ModelChunk.from_binary(
+                index,
+                self.blob_store.read_chunk(
+                    transfer.sha256, index, transfer.chunk_size
+                ),
+            )
+            chunk.assign_thread_id(transfer.thread_id)
+            yield chunk
+
+    def _create_ack(self, transfer: ModelTransfer) -> ModelChunkAck:
+        """Create an ack reporting the state of a receiver transfer."""
+        if transfer.state == ModelTransfer.STATE_RECEIVED:
+            ack = ModelChunkAck(complete=True)
+        else:
+            ack = ModelChunkAck(complete=False, missing=transfer.missing)
+        ack.assign_thread_id(transfer.thread_id)
+        return ack
+
+    async def receive_manifest(self) -> Tuple[ModelTransfer, ModelChunkAck]:
+        """
+        Receive a model chunk manifest.
+
+        The ack lists the chunks to send: all of them for a new transfer, none
+        if the model is already stored, and those still missing when the sender
+        resends the manifest to resume a transfer.
+
+        Returns:
+            A tuple (transfer record, ack to send)
+
+        """
+        manifest: ModelChunkManifest = self.context.message
+        chunk_size = manifest.chunk_size
+        chunk_count = len(manifest.chunk_hashes)
+        if (
+            not manifest.total_size
+            or chunk_size <= 0
+            or chunk_count != -(-manifest.total_size // chunk_size)
+        ):
+            raise ModelTransferManagerError(
+                "Model chunk manifest sizes do not match its chunk hashes"
+            )
+        if manifest.total_size > self.max_model_size:
+            raise ModelTransferManagerError(
+                f"Model of {manifest.total_size} bytes exceeds"
+                f" {self.max_model_size} bytes"
+            )
+        try:
+            self.blob_store.blob_path(manifest.sha256)
+        except BlobStoreError as err:
+            raise ModelTransferManagerError(err.message) from err
+
+        state = self._state(manifest._thread_id)
+        async with state.lock:
+            try:
+                transfer = await self._receiving(state, manifest._thread_id)
+                if state.unsaved:
+                    await transfer.save(self.context, reason="Resume model transfer")
+                    state.unsaved = 0
+                if transfer.state != ModelTransfer.STATE_RECEIVING:
+                    self._forget(transfer.thread_id)
+                return transfer, self._create_ack(transfer)
+            except StorageNotFoundError:
+                pass
+
+            transfer = ModelTransfer(
+                connection_id=self.context.connection_record.connection_id,
+                thread_id=manifest._thread_id,
+                role=ModelTransfer.ROLE_RECEIVER,
+                state=ModelTransfer.STATE_RECEIVING,
+                content=manifest.content,
+                mime_type=manifest.mime_type,
+                sha256=manifest.sha256,
+                total_size=manifest.total_size,
+                chunk_size=chunk_size,
+                chunk_hashes=manifest.chunk_hashes,
+            )
+            if self.blob_store.has_blob(manifest.sha256):
+                # nothing to transfer: we already hold this model
+                transfer.mark_all_received()
+                transfer.state = ModelTransfer.STATE_RECEIVED
+                await transfer.save(self.context, reason="Model already stored")
+                self._forget(transfer.thread_id)
+                return transfer, self._create_ack(transfer)
+
+            await transfer.save(self.context, reason="Receive model chunk manifest")
+            self.blob_store.allocate(transfer.transfer_id, transfer.total_size)
+            return transfer, self._create_ack(transfer)
+
+    async def receive_chunk(self) -> Tuple[ModelTransfer, ModelChunkAck]:
+        """
+        Receive a model chunk and write it in place.
+
+        Returns:
+            A tuple (transfer record, ack to send or None)
+
+        """
+        chunk: ModelChunk = self.context.message
+        state = self._state(chunk._thread_id)
+        async with state.lock:
+            try:
+                transfer = await self._receiving(state, chunk._thread_id)
+            except StorageNotFoundError:
+                if not state.transfer:
+                    self._forget(chunk._thread_id)
+                raise
+            if transfer.state != ModelTransfer.STATE_RECEIVING:
+                self._forget(transfer.thread_id)
+                return transfer, None
+            # kept in memory between chunks: the record is saved in batches
+            state.transfer = transfer
+
+            index = chunk.index
+            if not 0 <= index < transfer.chunk_count:
+                raise ModelTransferManagerError(
+                    f"Model chunk index {index} out of range"
+                )
+            data = chunk.binary
+            ack = None
+            if hashlib.sha256(data).hexdigest() != transfer.chunk_hashes[index]:
+                self._logger.warning("Model chunk %s failed sha256 check", index)
+                ack = ModelChunkAck(complete=False, missing=[index])
+                ack.assign_thread_id(transfer.thread_id)
+            elif transfer.has_chunk(index):
+                return transfer, None
+            else:
+                self.blob_store.write_at(
+                    transfer.transfer_id, index * transfer.chunk_size, data
+                )
+                transfer.mark_received(index)
+                state.unsaved += 1
+
+                if transfer.all_received:
+                    try:
+                        self.blob_store.commit(transfer.transfer_id, transfer.sha256)
+                        transfer.state = ModelTransfer.STATE_RECEIVED
+                    except BlobStoreError as err:
+                        # start over: the chunks cannot tell which one is bad
+                        transfer.error_msg = err.message
+                        transfer.clear_received()
+                        self.blob_store.allocate(
+                            transfer.transfer_id, transfer.total_size
+                        )
+                    ack = self._create_ack(transfer)
+                elif index == transfer.chunk_count - 1:
+                    # last chunk sent: report any gaps without waiting for a resume
+                    ack = self._create_ack(transfer)
+
+            if ack or state.unsaved >= SAVE_EVERY_CHUNKS:
+                await transfer.save(self.context, reason="Receive model chunk")
+                state.unsaved = 0
+            if transfer.state == ModelTransfer.STATE_RECEIVED:
+                self._forget(transfer.thread_id)
+            return transfer, ack
+
+    async def receive_ack(self) -> Tuple[ModelTransfer, Iterable[ModelChunk]]:
+        """
+        Receive a model chunk ack.
+
+        Returns:
+            A tuple (transfer record, chunks to send again, read as they are sent)
+
+        """
+        ack: ModelChunkAck = self.context.message
+        transfer = await self._retrieve(ack._thread_id, ModelTransfer.ROLE_SENDER)
+        if transfer.state == ModelTransfer.STATE_COMPLETE:
+            return transfer, []
+        if ack.complete:
+            transfer.state = ModelTransfer.STATE_COMPLETE
+            await transfer.save(self.context, reason="Model transfer complete")
+            return transfer, []
+        return transfer, self.create_chunks(transfer, ack.missing)
@@ -1,10 +1,24 @@
-"""Message type identifiers for Connections."""
+"""Message type identifiers for Federated Learning."""
 
 MESSAGE_FAMILY = "did:sov:BzCbsNYhMrjHiqZDTUASHg;spec/federatedlearningmessage/1.0"
 
 FEDERATEDLEARNING_MESSAGE = f"{MESSAGE_FAMILY}/federatedlearningmessage"
+MODEL_CHUNK_MANIFEST = f"{MESSAGE_FAMILY}/model-chunk-manifest"
+MODEL_CHUNK = f"{MESSAGE_FAMILY}/model-chunk"
+MODEL_CHUNK_ACK = f"{MESSAGE_FAMILY}/model-chunk-ack"
+FL_EVALUATION_REQUEST = f"{MESSAGE_FAMILY}/fl-evaluation-request"
+FL_EVALUATION_RESULT = f"{MESSAGE_FAMILY}/fl-evaluation-result"
 
+TOP = "aries_cloudagent.messaging.federatedlearningmessage"
 MESSAGE_TYPES = {
-    FEDERATEDLEARNING_MESSAGE: "aries_cloudagent.messaging.federatedlearningmessage."
-                               + "messages.federatedlearningmessage.FederatedLearningMessage"
+    FEDERATEDLEARNING_MESSAGE: (
+        f"{TOP}.messages.federatedlearningmessage.FederatedLearningMessage"
+    ),
+    MODEL_CHUNK_MANIFEST: f"{TOP}.messages.model_chunk_manifest.ModelChunkManifest",
+    MODEL_CHUNK: f"{TOP}.messages.model_chunk.ModelChunk",
+    MODEL_CHUNK_ACK: f"{TOP}.messages.model_chunk_ack.ModelChunkAck",
+    FL_EVALUATION_REQUEST: (
+        f"{TOP}.messages.fl_evaluation_request.FLEvaluationRequest"
+    ),
+    FL_EVALUATION_RESULT: f"{TOP}.messages.fl_evaluation_result.FLEvaluationResult",
 }
@@ -1,11 +1,12 @@
-"""Basic message."""
+"""Federated learning message."""
 
 from datetime import datetime
-from typing import Union
+from typing import Sequence, Union
 
 from marshmallow import fields
 
 from ...agent_message import AgentMessage, AgentMessageSchema
+from ...decorators.attach_decorator import AttachDecorator, AttachDecoratorSchema
 from ...util import datetime_now, datetime_to_str
 from ...valid import INDY_ISO8601_DATETIME
 
@@ -13,7 +14,7 @@ from ..message_types import FEDERATEDLEARNING_MESSAGE
 
 HANDLER_CLASS = (
     "aries_cloudagent.messaging.federatedlearningmessage."
-    + "handlers.basicmessage_handler.FederatedLearningMessageHandler"
+    + "handlers.federatedlearningmessage_handler.FederatedLearningMessageHandler"
 )
 
 
@@ -32,6 +33,7 @@ class FederatedLearningMessage(AgentMessage):
         *,
         sent_time: Union[str, datetime] = None,
         content: str = None,
+        model_attach: Sequence[AttachDecorator] = None,
         localization: str = None,
         **kwargs
     ):
@@ -41,6 +43,7 @@ class FederatedLearningMessage(AgentMessage):
         Args:
             sent_time: Time message was sent
             content: message content
+            model_attach: list of model attachments
             localization: localization
 
         """
@@ -49,8 +52,20 @@ class FederatedLearningMessage(AgentMessage):
             sent_time = datetime_now()
         self.sent_time = datetime_to_str(sent_time)
         self.content = content
+        self.model_attach = list(model_attach) if model_attach else []
         self.localization = localization
 
+    def model(self, index: int = 0) -> bytes:
+        """
+        Retrieve and decode model bytes from attachment.
+
+        Args:
+            index: ordinal in attachment list to decode and return
+                (typically, list has length 1)
+
+        """
+        return self.model_attach[index].binary
+
 
 class FederatedLearningMessageSchema(AgentMessageSchema):
     """FederatedLearning message schema class."""
@@ -72,7 +87,13 @@ class FederatedLearningMessageSchema(AgentMessageSchema):
         **INDY_ISO8601_DATETIME
     )
     content = fields.Str(
-        required=True,
+        required=False,
         description="Message content",
         example="Hello",
     )
+    model_attach = fields.Nested(
+        AttachDecoratorSchema,
+        required=False,
+        many=True,
+        data_key="model~attach"
+    )
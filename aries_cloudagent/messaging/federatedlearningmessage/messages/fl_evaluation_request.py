@@ -0,0 +1,89 @@
+"""Request to score a model on the receiver's own holdout data."""
+
+from typing import Sequence
+
+from marshmallow import fields
+
+from ...agent_message import AgentMessage, AgentMessageSchema
+from ...decorators.attach_decorator import AttachDecorator, AttachDecoratorSchema
+
+from ..message_types import FL_EVALUATION_REQUEST
+
+HANDLER_CLASS = (
+    "aries_cloudagent.messaging.federatedlearningmessage."
+    + "handlers.fl_evaluation_request_handler.FLEvaluationRequestHandler"
+)
+
+
+class FLEvaluationRequest(AgentMessage):
+    """Class asking a participant to evaluate a model and return its metrics."""
+
+    class Meta:
+        """FL evaluation request metadata."""
+
+        handler_class = HANDLER_CLASS
+        message_type = FL_EVALUATION_REQUEST
+        schema_class = "FLEvaluationRequestSchema"
+
+    def __init__(
+        self,
+        _id: str = None,
+        *,
+        model_sha256: str = None,
+        job_id: str = None,
+        round_number: int = None,
+        content: str = None,
+        model_attach: Sequence[AttachDecorator] = None,
+        **kwargs
+    ):
+        """
+        Initialize FL evaluation request object.
+
+        Args:
+            model_sha256: sha256 hash of the model to evaluate
+            job_id: identifier of the federated learning job
+            round_number: round of the job the model ended
+            content: message content, e.g. how to encode the data evaluated on
+            model_attach: link to fetch the model from, if the receiver lacks it
+
+        """
+        super().__init__(_id=_id, **kwargs)
+        self.model_sha256 = model_sha256
+        self.job_id = job_id
+        self.round_number = round_number
+        self.content = content
+        self.model_attach = list(model_attach) if model_attach else []
+
+
+class FLEvaluationRequestSchema(AgentMessageSchema):
+    """FL evaluation request schema class."""
+
+    class Meta:
+        """FL evaluation request schema metadata."""
+
+        model_class = FLEvaluationRequest
+
+    model_sha256 = fields.Str(
+        required=True,
+        description="SHA256 hash of the model to evaluate",
+    )
+    job_id = fields.Str(
+        required=False,
+        description="Identifier of the federated learning job",
+    )
+    round_number = fields.Int(
+        required=False,
+        description="Round of the job the model ended",
+        example=3,
+    )
+    content = fields.Str(
+        required=False,
+        description="Message content",
+        example='{"round": 3}',
+    )
+    model_attach = fields.Nested(
+        AttachDecoratorSchema,
+        required=False,
+        many=True,
+        data_key="model~attach",
+    )
@@ -0,0 +1,71 @@
+"""Metrics of a model scored on the sender's own holdout data."""
+
+from typing import Mapping
+
+from marshmallow import fields
+
+from ...agent_message import AgentMessage, AgentMessageSchema
+
+from ..message_types import FL_EVALUATION_RESULT
+
+HANDLER_CLASS = (
+    "aries_cloudagent.messaging.federatedlearningmessage."
+    + "handlers.fl_evaluation_result_handler.FLEvaluationResultHandler"
+)
+
+
+class FLEvaluationResult(AgentMessage):
+    """Class returning the metrics of an evaluation, in reply to its request."""
+
+    class Meta:
+        """FL evaluation result metadata."""
+
+        handler_class = HANDLER_CLASS
+        message_type = FL_EVALUATION_RESULT
+        schema_class = "FLEvaluationResultSchema"
+
+    def __init__(
+        self,
+        _id: str = None,
+        *,
+        model_sha256: str = None,
+        metrics: Mapping = None,
+        error: str = None,
+        **kwargs
+    ):
+        """
+        Initialize FL evaluation result object.
+
+        Args:
+            model_sha256: sha256 hash of the model evaluated
+            metrics: sample counts, loss sums and confusion matrix of the holdout
+            error: why the model could not be evaluated, if it was not
+
+        """
+        super().__init__(_id=_id, **kwargs)
+        self.model_sha256 = model_sha256
+        self.metrics = dict(metrics) if metrics else {}
+        self.error = error
+
+
+class FLEvaluationResultSchema(AgentMessageSchema):
+    """FL evaluation result schema class."""
+
+    class Meta:
+        """FL evaluation result schema metadata."""
+
+        model_class = FLEvaluationResult
+
+    model_sha256 = fields.Str(
+        required=True,
+        description="SHA256 hash of the model evaluated",
+    )
+    metrics = fields.Dict(
+        required=False,
+        description="Sample counts, loss sums and confusion matrix of the holdout",
+    )
+    error = fields.Str(
+        required=False,
+        description="Why the model could not be evaluated",
+        example="Model not found",
+    )
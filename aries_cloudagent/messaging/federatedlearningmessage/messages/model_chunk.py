@@ -0,0 +1,69 @@
+"""One numbered chunk of a model transfer."""
+
+import base64
+
+from marshmallow import fields
+
+from ...agent_message import AgentMessage, AgentMessageSchema
+
+from ..message_types import MODEL_CHUNK
+
+HANDLER_CLASS = (
+    "aries_cloudagent.messaging.federatedlearningmessage."
+    + "handlers.model_chunk_handler.ModelChunkHandler"
+)
+
+
+class ModelChunk(AgentMessage):
+    """Class carrying one chunk of a model, threaded to its manifest."""
+
+    class Meta:
+        """Model chunk metadata."""
+
+        handler_class = HANDLER_CLASS
+        message_type = MODEL_CHUNK
+        schema_class = "ModelChunkSchema"
+
+    def __init__(
+        self, _id: str = None, *, index: int = None, data: str = None, **kwargs
+    ):
+        """
+        Initialize model chunk object.
+
+        Args:
+            index: position of the chunk in the model, from zero
+            data: base64-encoded chunk bytes
+
+        """
+        super().__init__(_id=_id, **kwargs)
+        self.index = index
+        self.data = data
+
+    @classmethod
+    def from_binary(cls, index: int, chunk: bytes) -> "ModelChunk":
+        """Create a model chunk message from raw chunk bytes."""
+        return cls(index=index, data=base64.b64encode(chunk).decode())
+
+    @property
+    def binary(self) -> bytes:
+        """Accessor for the decoded chunk bytes."""
+        return base64.b64decode(self.data)
+
+
+class ModelChunkSchema(AgentMessageSchema):
+    """Model chunk schema class."""
+
+    class Meta:
+        """Model chunk schema metadata."""
+
+        model_class = ModelChunk
+
+    index = fields.Int(
+        required=True,
+        description="Position of the chunk in the model, from zero",
+        example=0,
+    )
+    data = fields.Str(
+        required=True,
+        description="Base64-encoded chunk bytes",
+    )
@@ -0,0 +1,66 @@
+"""Acknowledgement of the chunks received in a model transfer."""
+
+from typing import Sequence
+
+from marshmallow import fields
+
+from ...agent_message import AgentMessage, AgentMessageSchema
+
+from ..message_types import MODEL_CHUNK_ACK
+
+HANDLER_CLASS = (
+    "aries_cloudagent.messaging.federatedlearningmessage."
+    + "handlers.model_chunk_ack_handler.ModelChunkAckHandler"
+)
+
+
+class ModelChunkAck(AgentMessage):
+    """Class reporting transfer completion, or the chunks still missing."""
+
+    class Meta:
+        """Model chunk ack metadata."""
+
+        handler_class = HANDLER_CLASS
+        message_type = MODEL_CHUNK_ACK
+        schema_class = "ModelChunkAckSchema"
+
+    def __init__(
+        self,
+        _id: str = None,
+        *,
+        complete: bool = False,
+        missing: Sequence[int] = None,
+        **kwargs
+    ):
+        """
+        Initialize model chunk ack object.
+
+        Args:
+            complete: whether the receiver holds the complete, verified model
+            missing: indices of chunks to send again
+
+        """
+        super().__init__(_id=_id, **kwargs)
+        self.complete = complete
+        self.missing = list(missing) if missing else []
+
+
+class ModelChunkAckSchema(AgentMessageSchema):
+    """Model chunk ack schema class."""
+
+    class Meta:
+        """Model chunk ack schema metadata."""
+
+        model_class = ModelChunkAck
+
+    complete = fields.Bool(
+        required=True,
+        description="Whether the receiver holds the complete, verified model",
+        example=False,
+    )
+    missing = fields.List(
+        fields.Int(),
+        required=False,
+        description="Indices of chunks to send again",
+        example=[3, 7],
+    )
@@ -0,0 +1,96 @@
+"""Manifest opening a chunked model transfer."""
+
+from typing import Sequence
+
+from marshmallow import fields
+
+from ...agent_message import AgentMessage, AgentMessageSchema
+
+from ..message_types import MODEL_CHUNK_MANIFEST
+
+HANDLER_CLASS = (
+    "aries_cloudagent.messaging.federatedlearningmessage."
+    + "handlers.model_chunk_manifest_handler.ModelChunkManifestHandler"
+)
+
+
+class ModelChunkManifest(AgentMessage):
+    """Class describing a model to be sent as a sequence of chunk messages."""
+
+    class Meta:
+        """Model chunk manifest metadata."""
+
+        handler_class = HANDLER_CLASS
+        message_type = MODEL_CHUNK_MANIFEST
+        schema_class = "ModelChunkManifestSchema"
+
+    def __init__(
+        self,
+        _id: str = None,
+        *,
+        content: str = None,
+        mime_type: str = None,
+        sha256: str = None,
+        total_size: int = None,
+        chunk_size: int = None,
+        chunk_hashes: Sequence[str] = None,
+        **kwargs
+    ):
+        """
+        Initialize model chunk manifest object.
+
+        Args:
+            content: message content accompanying the model
+            mime_type: MIME type of the model
+            sha256: sha256 hash of the complete model
+            total_size: size of the complete model in bytes
+            chunk_size: size of every chunk but the last, in bytes
+            chunk_hashes: sha256 hash of each chunk, in order
+
+        """
+        super().__init__(_id=_id, **kwargs)
+        self.content = content
+        self.mime_type = mime_type
+        self.sha256 = sha256
+        self.total_size = total_size
+        self.chunk_size = chunk_size
+        self.chunk_hashes = list(chunk_hashes) if chunk_hashes else []
+
+
+class ModelChunkManifestSchema(AgentMessageSchema):
+    """Model chunk manifest schema class."""
+
+    class Meta:
+        """Model chunk manifest schema metadata."""
+
+        model_class = ModelChunkManifest
+
+    content = fields.Str(
+        required=False,
+        description="Message content",
+        example='{"num_samples": 120}',
+    )
+    mime_type = fields.Str(
+        required=False,
+        description="MIME type of the model",
+        example="application/octet-stream",
+    )
+    sha256 = fields.Str(
+        required=True,
+        description="SHA256 hash of the complete model",
+    )
+    total_size = fields.Int(
+        required=True,
+        description="Size of the complete model in bytes",
+        example=1048576,
+    )
+    chunk_size = fields.Int(
+        required=True,
+        description="Size of each chunk in bytes, except possibly the last",
+        example=262144,
+    )
+    chunk_hashes = fields.List(
+        fields.Str(),
+        required=True,
+        description="SHA256 hash of each chunk, in order",
+    )
@@ -2,6 +2,7 @@ from unittest import mock, TestCase
 
 from asynctest import TestCase as AsyncTestCase
 
+from ....decorators.attach_decorator import AttachDecorator
 from ..federatedlearningmessage import FederatedLearningMessage
 from ...message_types import FEDERATEDLEARNING_MESSAGE
 
@@ -21,8 +22,8 @@ class TestBasicMessage(TestCase):
         assert self.test_message._type == FEDERATEDLEARNING_MESSAGE
 
     @mock.patch(
-        "aries_cloudagent.messaging.basicmessage.messages."
-        + "basicmessage.BasicMessageSchema.load"
+        "aries_cloudagent.messaging.federatedlearningmessage.messages."
+        + "federatedlearningmessage.FederatedLearningMessageSchema.load"
     )
     def test_deserialize(self, mock_basic_message_schema_load):
         """
@@ -36,8 +37,8 @@ class TestBasicMessage(TestCase):
         assert msg is mock_basic_message_schema_load.return_value
 
     @mock.patch(
-        "aries_cloudagent.messaging.basicmessage.messages."
-        + "basicmessage.BasicMessageSchema.dump"
+        "aries_cloudagent.messaging.federatedlearningmessage.messages."
+        + "federatedlearningmessage.FederatedLearningMessageSchema.dump"
     )
     def test_serialize(self, mock_basic_message_schema_load):
         """
@@ -48,6 +49,14 @@ class TestBasicMessage(TestCase):
 
         assert msg_dict is mock_basic_message_schema_load.return_value
 
+    def test_model(self):
+        """Test model attachment round trip."""
+        model = b"\x80\x02model-bytes"
+        msg = FederatedLearningMessage(
+            model_attach=[AttachDecorator.from_binary(model)]
+        )
+        assert msg.model() == model
+
 
 class TestBasicMessageSchema(AsyncTestCase):
     """Test basic message schema."""
@@ -57,3 +66,16 @@ class TestBasicMessageSchema(AsyncTestCase):
         data = basic_message.serialize()
         model_instance = FederatedLearningMessage.deserialize(data)
         assert type(model_instance) is type(basic_message)
+
+    async def test_make_model_with_attachment(self):
+        message = FederatedLearningMessage(
+            content="{}",
+            model_attach=[AttachDecorator.from_binary(b"\x80\x02model-bytes")]
+        )
+        data = message.serialize()
+        assert "model~attach" in data
+        model_instance = FederatedLearningMessage.deserialize(data)
+        assert model_instance.model() == message.model()
+        assert model_instance.model_attach[0].data.sha256 == (
+            message.model_attach[0].data.sha256
+        )
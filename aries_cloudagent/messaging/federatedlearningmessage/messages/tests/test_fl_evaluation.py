@@ -0,0 +1,34 @@
+from unittest import TestCase
+
+from ....decorators.attach_decorator import AttachDecorator
+from ..fl_evaluation_request import FLEvaluationRequest
+from ..fl_evaluation_result import FLEvaluationResult
+from ...message_types import FL_EVALUATION_REQUEST, FL_EVALUATION_RESULT
+
+
+class TestFLEvaluationMessages(TestCase):
+    def test_request(self):
+        attach = AttachDecorator.from_link("http://localhost/blobs/abc", "a" * 64)
+        request = FLEvaluationRequest(
+            model_sha256="a" * 64,
+            job_id="job-id",
+            round_number=3,
+            content="{}",
+            model_attach=[attach],
+        )
+        assert request._type == FL_EVALUATION_REQUEST
+        loaded = FLEvaluationRequest.deserialize(request.serialize())
+        assert loaded.model_sha256 == "a" * 64
+        assert loaded.round_number == 3
+        assert loaded.content == "{}"
+        assert loaded.model_attach[0].data.links == ["http://localhost/blobs/abc"]
+
+    def test_result(self):
+        metrics = {"samples": 10, "loss_sum": 1.5, "confusion": {"true_positive": 4}}
+        result = FLEvaluationResult(model_sha256="a" * 64, metrics=metrics)
+        result.assign_thread_id("request-id")
+        assert result._type == FL_EVALUATION_RESULT
+        loaded = FLEvaluationResult.deserialize(result.serialize())
+        assert loaded.metrics == metrics
+        assert loaded.error is None
+        assert loaded._thread_id == "request-id"
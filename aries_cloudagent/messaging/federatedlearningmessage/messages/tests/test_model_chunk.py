@@ -0,0 +1,38 @@
+from unittest import TestCase
+
+from ..model_chunk import ModelChunk
+from ..model_chunk_ack import ModelChunkAck
+from ..model_chunk_manifest import ModelChunkManifest
+from ...message_types import MODEL_CHUNK, MODEL_CHUNK_ACK, MODEL_CHUNK_MANIFEST
+
+
+class TestModelChunkMessages(TestCase):
+    def test_manifest(self):
+        manifest = ModelChunkManifest(
+            content="{}",
+            mime_type="application/octet-stream",
+            sha256="a" * 64,
+            total_size=3,
+            chunk_size=2,
+            chunk_hashes=["b" * 64, "c" * 64],
+        )
+        assert manifest._type == MODEL_CHUNK_MANIFEST
+        loaded = ModelChunkManifest.deserialize(manifest.serialize())
+        assert loaded.chunk_hashes == manifest.chunk_hashes
+        assert loaded.total_size == 3
+
+    def test_chunk(self):
+        chunk = ModelChunk.from_binary(4, b"\x00\x01chunk")
+        chunk.assign_thread_id("manifest-id")
+        assert chunk._type == MODEL_CHUNK
+        loaded = ModelChunk.deserialize(chunk.serialize())
+        assert loaded.index == 4
+        assert loaded.binary == b"\x00\x01chunk"
+        assert loaded._thread_id == "manifest-id"
+
+    def test_ack(self):
+        ack = ModelChunkAck(complete=False, missing=[1, 5])
+        assert ack._type == MODEL_CHUNK_ACK
+        loaded = ModelChunkAck.deserialize(ack.serialize())
+        assert not loaded.complete
+        assert loaded.missing == [1, 5]
@@ -0,0 +1,136 @@
+"""Federated learning job information with non-secrets storage."""
+
+from typing import Mapping, Sequence
+
+from marshmallow import fields
+from marshmallow.validate import OneOf
+
+from ...models.base_record import BaseRecord, BaseRecordSchema
+from ...valid import UUIDFour
+
+
+class FLJob(BaseRecord):
+    """Represents a coordinator's federated learning job across its rounds."""
+
+    class Meta:
+        """FLJob metadata."""
+
+        schema_class = "FLJobSchema"
+
+    RECORD_TYPE = "fl_job"
+    RECORD_ID_NAME = "job_id"
+    WEBHOOK_TOPIC = "fl_job"
+
+    STATE_ACTIVE = "active"
+    STATE_COMPLETE = "complete"
+    STATE_ABANDONED = "abandoned"
+
+    def __init__(
+        self,
+        *,
+        job_id: str = None,
+        state: str = None,
+        round_mode: str = None,
+        settings: Mapping = None,
+        participants: Sequence[str] = None,
+        current_round: int = None,
+        model_sha256: str = None,
+        previous_sha256: str = None,
+        error_msg: str = None,
+        **kwargs
+    ):
+        """Initialize a new FLJob."""
+        super().__init__(job_id, state or self.STATE_ACTIVE, **kwargs)
+        self.round_mode = round_mode
+        self.settings = dict(settings) if settings else {}
+        self.participants = list(participants) if participants else []
+        self.current_round = current_round or 0
+        self.model_sha256 = model_sha256
+        self.previous_sha256 = previous_sha256
+        self.error_msg = error_msg
+
+    @property
+    def job_id(self) -> str:
+        """Accessor for the ID associated with this job."""
+        return self._id
+
+    @property
+    def record_value(self) -> dict:
+        """Accessor for the JSON record value generated for this job."""
+        result = {}
+        for prop in (
+            "settings",
+            "participants",
+            "current_round",
+            "model_sha256",
+            "previous_sha256",
+            "error_msg",
+        ):
+            val = getattr(self, prop)
+            if val is not None:
+                result[prop] = val
+        return result
+
+    @property
+    def record_tags(self) -> dict:
+        """Accessor for the record tags generated for this job."""
+        result = {}
+        for prop in ("round_mode",):
+            val = getattr(self, prop)
+            if val:
+                result[prop] = val
+        return result
+
+
+class FLJobSchema(BaseRecordSchema):
+    """Schema to allow serialization/deserialization of federated learning jobs."""
+
+    class Meta:
+        """FLJobSchema metadata."""
+
+        model_class = FLJob
+
+    job_id = fields.Str(
+        required=False,
+        description="Federated learning job identifier",
+        example=UUIDFour.EXAMPLE,
+    )
+    state = fields.Str(
+        required=False,
+        description="Federated learning job state",
+        example=FLJob.STATE_ACTIVE,
+        validate=OneOf(
+            [FLJob.STATE_ACTIVE, FLJob.STATE_COMPLETE, FLJob.STATE_ABANDONED]
+        ),
+    )
+    round_mode = fields.Str(
+        required=False,
+        description="How the coordinator runs each round",
+        example="parallel",
+    )
+    settings = fields.Dict(
+        required=False,
+        description="Coordinator settings the job was started with",
+    )
+    participants = fields.List(
+        fields.Str(example=UUIDFour.EXAMPLE),
+        required=False,
+        description="Connection identifiers of the trusted participants",
+    )
+    current_round = fields.Int(
+        required=False,
+        description="Last round whose aggregate was checkpointed",
+        example=3,
+    )
+    model_sha256 = fields.Str(
+        required=False,
+        description="SHA256 hash of the checkpointed global model",
+    )
+    previous_sha256 = fields.Str(
+        required=False,
+        description="SHA256 hash of the global model checkpointed before it",
+    )
+    error_msg = fields.Str(
+        required=False,
+        description="Error message",
+    )
@@ -0,0 +1,152 @@
+"""Federated learning round information with non-secrets storage."""
+
+from typing import Mapping, Sequence
+
+from marshmallow import fields
+from marshmallow.validate import OneOf
+
+from ...models.base_record import BaseRecord, BaseRecordSchema
+from ...valid import UUIDFour
+
+
+class FLRound(BaseRecord):
+    """Represents the outcome of one round of a federated learning job."""
+
+    class Meta:
+        """FLRound metadata."""
+
+        schema_class = "FLRoundSchema"
+
+    RECORD_TYPE = "fl_round"
+    RECORD_ID_NAME = "round_id"
+    WEBHOOK_TOPIC = "fl_round"
+
+    STATE_AGGREGATED = "aggregated"
+    STATE_NO_QUORUM = "no_quorum"
+    STATE_FAILED = "failed"
+
+    def __init__(
+        self,
+        *,
+        round_id: str = None,
+        job_id: str = None,
+        state: str = None,
+        round_number: int = None,
+        base_sha256: str = None,
+        model_sha256: str = None,
+        selected: Sequence[str] = None,
+        responded: Sequence[str] = None,
+        timed_out: Sequence[str] = None,
+        metrics: Mapping = None,
+        seconds: float = None,
+        **kwargs
+    ):
+        """Initialize a new FLRound."""
+        super().__init__(round_id, state, **kwargs)
+        self.job_id = job_id
+        self.round_number = round_number
+        self.base_sha256 = base_sha256
+        self.model_sha256 = model_sha256
+        self.selected = list(selected) if selected else []
+        self.responded = list(responded) if responded else []
+        self.timed_out = list(timed_out) if timed_out else []
+        self.metrics = dict(metrics) if metrics else {}
+        self.seconds = seconds
+
+    @property
+    def round_id(self) -> str:
+        """Accessor for the ID associated with this round."""
+        return self._id
+
+    @property
+    def record_value(self) -> dict:
+        """Accessor for the JSON record value generated for this round."""
+        result = {}
+        for prop in (
+            "round_number",
+            "base_sha256",
+            "model_sha256",
+            "selected",
+            "responded",
+            "timed_out",
+            "metrics",
+            "seconds",
+        ):
+            val = getattr(self, prop)
+            if val is not None:
+                result[prop] = val
+        return result
+
+    @property
+    def record_tags(self) -> dict:
+        """Accessor for the record tags generated for this round."""
+        result = {}
+        for prop in ("job_id",):
+            val = getattr(self, prop)
+            if val:
+                result[prop] = val
+        return result
+
+
+class FLRoundSchema(BaseRecordSchema):
+    """Schema to allow serialization/deserialization of federated learning rounds."""
+
+    class Meta:
+        """FLRoundSchema metadata."""
+
+        model_class = FLRound
+
+    round_id = fields.Str(
+        required=False,
+        description="Federated learning round identifier",
+        example=UUIDFour.EXAMPLE,
+    )
+    job_id = fields.Str(
+        required=False,
+        description="Identifier of the job the round belongs to",
+        example=UUIDFour.EXAMPLE,
+    )
+    state = fields.Str(
+        required=False,
+        description="How the round ended",
+        example=FLRound.STATE_AGGREGATED,
+        validate=OneOf(
+            [FLRound.STATE_AGGREGATED, FLRound.STATE_NO_QUORUM, FLRound.STATE_FAILED]
+        ),
+    )
+    round_number = fields.Int(
+        required=False,
+        description="Round number within the job",
+        example=3,
+    )
+    base_sha256 = fields.Str(
+        required=False,
+        description="SHA256 hash of the global model the round started from",
+    )
+    model_sha256 = fields.Str(
+        required=False,
+        description="SHA256 hash of the global model the round ended with",
+    )
+    selected = fields.List(
+        fields.Str(example=UUIDFour.EXAMPLE),
+        required=False,
+        description="Connection identifiers of the participants selected",
+    )
+    responded = fields.List(
+        fields.Str(example=UUIDFour.EXAMPLE),
+        required=False,
+        description="Connection identifiers of the participants that answered in time",
+    )
+    timed_out = fields.List(
+        fields.Str(example=UUIDFour.EXAMPLE),
+        required=False,
+        description="Connection identifiers of the participants past the deadline",
+    )
+    metrics = fields.Dict(
+        required=False,
+        description="Validation metrics of the round's global model",
+    )
+    seconds = fields.Float(
+        required=False,
+        description="Duration of the round in seconds",
+    )
@@ -0,0 +1,219 @@
+"""Chunked model transfer information with non-secrets storage."""
+
+from typing import Sequence
+
+from marshmallow import fields
+from marshmallow.validate import OneOf
+
+from ....wallet.util import b64_to_bytes, bytes_to_b64
+from ...models.base_record import BaseRecord, BaseRecordSchema
+from ...valid import UUIDFour
+
+
+class ModelTransfer(BaseRecord):
+    """Represents one chunked transfer of a model, from either side."""
+
+    class Meta:
+        """ModelTransfer metadata."""
+
+        schema_class = "ModelTransferSchema"
+
+    RECORD_TYPE = "fl_model_transfer"
+    RECORD_ID_NAME = "transfer_id"
+    WEBHOOK_TOPIC = "fl_model_transfer"
+
+    ROLE_SENDER = "sender"
+    ROLE_RECEIVER = "receiver"
+
+    STATE_MANIFEST_SENT = "manifest_sent"
+    STATE_RECEIVING = "receiving"
+    STATE_RECEIVED = "received"
+    STATE_COMPLETE = "complete"
+
+    def __init__(
+        self,
+        *,
+        transfer_id: str = None,
+        connection_id: str = None,
+        thread_id: str = None,
+        role: str = None,
+        state: str = None,
+        content: str = None,
+        mime_type: str = None,
+        sha256: str = None,
+        total_size: int = None,
+        chunk_size: int = None,
+        chunk_hashes: Sequence[str] = None,
+        received_bitmap: str = None,
+        received_count: int = None,
+        error_msg: str = None,
+        **kwargs
+    ):
+        """Initialize a new ModelTransfer."""
+        super().__init__(transfer_id, state, **kwargs)
+        self.connection_id = connection_id
+        self.thread_id = thread_id
+        self.role = role
+        self.content = content
+        self.mime_type = mime_type
+        self.sha256 = sha256
+        self.total_size = total_size
+        self.chunk_size = chunk_size
+        self.chunk_hashes = list(chunk_hashes) if chunk_hashes else []
+        # one bit per chunk, so that recording a chunk costs the same however
+        # many came before it
+        self._received = bytearray(
+            b64_to_bytes(received_bitmap)
+            if received_bitmap
+            else bytes(-(-self.chunk_count // 8))
+        )
+        self.received_count = received_count or 0
+        self.error_msg = error_msg
+
+    @property
+    def transfer_id(self) -> str:
+        """Accessor for the ID associated with this transfer."""
+        return self._id
+
+    @property
+    def chunk_count(self) -> int:
+        """Accessor for the number of chunks in the model."""
+        return len(self.chunk_hashes)
+
+    @property
+    def received_bitmap(self) -> str:
+        """Accessor for the received chunks, a bit per chunk in base64."""
+        return bytes_to_b64(bytes(self._received))
+
+    def has_chunk(self, index: int) -> bool:
+        """Check whether the chunk at an index was received."""
+        return bool(self._received[index >> 3] & (1 << (index & 7)))
+
+    def mark_received(self, index: int):
+        """Record the chunk at an index as received."""
+        if not self.has_chunk(index):
+            self._received[index >> 3] |= 1 << (index & 7)
+            self.received_count += 1
+
+    def mark_all_received(self):
+        """Record every chunk as received."""
+        for index in range(self.chunk_count):
+            self.mark_received(index)
+
+    def clear_received(self):
+        """Forget every chunk received."""
+        self._received = bytearray(len(self._received))
+        self.received_count = 0
+
+    @property
+    def all_received(self) -> bool:
+        """Accessor for whether every chunk was received."""
+        return self.received_count == self.chunk_count
+
+    @property
+    def missing(self) -> Sequence[int]:
+        """Accessor for the indices of chunks not yet received."""
+        return [idx for idx in range(self.chunk_count) if not self.has_chunk(idx)]
+
+    @property
+    def record_value(self) -> dict:
+        """Accessor for the JSON record value generated for this transfer."""
+        result = {}
+        for prop in (
+            "content",
+            "mime_type",
+            "total_size",
+            "chunk_size",
+            "chunk_hashes",
+            "received_bitmap",
+            "received_count",
+            "error_msg",
+        ):
+            val = getattr(self, prop)
+            if val is not None:
+                result[prop] = val
+        return result
+
+    @property
+    def record_tags(self) -> dict:
+        """Accessor for the record tags generated for this transfer."""
+        result = {}
+        for prop in ("connection_id", "thread_id", "role", "sha256"):
+            val = getattr(self, prop)
+            if val:
+                result[prop] = val
+        return result
+
+
+class ModelTransferSchema(BaseRecordSchema):
+    """Schema to allow serialization/deserialization of model transfer records."""
+
+    class Meta:
+        """ModelTransferSchema metadata."""
+
+        model_class = ModelTransfer
+
+    transfer_id = fields.Str(
+        required=False,
+        description="Model transfer identifier",
+        example=UUIDFour.EXAMPLE,
+    )
+    connection_id = fields.Str(
+        required=False,
+        description="Connection identifier",
+        example=UUIDFour.EXAMPLE,
+    )
+    thread_id = fields.Str(
+        required=False,
+        description="Thread identifier",
+        example=UUIDFour.EXAMPLE,
+    )
+    role = fields.Str(
+        required=False,
+        description="Model transfer role: sender or receiver",
+        example=ModelTransfer.ROLE_SENDER,
+        validate=OneOf([ModelTransfer.ROLE_SENDER, ModelTransfer.ROLE_RECEIVER]),
+    )
+    state = fields.Str(
+        required=False,
+        description="Model transfer state",
+        example=ModelTransfer.STATE_COMPLETE,
+    )
+    content = fields.Str(
+        required=False,
+        description="Message content accompanying the model",
+    )
+    mime_type = fields.Str(
+        required=False,
+        description="MIME type of the model",
+        example="application/octet-stream",
+    )
+    sha256 = fields.Str(
+        required=False,
+        description="SHA256 hash of the complete model",
+    )
+    total_size = fields.Int(
+        required=False,
+        description="Size of the complete model in bytes",
+    )
+    chunk_size = fields.Int(
+        required=False,
+        description="Size of each chunk in bytes, except possibly the last",
+    )
+    chunk_hashes = fields.List(
+        fields.Str(),
+        required=False,
+        description="SHA256 hash of each chunk, in order",
+    )
+    received_bitmap = fields.Str(
+        required=False,
+        description="Chunks received so far, one bit per chunk index, base64 encoded",
+    )
+    received_count = fields.Int(
+        required=False,
+        description="Number of chunks received so far",
+    )
+    error_msg = fields.Str(
+        required=False,
+        description="Error message",
+    )
@@ -0,0 +1,42 @@
+from asynctest import TestCase as AsyncTestCase
+
+from ..fl_job import FLJob, FLJobSchema
+
+
+class TestFLJob(AsyncTestCase):
+    def test_defaults(self):
+        job = FLJob(round_mode="parallel")
+        assert job.state == FLJob.STATE_ACTIVE
+        assert job.current_round == 0
+        assert job.participants == []
+        assert job.model_sha256 is None
+
+    def test_tags_and_value(self):
+        job = FLJob(
+            job_id="job-id",
+            round_mode="parallel",
+            settings={"selection_policy": "random"},
+            participants=["conn-1", "conn-2"],
+            current_round=3,
+            model_sha256="a" * 64,
+        )
+        assert job.job_id == "job-id"
+        assert job.tags == {"state": FLJob.STATE_ACTIVE, "round_mode": "parallel"}
+        assert job.record_value["participants"] == ["conn-1", "conn-2"]
+        assert job.record_value["current_round"] == 3
+
+    def test_from_storage(self):
+        job = FLJob(round_mode="async", participants=["conn-1"], current_round=2)
+        restored = FLJob.from_storage("job-id", job.value)
+        assert restored.job_id == "job-id"
+        assert restored.round_mode == "async"
+        assert restored.participants == ["conn-1"]
+        assert restored.current_round == 2
+
+    def test_serde(self):
+        job = FLJob(job_id="job-id", round_mode="sequential", current_round=1)
+        serialized = job.serialize()
+        assert serialized["job_id"] == "job-id"
+        deserialized = FLJob.deserialize(serialized)
+        assert deserialized.current_round == 1
+        assert isinstance(FLJobSchema().load(serialized), FLJob)
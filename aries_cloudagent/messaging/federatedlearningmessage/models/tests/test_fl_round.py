@@ -0,0 +1,32 @@
+from asynctest import TestCase as AsyncTestCase
+
+from ..fl_round import FLRound
+
+
+class TestFLRound(AsyncTestCase):
+    def test_tags_and_value(self):
+        fl_round = FLRound(
+            job_id="job-id",
+            state=FLRound.STATE_AGGREGATED,
+            round_number=2,
+            base_sha256="a" * 64,
+            model_sha256="b" * 64,
+            selected=["conn-1", "conn-2"],
+            responded=["conn-1"],
+            timed_out=["conn-2"],
+            metrics={"accuracy": 0.8},
+            seconds=12.5,
+        )
+        assert fl_round.tags == {"state": FLRound.STATE_AGGREGATED, "job_id": "job-id"}
+        value = fl_round.record_value
+        assert value["round_number"] == 2
+        assert value["timed_out"] == ["conn-2"]
+        assert value["metrics"] == {"accuracy": 0.8}
+
+    def test_from_storage(self):
+        fl_round = FLRound(job_id="job-id", state=FLRound.STATE_NO_QUORUM, round_number=4)
+        restored = FLRound.from_storage("round-id", fl_round.value)
+        assert restored.round_id == "round-id"
+        assert restored.job_id == "job-id"
+        assert restored.state == FLRound.STATE_NO_QUORUM
+        assert restored.round_number == 4
@@ -1,16 +1,24 @@
 """Federated learning message admin routes."""
 
 from aiohttp import web
-from aiohttp_apispec import docs, request_schema
+from aiohttp_apispec import docs, request_schema, response_schema
 
 from marshmallow import fields, Schema
 
+from ...storage.blob_store import BlobStore, BlobStoreError
 from ...storage.error import StorageNotFoundError
 
 from ..connections.manager import ConnectionManager
 from ..connections.models.connection_record import ConnectionRecord
+from ..decorators.attach_decorator import AttachDecorator
 
+from .manager import ModelTransferManager, ModelTransferManagerError
 from .messages.federatedlearningmessage import FederatedLearningMessage
+from .messages.fl_evaluation_request import FLEvaluationRequest
+from .messages.fl_evaluation_result import FLEvaluationResult
+from .models.fl_job import FLJob, FLJobSchema
+from .models.fl_round import FLRound, FLRoundSchema
+from .models.model_transfer import ModelTransfer, ModelTransferSchema
 
 
 class SendMessageSchema(Schema):
@@ -22,11 +30,123 @@ class SendMessageSchema(Schema):
     )
 
 
-@docs(tags=["federatedlearningmessage"], summary="Send a federated learning message to a connection")
+class ModelTransferListResultSchema(Schema):
+    """Result schema for a model transfer query."""
+
+    results = fields.List(
+        fields.Nested(ModelTransferSchema),
+        description="Model transfer records",
+    )
+
+
+class FLJobRequestSchema(Schema):
+    """Request schema for creating or updating a federated learning job."""
+
+    state = fields.Str(
+        required=False,
+        description="Federated learning job state",
+        example=FLJob.STATE_COMPLETE,
+    )
+    round_mode = fields.Str(
+        required=False,
+        description="How the coordinator runs each round",
+        example="parallel",
+    )
+    settings = fields.Dict(
+        required=False,
+        description="Coordinator settings the job runs with",
+    )
+    participants = fields.List(
+        fields.Str(),
+        required=False,
+        description="Connection identifiers of the trusted participants",
+    )
+
+
+class FLJobListResultSchema(Schema):
+    """Result schema for a federated learning job query."""
+
+    results = fields.List(
+        fields.Nested(FLJobSchema),
+        description="Federated learning job records",
+    )
+
+
+class SendEvaluationRequestResultSchema(Schema):
+    """Result schema for sending an FL evaluation request."""
+
+    thread_id = fields.Str(
+        description="Thread identifier the evaluation result will reply on",
+    )
+    model_sha256 = fields.Str(
+        description="SHA256 hash of the model to evaluate",
+    )
+
+
+class SendEvaluationResultSchema(Schema):
+    """Request schema for sending an FL evaluation result."""
+
+    thread_id = fields.Str(
+        required=True,
+        description="Thread identifier of the evaluation request",
+    )
+    model_sha256 = fields.Str(
+        required=True,
+        description="SHA256 hash of the model evaluated",
+    )
+    metrics = fields.Dict(
+        required=False,
+        description="Sample counts, loss sums and confusion matrix of the holdout",
+    )
+    error = fields.Str(
+        required=False,
+        description="Why the model could not be evaluated",
+    )
+
+
+class FLRoundListResultSchema(Schema):
+    """Result schema for a federated learning round query."""
+
+    results = fields.List(
+        fields.Nested(FLRoundSchema),
+        description="Federated learning round records",
+    )
+
+
+@docs(
+    tags=["federatedlearningmessage"],
+    summary="Send a federated learning message to a connection",
+    description=(
+        "Post a JSON body to send text content only, or post the raw model bytes "
+        "as application/octet-stream to send them as a message attachment. With "
+        "by_link, the attachment carries only a link to the model, served by hash "
+        "from the agent endpoint, and its sha256"
+    ),
+    parameters=[
+        {
+            "name": "content",
+            "in": "query",
+            "schema": {"type": "string"},
+            "required": False,
+        },
+        {
+            "name": "mime_type",
+            "in": "query",
+            "schema": {"type": "string"},
+            "required": False,
+        },
+        {
+            "name": "by_link",
+            "in": "query",
+            "schema": {"type": "boolean"},
+            "required": False,
+        },
+    ],
+)
 @request_schema(SendMessageSchema())
 async def connections_send_federated_learning_message(request: web.BaseRequest):
     """
-    Request handler for sending a federated learnng message to a connection.
+    Request handler for sending a federated learning message to a connection.
 
     Args:
         request: aiohttp request object
@@ -35,7 +155,26 @@ async def connections_send_federated_learning_message(request: web.BaseRequest):
     context = request.app["request_context"]
     connection_id = request.match_info["id"]
     outbound_handler = request.app["outbound_message_router"]
-    params = await request.json()
+
+    attach = None
+    if request.content_type == "application/octet-stream":
+        # read the stream directly: model bytes may exceed client_max_size
+        content = request.query.get("content")
+        mime_type = request.query.get("mime_type") or "application/octet-stream"
+        if request.query.get("by_link", "false").lower() == "true":
+            try:
+                attach = await ModelTransferManager(context).create_model_link(
+                    request.content.iter_chunked(BlobStore.READ_SIZE), mime_type
+                )
+            except ModelTransferManagerError as err:
+                raise web.HTTPBadRequest(reason=err.message)
+        else:
+            model = await request.content.read()
+            if model:
+                attach = AttachDecorator.from_binary(model, mime_type=mime_type)
+    else:
+        params = await request.json()
+        content = params["content"]
 
     try:
         connection = await ConnectionRecord.retrieve_by_id(context, connection_id)
@@ -43,7 +182,13 @@ async def connections_send_federated_learning_message(request: web.BaseRequest):
         raise web.HTTPNotFound()
 
     if connection.is_ready:
-        msg = FederatedLearningMessage(content=params["content"])
+        meta = {"content": content}
+        model_attach = None
+        if attach:
+            model_attach = [attach]
+            meta["model_sha256"] = attach.data.sha256
+
+        msg = FederatedLearningMessage(content=content, model_attach=model_attach)
         await outbound_handler(msg, connection_id=connection_id)
 
         conn_mgr = ConnectionManager(context)
@@ -51,13 +196,644 @@ async def connections_send_federated_learning_message(request: web.BaseRequest):
             connection,
             "message",
             connection.DIRECTION_SENT,
-            {"content": params["content"]},
+            meta,
         )
 
     return web.json_response({})
 
 
-@docs(tags=["federatedlearningmessage"], summary="Expire a copyable federatedlearningmessage")
+@docs(
+    tags=["federatedlearningmessage"],
+    summary="Send a model to a connection in resumable chunks",
+    description=(
+        "Post the raw model bytes as application/octet-stream: the agent stores "
+        "them and offers them to the connection, which fetches the chunks it needs"
+    ),
+    parameters=[
+        {
+            "name": "content",
+            "in": "query",
+            "schema": {"type": "string"},
+            "required": False,
+        },
+        {
+            "name": "mime_type",
+            "in": "query",
+            "schema": {"type": "string"},
+            "required": False,
+        },
+        {
+            "name": "chunk_size",
+            "in": "query",
+            "schema": {"type": "integer"},
+            "required": False,
+        },
+    ],
+)
+@response_schema(ModelTransferSchema(), 200)
+async def connections_send_federated_learning_model(request: web.BaseRequest):
+    """
+    Request handler for sending a model to a connection in chunks.
+
+    Args:
+        request: aiohttp request object
+
+    Returns:
+        The model transfer record
+
+    """
+    context = request.app["request_context"]
+    connection_id = request.match_info["id"]
+    outbound_handler = request.app["outbound_message_router"]
+
+    content = request.query.get("content")
+    try:
+        chunk_size = int(request.query.get("chunk_size") or 0) or None
+    except ValueError:
+        raise web.HTTPBadRequest(reason="Chunk size must be an integer")
+
+    try:
+        connection = await ConnectionRecord.retrieve_by_id(context, connection_id)
+    except StorageNotFoundError:
+        raise web.HTTPNotFound()
+
+    if not connection.is_ready:
+        raise web.HTTPBadRequest(reason="Connection not ready")
+
+    transfer_mgr = ModelTransferManager(context)
+    try:
+        transfer, manifest = await transfer_mgr.create_transfer(
+            connection_id,
+            request.content.iter_chunked(BlobStore.READ_SIZE),
+            content=content,
+            mime_type=request.query.get("mime_type"),
+            chunk_size=chunk_size,
+        )
+    except ModelTransferManagerError as err:
+        raise web.HTTPBadRequest(reason=err.message)
+
+    await outbound_handler(manifest, connection_id=connection_id)
+
+    conn_mgr = ConnectionManager(context)
+    await conn_mgr.log_activity(
+        connection,
+        "message",
+        connection.DIRECTION_SENT,
+        {"content": content, "model_sha256": transfer.sha256},
+    )
+
+    return web.json_response(transfer.serialize())
+
+
+@docs(
+    tags=["federatedlearningmessage"],
+    summary="Fetch all model transfer records",
+    parameters=[
+        {
+            "name": "connection_id",
+            "in": "query",
+            "schema": {"type": "string"},
+            "required": False,
+        },
+        {
+            "name": "role",
+            "in": "query",
+            "schema": {"type": "string"},
+            "required": False,
+        },
+        {
+            "name": "state",
+            "in": "query",
+            "schema": {"type": "string"},
+            "required": False,
+        },
+        {
+            "name": "sha256",
+            "in": "query",
+            "schema": {"type": "string"},
+            "required": False,
+        },
+    ],
+)
+@response_schema(ModelTransferListResultSchema(), 200)
+async def model_transfer_list(request: web.BaseRequest):
+    """
+    Request handler for searching model transfer records.
+
+    Args:
+        request: aiohttp request object
+
+    Returns:
+        The model transfer list response
+
+    """
+    context = request.app["request_context"]
+    tag_filter = {}
+    for param_name in ("connection_id", "role", "state", "sha256"):
+        if param_name in request.query and request.query[param_name] != "":
+            tag_filter[param_name] = request.query[param_name]
+    records = await ModelTransfer.query(context, tag_filter)
+    return web.json_response({"results": [record.serialize() for record in records]})
+
+
+@docs(
+    tags=["federatedlearningmessage"],
+    summary="Fetch a single model transfer record",
+)
+@response_schema(ModelTransferSchema(), 200)
+async def model_transfer_retrieve(request: web.BaseRequest):
+    """
+    Request handler for fetching a single model transfer record.
+
+    Args:
+        request: aiohttp request object
+
+    Returns:
+        The model transfer record
+
+    """
+    context = request.app["request_context"]
+    transfer_id = request.match_info["transfer_id"]
+    try:
+        record = await ModelTransfer.retrieve_by_id(context, transfer_id)
+    except StorageNotFoundError:
+        raise web.HTTPNotFound()
+    return web.json_response(record.serialize())
+
+
+@docs(
+    tags=["federatedlearningmessage"],
+    summary="Resume an incomplete model transfer",
+    description=(
+        "Send the manifest again: the receiver answers with the chunks it is "
+        "still missing, and only those are sent"
+    ),
+)
+@response_schema(ModelTransferSchema(), 200)
+async def model_transfer_resume(request: web.BaseRequest):
+    """
+    Request handler for resuming a model transfer.
+
+    Args:
+        request: aiohttp request object
+
+    Returns:
+        The model transfer record
+
+    """
+    context = request.app["request_context"]
+    outbound_handler = request.app["outbound_message_router"]
+    transfer_id = request.match_info["transfer_id"]
+    try:
+        record = await ModelTransfer.retrieve_by_id(context, transfer_id)
+    except StorageNotFoundError:
+        raise web.HTTPNotFound()
+
+    if (
+        record.role != ModelTransfer.ROLE_SENDER
+        or record.state != ModelTransfer.STATE_MANIFEST_SENT
+    ):
+        raise web.HTTPBadRequest(reason="Only incomplete sent transfers can resume")
+
+    transfer_mgr = ModelTransferManager(context)
+    manifest = transfer_mgr.create_manifest(record)
+    await outbound_handler(manifest, connection_id=record.connection_id)
+
+    return web.json_response(record.serialize())
+
+
+@docs(
+    tags=["federatedlearningmessage"],
+    summary="Fetch the bytes of a stored model by its sha256 hash",
+)
+async def model_retrieve(request: web.BaseRequest):
+    """
+    Request handler for streaming a stored model.
+
+    Args:
+        request: aiohttp request object
+
+    Returns:
+        The model file response
+
+    """
+    context = request.app["request_context"]
+    sha256 = request.match_info["sha256"]
+    blob_store = ModelTransferManager(context).blob_store
+    try:
+        if not blob_store.has_blob(sha256):
+            raise web.HTTPNotFound()
+        path = blob_store.blob_path(sha256)
+    except BlobStoreError as err:
+        raise web.HTTPBadRequest(reason=err.message)
+    return web.FileResponse(path, headers={"Content-Type": "application/octet-stream"})
+
+
+@docs(
+    tags=["federatedlearningmessage"],
+    summary="Ask a connection to evaluate a model on its own data",
+    description=(
+        "Post the raw model bytes as application/octet-stream: the agent stores "
+        "them and sends only their hash and a link to them, which the connection "
+        "follows unless it holds the model already. It replies with the metrics "
+        "of the model on its holdout data, on the returned thread"
+    ),
+    parameters=[
+        {
+            "name": "content",
+            "in": "query",
+            "schema": {"type": "string"},
+            "required": False,
+        },
+        {
+            "name": "job_id",
+            "in": "query",
+            "schema": {"type": "string"},
+            "required": False,
+        },
+        {
+            "name": "round_number",
+            "in": "query",
+            "schema": {"type": "integer"},
+            "required": False,
+        },
+        {
+            "name": "mime_type",
+            "in": "query",
+            "schema": {"type": "string"},
+            "required": False,
+        },
+    ],
+)
+@response_schema(SendEvaluationRequestResultSchema(), 200)
+async def connections_send_fl_evaluation_request(request: web.BaseRequest):
+    """
+    Request handler for sending an FL evaluation request to a connection.
+
+    Args:
+        request: aiohttp request object
+
+    Returns:
+        The thread of the request and the hash of the model
+
+    """
+    context = request.app["request_context"]
+    connection_id = request.match_info["id"]
+    outbound_handler = request.app["outbound_message_router"]
+
+    try:
+        round_number = request.query.get("round_number")
+        round_number = int(round_number) if round_number else None
+    except ValueError:
+        raise web.HTTPBadRequest(reason="Round number must be an integer")
+
+    try:
+        connection = await ConnectionRecord.retrieve_by_id(context, connection_id)
+    except StorageNotFoundError:
+        raise web.HTTPNotFound()
+
+    if not connection.is_ready:
+        raise web.HTTPBadRequest(reason="Connection not ready")
+
+    try:
+        attach = await ModelTransferManager(context).create_model_link(
+            request.content.iter_chunked(BlobStore.READ_SIZE),
+            request.query.get("mime_type"),
+        )
+    except ModelTransferManagerError as err:
+        raise web.HTTPBadRequest(reason=err.message)
+
+    msg = FLEvaluationRequest(
+        model_sha256=attach.data.sha256,
+        job_id=request.query.get("job_id"),
+        round_number=round_number,
+        content=request.query.get("content"),
+        model_attach=[attach],
+    )
+    await outbound_handler(msg, connection_id=connection_id)
+
+    return web.json_response(
+        {"thread_id": msg._thread_id, "model_sha256": attach.data.sha256}
+    )
+
+
+@docs(
+    tags=["federatedlearningmessage"],
+    summary="Reply to an FL evaluation request with the model's metrics",
+)
+@request_schema(SendEvaluationResultSchema())
+async def connections_send_fl_evaluation_result(request: web.BaseRequest):
+    """
+    Request handler for sending an FL evaluation result to a connection.
+
+    Args:
+        request: aiohttp request object
+
+    """
+    context = request.app["request_context"]
+    connection_id = request.match_info["id"]
+    outbound_handler = request.app["outbound_message_router"]
+    params = await request.json()
+
+    try:
+        connection = await ConnectionRecord.retrieve_by_id(context, connection_id)
+    except StorageNotFoundError:
+        raise web.HTTPNotFound()
+
+    if not connection.is_ready:
+        raise web.HTTPBadRequest(reason="Connection not ready")
+
+    msg = FLEvaluationResult(
+        model_sha256=params["model_sha256"],
+        metrics=params.get("metrics"),
+        error=params.get("error"),
+    )
+    msg.assign_thread_id(params["thread_id"])
+    await outbound_handler(msg, connection_id=connection_id)
+
+    return web.json_response({})
+
+
+@docs(tags=["federatedlearningmessage"], summary="Create a federated learning job")
+@request_schema(FLJobRequestSchema())
+@response_schema(FLJobSchema(), 200)
+async def fl_job_create(request: web.BaseRequest):
+    """
+    Request handler for creating a federated learning job.
+
+    Args:
+        request: aiohttp request object
+
+    Returns:
+        The federated learning job record
+
+    """
+    context = request.app["request_context"]
+    body = await request.json()
+    job = FLJob(
+        round_mode=body.get("round_mode"),
+        settings=body.get("settings"),
+        participants=body.get("participants"),
+    )
+    await job.save(context, reason="Created federated learning job")
+    return web.json_response(job.serialize())
+
+
+@docs(
+    tags=["federatedlearningmessage"],
+    summary="Fetch all federated learning job records",
+    parameters=[
+        {
+            "name": "state",
+            "in": "query",
+            "schema": {"type": "string"},
+            "required": False,
+        },
+        {
+            "name": "round_mode",
+            "in": "query",
+            "schema": {"type": "string"},
+            "required": False,
+        },
+    ],
+)
+@response_schema(FLJobListResultSchema(), 200)
+async def fl_job_list(request: web.BaseRequest):
+    """
+    Request handler for searching federated learning job records.
+
+    Args:
+        request: aiohttp request object
+
+    Returns:
+        The federated learning job list response
+
+    """
+    context = request.app["request_context"]
+    tag_filter = {}
+    for param_name in ("state", "round_mode"):
+        if param_name in request.query and request.query[param_name] != "":
+            tag_filter[param_name] = request.query[param_name]
+    records = await FLJob.query(context, tag_filter)
+    return web.json_response({"results": [record.serialize() for record in records]})
+
+
+@docs(
+    tags=["federatedlearningmessage"],
+    summary="Fetch a single federated learning job record",
+)
+@response_schema(FLJobSchema(), 200)
+async def fl_job_retrieve(request: web.BaseRequest):
+    """
+    Request handler for fetching a single federated learning job record.
+
+    Args:
+        request: aiohttp request object
+
+    Returns:
+        The federated learning job record
+
+    """
+    context = request.app["request_context"]
+    job_id = request.match_info["job_id"]
+    try:
+        record = await FLJob.retrieve_by_id(context, job_id)
+    except StorageNotFoundError:
+        raise web.HTTPNotFound()
+    return web.json_response(record.serialize())
+
+
+@docs(
+    tags=["federatedlearningmessage"],
+    summary="Update the state, settings or participants of a federated learning job",
+)
+@request_schema(FLJobRequestSchema())
+@response_schema(FLJobSchema(), 200)
+async def fl_job_update(request: web.BaseRequest):
+    """
+    Request handler for updating a federated learning job.
+
+    Args:
+        request: aiohttp request object
+
+    Returns:
+        The federated learning job record
+
+    """
+    context = request.app["request_context"]
+    job_id = request.match_info["job_id"]
+    body = await request.json()
+    try:
+        job = await FLJob.retrieve_by_id(context, job_id)
+    except StorageNotFoundError:
+        raise web.HTTPNotFound()
+
+    if "state" in body:
+        if body["state"] not in (
+            FLJob.STATE_ACTIVE,
+            FLJob.STATE_COMPLETE,
+            FLJob.STATE_ABANDONED,
+        ):
+            raise web.HTTPBadRequest(reason=f"Unknown job state: {body['state']}")
+        job.state = body["state"]
+    if "settings" in body:
+        job.settings = dict(body["settings"] or {})
+    if "participants" in body:
+        job.participants = list(body["participants"] or [])
+    await job.save(context, reason="Updated federated learning job")
+    return web.json_response(job.serialize())
+
+
+@docs(
+    tags=["federatedlearningmessage"],
+    summary="Checkpoint the global model of a federated learning job",
+    description=(
+        "Post the raw model bytes as application/octet-stream after an "
+        "aggregation: the agent stores them by hash and records them, with the "
+        "round number, as the model the job resumes from"
+    ),
+    parameters=[
+        {
+            "name": "round",
+            "in": "query",
+            "schema": {"type": "integer"},
+            "required": True,
+        },
+    ],
+)
+@response_schema(FLJobSchema(), 200)
+async def fl_job_checkpoint(request: web.BaseRequest):
+    """
+    Request handler for checkpointing the global model of a job.
+
+    Args:
+        request: aiohttp request object
+
+    Returns:
+        The federated learning job record
+
+    """
+    context = request.app["request_context"]
+    job_id = request.match_info["job_id"]
+    try:
+        round_number = int(request.query.get("round"))
+    except (TypeError, ValueError):
+        raise web.HTTPBadRequest(reason="Round must be an integer")
+
+    try:
+        job = await FLJob.retrieve_by_id(context, job_id)
+    except StorageNotFoundError:
+        raise web.HTTPNotFound()
+
+    blob_store = ModelTransferManager(context).blob_store
+    try:
+        sha256, _, _ = await blob_store.write_stream(
+            request.content.iter_chunked(BlobStore.READ_SIZE)
+        )
+    except BlobStoreError as err:
+        raise web.HTTPBadRequest(reason=err.message)
+
+    # The previous checkpoint was sent out for the round just checkpointed, some
+    # of it by link: it is kept one round longer, for participants still
+    # fetching it, and the one before it is superseded
+    superseded = job.previous_sha256
+    if job.model_sha256 != sha256:
+        job.previous_sha256 = job.model_sha256
+    job.current_round = round_number
+    job.model_sha256 = sha256
+    await job.save(context, reason=f"Checkpointed round {round_number}")
+
+    # It is removed once no other record needs it
+    if superseded and superseded not in (sha256, job.previous_sha256):
+        jobs = await FLJob.query(context)
+        transfers = await ModelTransfer.query(context, {"sha256": superseded})
+        if not transfers and not any(
+            superseded in (other.model_sha256, other.previous_sha256)
+            for other in jobs
+        ):
+            blob_store.remove(superseded)
+    return web.json_response(job.serialize())
+
+
+@docs(tags=["federatedlearningmessage"], summary="Record a federated learning round")
+@request_schema(FLRoundSchema())
+@response_schema(FLRoundSchema(), 200)
+async def fl_round_create(request: web.BaseRequest):
+    """
+    Request handler for recording the outcome of a round of a job.
+
+    Args:
+        request: aiohttp request object
+
+    Returns:
+        The federated learning round record
+
+    """
+    context = request.app["request_context"]
+    job_id = request.match_info["job_id"]
+    body = await request.json()
+    try:
+        await FLJob.retrieve_by_id(context, job_id)
+    except StorageNotFoundError:
+        raise web.HTTPNotFound()
+
+    params = {
+        name: body[name]
+        for name in (
+            "state",
+            "round_number",
+            "base_sha256",
+            "model_sha256",
+            "selected",
+            "responded",
+            "timed_out",
+            "metrics",
+            "seconds",
+        )
+        if name in body
+    }
+    fl_round = FLRound(job_id=job_id, **params)
+    await fl_round.save(context, reason="Recorded federated learning round")
+    return web.json_response(fl_round.serialize())
+
+
+@docs(
+    tags=["federatedlearningmessage"],
+    summary="Fetch the round records of a federated learning job",
+    parameters=[
+        {
+            "name": "state",
+            "in": "query",
+            "schema": {"type": "string"},
+            "required": False,
+        },
+    ],
+)
+@response_schema(FLRoundListResultSchema(), 200)
+async def fl_round_list(request: web.BaseRequest):
+    """
+    Request handler for fetching the round records of a job.
+
+    Args:
+        request: aiohttp request object
+
+    Returns:
+        The federated learning round list response, in round order
+
+    """
+    context = request.app["request_context"]
+    tag_filter = {"job_id": request.match_info["job_id"]}
+    if request.query.get("state"):
+        tag_filter["state"] = request.query["state"]
+    records = await FLRound.query(context, tag_filter)
+    records = sorted(records, key=lambda record: record.round_number or 0)
+    return web.json_response({"results": [record.serialize() for record in records]})
+
+
+@docs(
+    tags=["federatedlearningmessage"],
+    summary="Expire a copyable federatedlearningmessage",
+)
 async def connections_expire_federated_learning_message(request: web.BaseRequest):
     """
     Request handler for sending a federated learning message to a connection.
@@ -88,7 +864,12 @@ async def register(app: web.Application):
     """Register routes."""
 
     app.add_routes(
-        [web.post("/connections/{id}/send-fl-message", connections_send_federated_learning_message)]
+        [
+            web.post(
+                "/connections/{id}/send-fl-message",
+                connections_send_federated_learning_message,
+            )
+        ]
     )
 
     app.add_routes(
@@ -99,3 +880,41 @@ async def register(app: web.Application):
             )
         ]
     )
+
+    app.add_routes(
+        [
+            web.post(
+                "/connections/{id}/send-fl-model",
+                connections_send_federated_learning_model,
+            ),
+            web.get("/fl-transfers", model_transfer_list),
+            web.get("/fl-transfers/{transfer_id}", model_transfer_retrieve),
+            web.post("/fl-transfers/{transfer_id}/resume", model_transfer_resume),
+            web.get("/fl-models/{sha256}", model_retrieve),
+        ]
+    )
+
+    app.add_routes(
+        [
+            web.post(
+                "/connections/{id}/send-fl-evaluation-request",
+                connections_send_fl_evaluation_request,
+            ),
+            web.post(
+                "/connections/{id}/send-fl-evaluation-result",
+                connections_send_fl_evaluation_result,
+            ),
+        ]
+    )
+
+    app.add_routes(
+        [
+            web.post("/fl-jobs", fl_job_create),
+            web.get("/fl-jobs", fl_job_list),
+            web.get("/fl-jobs/{job_id}", fl_job_retrieve),
+            web.post("/fl-jobs/{job_id}/update", fl_job_update),
+            web.post("/fl-jobs/{job_id}/checkpoint", fl_job_checkpoint),
+            web.post("/fl-jobs/{job_id}/rounds", fl_round_create),
+            web.get("/fl-jobs/{job_id}/rounds", fl_round_list),
+        ]
+    )
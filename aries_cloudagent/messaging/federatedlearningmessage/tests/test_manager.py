@@ -0,0 +1,275 @@
+import asyncio
+import hashlib
+import os
+import shutil
+import tempfile
+
+from aiohttp.test_utils import unused_port
+from asynctest import TestCase as AsyncTestCase
+from asynctest import mock as async_mock
+
+from ....storage.base import BaseStorage
+from ....storage.basic import BasicStorage
+from ....storage.error import StorageNotFoundError
+from ....transport.inbound.http import HttpTransport
+from ...request_context import RequestContext
+
+from .. import manager as test_module
+from ..manager import ModelTransferManager, ModelTransferManagerError
+from ..messages.model_chunk import ModelChunk
+from ..models.model_transfer import ModelTransfer
+
+TEST_MODEL = os.urandom(10 * 1024 + 17)
+CHUNK_SIZE = 1024
+
+
+async def stream(data: bytes, block: int = 700):
+    for pos in range(0, len(data), block):
+        yield data[pos : pos + block]
+
+
+class TestModelTransferManager(AsyncTestCase):
+    def setUp(self):
+        self.sender_dir = tempfile.mkdtemp()
+        self.receiver_dir = tempfile.mkdtemp()
+        self.sender_ctx = self.make_context(self.sender_dir, "to-receiver")
+        self.receiver_ctx = self.make_context(self.receiver_dir, "to-sender")
+        self.sender = ModelTransferManager(self.sender_ctx)
+        self.receiver = ModelTransferManager(self.receiver_ctx)
+
+    def tearDown(self):
+        shutil.rmtree(self.sender_dir)
+        shutil.rmtree(self.receiver_dir)
+
+    def make_context(self, model_dir, connection_id):
+        ctx = RequestContext(settings={"fl.model_dir": model_dir})
+        ctx.injector.bind_instance(BaseStorage, BasicStorage())
+        ctx.connection_record = async_mock.MagicMock(connection_id=connection_id)
+        return ctx
+
+    async def offer(self, data=TEST_MODEL):
+        transfer, manifest = await self.sender.create_transfer(
+            "to-receiver", stream(data), content="{}", chunk_size=CHUNK_SIZE
+        )
+        self.receiver_ctx.message = manifest
+        _, ack = await self.receiver.receive_manifest()
+        return transfer, ack
+
+    async def send_back(self, ack):
+        self.sender_ctx.message = ack
+        transfer, chunks = await self.sender.receive_ack()
+        return transfer, list(chunks)
+
+    async def deliver(self, chunks):
+        acks = []
+        for chunk in chunks:
+            self.receiver_ctx.message = ModelChunk.deserialize(chunk.serialize())
+            _, ack = await self.receiver.receive_chunk()
+            if ack:
+                acks.append(ack)
+        return acks
+
+    async def test_create_transfer(self):
+        transfer, manifest = await self.sender.create_transfer(
+            "to-receiver", stream(TEST_MODEL), chunk_size=CHUNK_SIZE
+        )
+        assert transfer.role == ModelTransfer.ROLE_SENDER
+        assert transfer.state == ModelTransfer.STATE_MANIFEST_SENT
+        assert transfer.thread_id == manifest._id
+        assert manifest.total_size == len(TEST_MODEL)
+        assert len(manifest.chunk_hashes) == 11
+        assert self.sender.blob_store.has_blob(manifest.sha256)
+
+        resumed = self.sender.create_manifest(transfer)
+        assert resumed.serialize() == manifest.serialize()
+
+    async def test_create_transfer_x(self):
+        with self.assertRaises(ModelTransferManagerError):
+            await self.sender.create_transfer(
+                "to-receiver", stream(TEST_MODEL), chunk_size=10 * 1024 * 1024
+            )
+        with self.assertRaises(ModelTransferManagerError):
+            await self.sender.create_transfer("to-receiver", stream(b""))
+
+    async def test_transfer_lost_chunk(self):
+        transfer, ack = await self.offer()
+        assert not ack.complete
+        assert ack.missing == list(range(11))
+
+        _, chunks = await self.send_back(ack)
+        assert [chunk.index for chunk in chunks] == list(range(11))
+
+        lost = chunks.pop(3)
+        acks = await self.deliver(chunks)
+        assert len(acks) == 1
+        assert acks[0].missing == [3]
+        assert acks[0]._thread_id == transfer.thread_id
+
+        _, resend = await self.send_back(acks[0])
+        assert [chunk.index for chunk in resend] == [lost.index]
+        acks = await self.deliver(resend)
+        assert acks[0].complete
+
+        received = await ModelTransfer.retrieve_by_tag_filter(
+            self.receiver_ctx, {"thread_id": transfer.thread_id}
+        )
+        assert received.state == ModelTransfer.STATE_RECEIVED
+        with open(self.receiver.blob_store.blob_path(received.sha256), "rb") as f:
+            assert f.read() == TEST_MODEL
+
+        record, resend = await self.send_back(acks[0])
+        assert record.state == ModelTransfer.STATE_COMPLETE
+        assert not resend
+
+    async def test_resume(self):
+        transfer, ack = await self.offer()
+        _, chunks = await self.send_back(ack)
+        await self.deliver(chunks[:5])
+
+        self.receiver_ctx.message = self.sender.create_manifest(transfer)
+        _, ack = await self.receiver.receive_manifest()
+        assert ack.missing == list(range(5, 11))
+
+    async def test_chunks_read_lazily(self):
+        transfer, _ = await self.offer()
+        with async_mock.patch.object(
+            test_module.BlobStore, "read_chunk", autospec=True, return_value=b"x"
+        ) as mock_read:
+            chunks = self.sender.create_chunks(transfer)
+            assert not mock_read.called
+            next(chunks)
+            assert mock_read.call_count == 1
+
+    async def test_progress_saved_in_batches(self):
+        transfer, ack = await self.offer()
+        _, chunks = await self.send_back(ack)
+        with async_mock.patch.object(test_module, "SAVE_EVERY_CHUNKS", 4):
+            await self.deliver(chunks[:6])
+            stored = await ModelTransfer.retrieve_by_tag_filter(
+                self.receiver_ctx, {"thread_id": transfer.thread_id}
+            )
+            assert stored.received_count == 4
+            assert stored.missing == list(range(4, 11))
+
+            # a restart loses the chunks received since the last save
+            ModelTransferManager._forget(transfer.thread_id)
+            self.receiver_ctx.message = self.sender.create_manifest(transfer)
+            _, ack = await self.receiver.receive_manifest()
+            assert ack.missing == list(range(4, 11))
+
+            acks = await self.deliver(chunks[4:])
+        assert acks[-1].complete
+        assert transfer.thread_id not in ModelTransferManager._states
+
+    async def test_idle_state_dropped(self):
+        transfer, ack = await self.offer()
+        _, chunks = await self.send_back(ack)
+        await self.deliver(chunks[:2])
+        assert transfer.thread_id in ModelTransferManager._states
+
+        with async_mock.patch.object(test_module, "TRANSFER_IDLE_TIMEOUT", -1):
+            ModelTransferManager._state("other-thread")
+        assert transfer.thread_id not in ModelTransferManager._states
+        ModelTransferManager._forget("other-thread")
+
+    async def test_unknown_thread_not_kept(self):
+        self.receiver_ctx.message = ModelChunk.from_binary(0, b"data")
+        with self.assertRaises(StorageNotFoundError):
+            await self.receiver.receive_chunk()
+        assert self.receiver_ctx.message._thread_id not in ModelTransferManager._states
+
+    async def test_background_fetch_failure_logged(self):
+        async def fail():
+            raise ModelTransferManagerError("lost")
+
+        with async_mock.patch.object(test_module.logging, "getLogger") as mock_logger:
+            task = ModelTransferManager.fetch_in_background(fail())
+            assert task in ModelTransferManager._fetches
+            with self.assertRaises(ModelTransferManagerError):
+                await task
+            await asyncio.sleep(0)
+        assert task not in ModelTransferManager._fetches
+        mock_logger.return_value.error.assert_called_once()
+
+    async def test_bad_chunk(self):
+        _, ack = await self.offer()
+        _, chunks = await self.send_back(ack)
+        chunks[0].data = ModelChunk.from_binary(0, b"tampered").data
+        acks = await self.deliver(chunks[:1])
+        assert acks[0].missing == [0]
+        assert not acks[0].complete
+
+    async def test_already_stored(self):
+        with open(self.receiver.blob_store.partial_path("seed"), "wb") as f:
+            f.write(TEST_MODEL)
+        transfer, _ = await self.sender.create_transfer(
+            "to-receiver", stream(TEST_MODEL), chunk_size=CHUNK_SIZE
+        )
+        self.receiver.blob_store.commit("seed", transfer.sha256)
+
+        _, ack = await self.offer()
+        assert ack.complete
+        assert not ack.missing
+
+    async def test_model_link(self):
+        port = unused_port()
+        self.sender_ctx.settings["default_endpoint"] = f"http://127.0.0.1:{port}"
+        transport = HttpTransport("127.0.0.1", port, None, None, self.sender_dir)
+        await transport.start()
+        try:
+            attach = await self.sender.create_model_link(stream(TEST_MODEL))
+            assert attach.data.links == [
+                f"http://127.0.0.1:{port}/blobs/{attach.data.sha256}"
+            ]
+            assert attach.byte_count == len(TEST_MODEL)
+
+            path = await self.receiver.fetch_model(attach)
+            with open(path, "rb") as f:
+                assert f.read() == TEST_MODEL
+
+            attach.data.sha256_ = "0" * 64
+            with self.assertRaises(ModelTransferManagerError):
+                await self.receiver.fetch_model(attach)
+        finally:
+            await transport.stop()
+
+    async def test_model_link_limits(self):
+        port = unused_port()
+        self.sender_ctx.settings["default_endpoint"] = f"http://127.0.0.1:{port}"
+        transport = HttpTransport("127.0.0.1", port, None, None, self.sender_dir)
+        await transport.start()
+        try:
+            attach = await self.sender.create_model_link(stream(TEST_MODEL))
+            self.receiver_ctx.settings["fl.max_model_size"] = len(TEST_MODEL) - 1
+            with self.assertRaises(ModelTransferManagerError):
+                await self.receiver.fetch_model(attach)
+
+            # A link serving more than the advertised size is abandoned
+            del self.receiver_ctx.settings["fl.max_model_size"]
+            attach.byte_count = len(TEST_MODEL) - 1
+            with self.assertRaises(ModelTransferManagerError):
+                await self.receiver.fetch_model(attach)
+            assert not os.listdir(self.receiver.blob_store.partial_root)
+            assert not self.receiver.blob_store.has_blob(attach.data.sha256)
+        finally:
+            await transport.stop()
+
+    async def test_model_link_scheme(self):
+        sha256 = hashlib.sha256(TEST_MODEL).hexdigest()
+        attach = test_module.AttachDecorator.from_link(
+            f"file://{self.sender_dir}/{sha256}", sha256
+        )
+        with async_mock.patch.object(test_module, "ClientSession") as mock_session:
+            session = mock_session.return_value.__aenter__.return_value
+            with self.assertRaises(ModelTransferManagerError):
+                await self.receiver.fetch_model(attach)
+        session.get.assert_not_called()
+
+    async def test_manifest_too_large(self):
+        self.receiver_ctx.settings["fl.max_model_size"] = len(TEST_MODEL) - 1
+        with self.assertRaises(ModelTransferManagerError):
+            await self.offer()
+
+    async def test_model_link_no_endpoint(self):
+        with self.assertRaises(ModelTransferManagerError):
+            await self.sender.create_model_link(stream(TEST_MODEL))
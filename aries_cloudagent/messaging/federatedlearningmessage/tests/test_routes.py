@@ -40,6 +40,45 @@ class TestFederatedLearningMessageRoutes(AsyncTestCase):
             )
             mock_federatedlearning_message.assert_called_once()
 
+    async def test_connections_send_message_binary(self):
+        mock_request = async_mock.MagicMock()
+        mock_request.content_type = "application/octet-stream"
+        mock_request.query = {"content": "{}"}
+        mock_request.content.read = async_mock.CoroutineMock(
+            return_value=b"model-bytes"
+        )
+
+        mock_request.app = {
+            "outbound_message_router": async_mock.CoroutineMock(),
+            "request_context": "context",
+        }
+
+        with async_mock.patch.object(
+            test_module, "ConnectionRecord", autospec=True
+        ) as mock_connection_record, async_mock.patch.object(
+            test_module, "FederatedLearningMessage", autospec=True
+        ) as mock_federatedlearning_message, async_mock.patch.object(
+            test_module, "ConnectionManager", autospec=True
+        ) as mock_conn_manager:
+
+            mock_conn_manager.return_value.log_activity = async_mock.CoroutineMock()
+
+            mock_connection_record.retrieve_by_id = async_mock.CoroutineMock()
+
+            test_module.web.json_response = async_mock.CoroutineMock()
+
+            await test_module.connections_send_federated_learning_message(mock_request)
+            test_module.web.json_response.assert_called_once_with({})
+            mock_request.json.assert_not_called()
+
+            mock_federatedlearning_message.assert_called_once()
+            kwargs = mock_federatedlearning_message.call_args[1]
+            assert kwargs["content"] == "{}"
+            assert kwargs["model_attach"][0].binary == b"model-bytes"
+
+            meta = mock_conn_manager.return_value.log_activity.call_args[0][3]
+            assert meta["model_sha256"] == kwargs["model_attach"][0].data.sha256
+
     async def test_connections_send_message_no_conn_record(self):
         mock_request = async_mock.MagicMock()
         mock_request.json = async_mock.CoroutineMock()
@@ -96,3 +135,427 @@ class TestFederatedLearningMessageRoutes(AsyncTestCase):
 
             await test_module.connections_send_federated_learning_message(mock_request)
             mock_federatedlearning_message.assert_not_called()
+
+    async def test_connections_send_model(self):
+        mock_request = async_mock.MagicMock()
+        mock_request.match_info = {"id": "conn-id"}
+        mock_request.query = {"content": "{}", "chunk_size": "1024"}
+        mock_request.app = {
+            "outbound_message_router": async_mock.CoroutineMock(),
+            "request_context": "context",
+        }
+
+        with async_mock.patch.object(
+            test_module, "ConnectionRecord", autospec=True
+        ) as mock_connection_record, async_mock.patch.object(
+            test_module, "ModelTransferManager", autospec=True
+        ) as mock_transfer_mgr, async_mock.patch.object(
+            test_module, "ConnectionManager", autospec=True
+        ) as mock_conn_manager:
+
+            mock_conn_manager.return_value.log_activity = async_mock.CoroutineMock()
+            mock_connection_record.retrieve_by_id = async_mock.CoroutineMock()
+            mock_transfer = async_mock.MagicMock(sha256="a" * 64)
+            mock_transfer_mgr.return_value.create_transfer = async_mock.CoroutineMock(
+                return_value=(mock_transfer, "manifest")
+            )
+
+            test_module.web.json_response = async_mock.CoroutineMock()
+
+            await test_module.connections_send_federated_learning_model(mock_request)
+            kwargs = mock_transfer_mgr.return_value.create_transfer.call_args[1]
+            assert kwargs["content"] == "{}"
+            assert kwargs["chunk_size"] == 1024
+            mock_request.app["outbound_message_router"].assert_called_once_with(
+                "manifest", connection_id="conn-id"
+            )
+            test_module.web.json_response.assert_called_once_with(
+                mock_transfer.serialize.return_value
+            )
+            meta = mock_conn_manager.return_value.log_activity.call_args[0][3]
+            assert meta["model_sha256"] == "a" * 64
+
+    async def test_connections_send_model_not_ready(self):
+        mock_request = async_mock.MagicMock()
+        mock_request.query = {}
+        mock_request.app = {
+            "outbound_message_router": async_mock.CoroutineMock(),
+            "request_context": "context",
+        }
+
+        with async_mock.patch.object(
+            test_module, "ConnectionRecord", autospec=True
+        ) as mock_connection_record:
+            mock_connection_record.retrieve_by_id = async_mock.CoroutineMock(
+                return_value=async_mock.MagicMock(is_ready=False)
+            )
+            with self.assertRaises(test_module.web.HTTPBadRequest):
+                await test_module.connections_send_federated_learning_model(
+                    mock_request
+                )
+
+    async def test_connections_send_evaluation_request(self):
+        mock_request = async_mock.MagicMock()
+        mock_request.match_info = {"id": "conn-id"}
+        mock_request.query = {
+            "content": "{}",
+            "job_id": "job-id",
+            "round_number": "4",
+        }
+        mock_request.app = {
+            "outbound_message_router": async_mock.CoroutineMock(),
+            "request_context": "context",
+        }
+
+        with async_mock.patch.object(
+            test_module, "ConnectionRecord", autospec=True
+        ) as mock_connection_record, async_mock.patch.object(
+            test_module, "ModelTransferManager", autospec=True
+        ) as mock_transfer_mgr:
+            mock_connection_record.retrieve_by_id = async_mock.CoroutineMock()
+            attach = test_module.AttachDecorator.from_link(
+                "http://localhost/blobs/x", "a" * 64
+            )
+            mock_transfer_mgr.return_value.create_model_link = (
+                async_mock.CoroutineMock(return_value=attach)
+            )
+
+            test_module.web.json_response = async_mock.MagicMock()
+
+            await test_module.connections_send_fl_evaluation_request(mock_request)
+            msg = mock_request.app["outbound_message_router"].call_args[0][0]
+            assert isinstance(msg, test_module.FLEvaluationRequest)
+            assert msg.model_sha256 == "a" * 64
+            assert msg.job_id == "job-id"
+            assert msg.round_number == 4
+            assert msg.content == "{}"
+            test_module.web.json_response.assert_called_once_with(
+                {"thread_id": msg._thread_id, "model_sha256": "a" * 64}
+            )
+
+    async def test_connections_send_evaluation_request_bad_round(self):
+        mock_request = async_mock.MagicMock()
+        mock_request.query = {"round_number": "four"}
+        mock_request.app = {
+            "outbound_message_router": async_mock.CoroutineMock(),
+            "request_context": "context",
+        }
+
+        with self.assertRaises(test_module.web.HTTPBadRequest):
+            await test_module.connections_send_fl_evaluation_request(mock_request)
+
+    async def test_connections_send_evaluation_result(self):
+        mock_request = async_mock.MagicMock()
+        mock_request.match_info = {"id": "conn-id"}
+        mock_request.json = async_mock.CoroutineMock(
+            return_value={
+                "thread_id": "request-id",
+                "model_sha256": "a" * 64,
+                "metrics": {"samples": 10},
+            }
+        )
+        mock_request.app = {
+            "outbound_message_router": async_mock.CoroutineMock(),
+            "request_context": "context",
+        }
+
+        with async_mock.patch.object(
+            test_module, "ConnectionRecord", autospec=True
+        ) as mock_connection_record:
+            mock_connection_record.retrieve_by_id = async_mock.CoroutineMock()
+
+            test_module.web.json_response = async_mock.MagicMock()
+
+            await test_module.connections_send_fl_evaluation_result(mock_request)
+            msg = mock_request.app["outbound_message_router"].call_args[0][0]
+            assert isinstance(msg, test_module.FLEvaluationResult)
+            assert msg._thread_id == "request-id"
+            assert msg.metrics == {"samples": 10}
+
+    async def test_connections_send_evaluation_result_not_ready(self):
+        mock_request = async_mock.MagicMock()
+        mock_request.json = async_mock.CoroutineMock(return_value={})
+        mock_request.app = {
+            "outbound_message_router": async_mock.CoroutineMock(),
+            "request_context": "context",
+        }
+
+        with async_mock.patch.object(
+            test_module, "ConnectionRecord", autospec=True
+        ) as mock_connection_record:
+            mock_connection_record.retrieve_by_id = async_mock.CoroutineMock(
+                return_value=async_mock.MagicMock(is_ready=False)
+            )
+            with self.assertRaises(test_module.web.HTTPBadRequest):
+                await test_module.connections_send_fl_evaluation_result(mock_request)
+            mock_request.app["outbound_message_router"].assert_not_called()
+
+    async def test_model_transfer_resume(self):
+        mock_request = async_mock.MagicMock()
+        mock_request.match_info = {"transfer_id": "transfer-id"}
+        mock_request.app = {
+            "outbound_message_router": async_mock.CoroutineMock(),
+            "request_context": "context",
+        }
+
+        with async_mock.patch.object(
+            test_module, "ModelTransfer", autospec=True
+        ) as mock_transfer_cls, async_mock.patch.object(
+            test_module, "ModelTransferManager", autospec=True
+        ) as mock_transfer_mgr:
+            mock_transfer_cls.ROLE_SENDER = "sender"
+            mock_transfer_cls.STATE_MANIFEST_SENT = "manifest_sent"
+            mock_transfer_cls.retrieve_by_id = async_mock.CoroutineMock(
+                return_value=async_mock.MagicMock(
+                    role="sender", state="manifest_sent", connection_id="conn-id"
+                )
+            )
+            test_module.web.json_response = async_mock.CoroutineMock()
+
+            await test_module.model_transfer_resume(mock_request)
+            mock_request.app["outbound_message_router"].assert_called_once_with(
+                mock_transfer_mgr.return_value.create_manifest.return_value,
+                connection_id="conn-id",
+            )
+
+    async def test_model_transfer_retrieve_not_found(self):
+        mock_request = async_mock.MagicMock()
+        mock_request.match_info = {"transfer_id": "transfer-id"}
+        mock_request.app = {"request_context": "context"}
+
+        with async_mock.patch.object(
+            test_module, "ModelTransfer", autospec=True
+        ) as mock_transfer_cls:
+            mock_transfer_cls.retrieve_by_id = async_mock.CoroutineMock(
+                side_effect=StorageNotFoundError()
+            )
+            with self.assertRaises(test_module.web.HTTPNotFound):
+                await test_module.model_transfer_retrieve(mock_request)
+
+    async def test_fl_job_create(self):
+        mock_request = async_mock.MagicMock()
+        mock_request.json = async_mock.CoroutineMock(
+            return_value={"round_mode": "parallel", "participants": ["conn-id"]}
+        )
+        mock_request.app = {"request_context": "context"}
+
+        with async_mock.patch.object(
+            test_module.FLJob, "save", autospec=True
+        ) as mock_save:
+            test_module.web.json_response = async_mock.MagicMock()
+
+            await test_module.fl_job_create(mock_request)
+            mock_save.assert_called_once()
+            result = test_module.web.json_response.call_args[0][0]
+            assert result["round_mode"] == "parallel"
+            assert result["participants"] == ["conn-id"]
+            assert result["state"] == test_module.FLJob.STATE_ACTIVE
+
+    async def test_fl_job_update_bad_state(self):
+        mock_request = async_mock.MagicMock()
+        mock_request.match_info = {"job_id": "job-id"}
+        mock_request.json = async_mock.CoroutineMock(return_value={"state": "bogus"})
+        mock_request.app = {"request_context": "context"}
+
+        with async_mock.patch.object(
+            test_module.FLJob, "retrieve_by_id", async_mock.CoroutineMock()
+        ):
+            with self.assertRaises(test_module.web.HTTPBadRequest):
+                await test_module.fl_job_update(mock_request)
+
+    async def test_fl_job_checkpoint(self):
+        mock_request = async_mock.MagicMock()
+        mock_request.match_info = {"job_id": "job-id"}
+        mock_request.query = {"round": "3"}
+        mock_request.app = {"request_context": "context"}
+        job = test_module.FLJob(job_id="job-id", round_mode="parallel")
+
+        with async_mock.patch.object(
+            test_module.FLJob,
+            "retrieve_by_id",
+            async_mock.CoroutineMock(return_value=job),
+        ), async_mock.patch.object(
+            test_module, "ModelTransferManager", autospec=True
+        ) as mock_transfer_mgr, async_mock.patch.object(
+            test_module.FLJob, "save", autospec=True
+        ) as mock_save:
+            mock_transfer_mgr.return_value.blob_store.write_stream = (
+                async_mock.CoroutineMock(return_value=("a" * 64, 10, []))
+            )
+            test_module.web.json_response = async_mock.MagicMock()
+
+            await test_module.fl_job_checkpoint(mock_request)
+            mock_save.assert_called_once()
+            assert job.current_round == 3
+            assert job.model_sha256 == "a" * 64
+
+    async def test_fl_job_checkpoint_removes_superseded(self):
+        mock_request = async_mock.MagicMock()
+        mock_request.match_info = {"job_id": "job-id"}
+        mock_request.query = {"round": "4"}
+        mock_request.app = {"request_context": "context"}
+        job = test_module.FLJob(job_id="job-id")
+        other = test_module.FLJob(job_id="other-id", model_sha256="c" * 64)
+
+        for transfers, removed in (([], True), ([async_mock.MagicMock()], False)):
+            job.model_sha256 = "b" * 64
+            job.previous_sha256 = "d" * 64
+            with async_mock.patch.object(
+                test_module.FLJob,
+                "retrieve_by_id",
+                async_mock.CoroutineMock(return_value=job),
+            ), async_mock.patch.object(
+                test_module.FLJob,
+                "query",
+                async_mock.CoroutineMock(return_value=[job, other]),
+            ), async_mock.patch.object(
+                test_module.ModelTransfer,
+                "query",
+                async_mock.CoroutineMock(return_value=transfers),
+            ) as mock_transfer_query, async_mock.patch.object(
+                test_module, "ModelTransferManager", autospec=True
+            ) as mock_transfer_mgr, async_mock.patch.object(
+                test_module.FLJob, "save", autospec=True
+            ):
+                blob_store = mock_transfer_mgr.return_value.blob_store
+                blob_store.write_stream = async_mock.CoroutineMock(
+                    return_value=("a" * 64, 10, [])
+                )
+                test_module.web.json_response = async_mock.MagicMock()
+
+                await test_module.fl_job_checkpoint(mock_request)
+                mock_transfer_query.assert_called_once_with(
+                    "context", {"sha256": "d" * 64}
+                )
+                assert blob_store.remove.called == removed
+                if removed:
+                    blob_store.remove.assert_called_once_with("d" * 64)
+                # The model sent out for the round just checkpointed is kept
+                assert job.previous_sha256 == "b" * 64
+
+    async def test_fl_job_checkpoint_keeps_previous(self):
+        mock_request = async_mock.MagicMock()
+        mock_request.match_info = {"job_id": "job-id"}
+        mock_request.query = {"round": "1"}
+        mock_request.app = {"request_context": "context"}
+        job = test_module.FLJob(job_id="job-id", model_sha256="b" * 64)
+
+        with async_mock.patch.object(
+            test_module.FLJob,
+            "retrieve_by_id",
+            async_mock.CoroutineMock(return_value=job),
+        ), async_mock.patch.object(
+            test_module, "ModelTransferManager", autospec=True
+        ) as mock_transfer_mgr, async_mock.patch.object(
+            test_module.FLJob, "save", autospec=True
+        ):
+            blob_store = mock_transfer_mgr.return_value.blob_store
+            blob_store.write_stream = async_mock.CoroutineMock(
+                return_value=("a" * 64, 10, [])
+            )
+            test_module.web.json_response = async_mock.MagicMock()
+
+            await test_module.fl_job_checkpoint(mock_request)
+            blob_store.remove.assert_not_called()
+            assert job.previous_sha256 == "b" * 64
+
+            # Checkpointing the same model again keeps the previous one
+            await test_module.fl_job_checkpoint(mock_request)
+            blob_store.remove.assert_not_called()
+            assert job.previous_sha256 == "b" * 64
+
+    async def test_fl_job_checkpoint_keeps_blob_of_other_job(self):
+        mock_request = async_mock.MagicMock()
+        mock_request.match_info = {"job_id": "job-id"}
+        mock_request.query = {"round": "4"}
+        mock_request.app = {"request_context": "context"}
+        job = test_module.FLJob(
+            job_id="job-id", model_sha256="b" * 64, previous_sha256="d" * 64
+        )
+        other = test_module.FLJob(
+            job_id="other-id", model_sha256="c" * 64, previous_sha256="d" * 64
+        )
+
+        with async_mock.patch.object(
+            test_module.FLJob,
+            "retrieve_by_id",
+            async_mock.CoroutineMock(return_value=job),
+        ), async_mock.patch.object(
+            test_module.FLJob,
+            "query",
+            async_mock.CoroutineMock(return_value=[job, other]),
+        ), async_mock.patch.object(
+            test_module.ModelTransfer,
+            "query",
+            async_mock.CoroutineMock(return_value=[]),
+        ), async_mock.patch.object(
+            test_module, "ModelTransferManager", autospec=True
+        ) as mock_transfer_mgr, async_mock.patch.object(
+            test_module.FLJob, "save", autospec=True
+        ):
+            blob_store = mock_transfer_mgr.return_value.blob_store
+            blob_store.write_stream = async_mock.CoroutineMock(
+                return_value=("a" * 64, 10, [])
+            )
+            test_module.web.json_response = async_mock.MagicMock()
+
+            await test_module.fl_job_checkpoint(mock_request)
+            blob_store.remove.assert_not_called()
+
+    async def test_fl_job_checkpoint_bad_round(self):
+        mock_request = async_mock.MagicMock()
+        mock_request.match_info = {"job_id": "job-id"}
+        mock_request.query = {"round": "three"}
+        mock_request.app = {"request_context": "context"}
+
+        with self.assertRaises(test_module.web.HTTPBadRequest):
+            await test_module.fl_job_checkpoint(mock_request)
+
+    async def test_fl_job_retrieve_not_found(self):
+        mock_request = async_mock.MagicMock()
+        mock_request.match_info = {"job_id": "job-id"}
+        mock_request.app = {"request_context": "context"}
+
+        with async_mock.patch.object(
+            test_module.FLJob,
+            "retrieve_by_id",
+            async_mock.CoroutineMock(side_effect=StorageNotFoundError()),
+        ):
+            with self.assertRaises(test_module.web.HTTPNotFound):
+                await test_module.fl_job_retrieve(mock_request)
+
+    async def test_fl_round_create_and_list(self):
+        mock_request = async_mock.MagicMock()
+        mock_request.match_info = {"job_id": "job-id"}
+        mock_request.json = async_mock.CoroutineMock(
+            return_value={"state": "aggregated", "round_number": 2, "bogus": 1}
+        )
+        mock_request.query = {}
+        mock_request.app = {"request_context": "context"}
+
+        with async_mock.patch.object(
+            test_module.FLJob, "retrieve_by_id", async_mock.CoroutineMock()
+        ), async_mock.patch.object(
+            test_module.FLRound, "save", autospec=True
+        ) as mock_save, async_mock.patch.object(
+            test_module.FLRound,
+            "query",
+            async_mock.CoroutineMock(
+                return_value=[
+                    test_module.FLRound(job_id="job-id", round_number=2),
+                    test_module.FLRound(job_id="job-id", round_number=1),
+                ]
+            ),
+        ) as mock_query:
+            test_module.web.json_response = async_mock.MagicMock()
+
+            await test_module.fl_round_create(mock_request)
+            mock_save.assert_called_once()
+            result = test_module.web.json_response.call_args[0][0]
+            assert result["job_id"] == "job-id"
+            assert result["round_number"] == 2
+
+            await test_module.fl_round_list(mock_request)
+            mock_query.assert_called_once_with("context", {"job_id": "job-id"})
+            results = test_module.web.json_response.call_args[0][0]["results"]
+            assert [r["round_number"] for r in results] == [1, 2]
@@ -0,0 +1,173 @@
+"""Content-addressed on-disk storage for federated learning model blobs."""
+
+import hashlib
+import os
+import re
+import tempfile
+import uuid
+
+from typing import AsyncIterable, Sequence, Tuple
+
+from ..error import BaseError
+
+SHA256_RE = re.compile(r"^[a-f0-9]{64}$")
+
+
+class BlobStoreError(BaseError):
+    """Blob store error."""
+
+
+class BlobStore:
+    """Store model files on disk, keyed by the sha-256 hash of their content."""
+
+    DEFAULT_ROOT = os.path.join(tempfile.gettempdir(), "aries_fl_models")
+    READ_SIZE = 64 * 1024
+
+    def __init__(self, root: str = None):
+        """
+        Initialize a BlobStore.
+
+        Args:
+            root: directory holding the blobs, created on first use
+        """
+        self.root = root or self.DEFAULT_ROOT
+        self.partial_root = os.path.join(self.root, "partial")
+        os.makedirs(self.partial_root, exist_ok=True)
+
+    def blob_path(self, sha256: str) -> str:
+        """Return the path of the blob with the given hash."""
+        if not sha256 or not SHA256_RE.match(sha256):
+            raise BlobStoreError(f"Not a valid sha256 blob identifier: {sha256}")
+        return os.path.join(self.root, sha256)
+
+    def has_blob(self, sha256: str) -> bool:
+        """Check whether a blob with the given hash is stored."""
+        return os.path.isfile(self.blob_path(sha256))
+
+    def partial_path(self, name: str) -> str:
+        """Return the path of a partially written blob."""
+        return os.path.join(self.partial_root, name)
+
+    def allocate(self, name: str, size: int) -> str:
+        """
+        Create a partial blob file of the given size for out-of-order writes.
+
+        Args:
+            name: partial blob name, unique per transfer
+            size: final size of the blob in bytes
+        """
+        path = self.partial_path(name)
+        if not os.path.exists(path):
+            with open(path, "wb") as partial:
+                partial.truncate(size)
+        return path
+
+    def write_at(self, name: str, offset: int, data: bytes):
+        """Write data into a partial blob at the given offset."""
+        with open(self.partial_path(name), "r+b") as partial:
+            partial.seek(offset)
+            partial.write(data)
+
+    def commit(self, name: str, sha256: str) -> str:
+        """
+        Check the hash of a partial blob and move it into the store.
+
+        Args:
+            name: partial blob name
+            sha256: expected hash of the complete blob
+
+        Returns:
+            The path of the stored blob
+
+        """
+        path = self.partial_path(name)
+        digest = hashlib.sha256()
+        with open(path, "rb") as partial:
+            for block in iter(lambda: partial.read(self.READ_SIZE), b""):
+                digest.update(block)
+        if digest.hexdigest() != sha256:
+            os.remove(path)
+            raise BlobStoreError(f"Blob content does not match sha256 {sha256}")
+        blob_path = self.blob_path(sha256)
+        os.replace(path, blob_path)
+        return blob_path
+
+    def remove(self, sha256: str):
+        """Remove the blob with the given hash, if present."""
+        path = self.blob_path(sha256)
+        if os.path.exists(path):
+            os.remove(path)
+
+    def discard(self, name: str):
+        """Remove a partial blob, if present."""
+        path = self.partial_path(name)
+        if os.path.exists(path):
+            os.remove(path)
+
+    async def write_stream(
+        self,
+        stream: AsyncIterable[bytes],
+        chunk_size: int = None,
+        sha256: str = None,
+        max_size: int = None,
+    ) -> Tuple[str, int, Sequence[str]]:
+        """
+        Write a byte stream into the store, hashing it as it goes.
+
+        Args:
+            stream: async iterable of byte blocks of any size
+            chunk_size: size of the transfer chunks to hash separately, if any
+            sha256: expected hash of the content, if known
+            max_size: size in bytes past which the stream is abandoned, if any
+
+        Returns:
+            A tuple (sha256 of the content, size in bytes, sha256 of each chunk)
+
+        """
+        name = str(uuid.uuid4())
+        digest = hashlib.sha256()
+        chunk_digest = hashlib.sha256()
+        chunk_fill = 0
+        chunk_hashes = []
+        size = 0
+
+        try:
+            with open(self.partial_path(name), "wb") as partial:
+                async for block in stream:
+                    if max_size is not None and size + len(block) > max_size:
+                        raise BlobStoreError(f"Blob content exceeds {max_size} bytes")
+                    partial.write(block)
+                    digest.update(block)
+                    size += len(block)
+                    view = memoryview(block) if chunk_size else None
+                    while view:
+                        take = min(len(view), chunk_size - chunk_fill)
+                        chunk_digest.update(view[:take])
+                        chunk_fill += take
+                        view = view[take:]
+                        if chunk_fill == chunk_size:
+                            chunk_hashes.append(chunk_digest.hexdigest())
+                            chunk_digest = hashlib.sha256()
+                            chunk_fill = 0
+        except BaseException:
+            # a stream cut short leaves no partial file behind
+            self.discard(name)
+            raise
+        if chunk_fill:
+            chunk_hashes.append(chunk_digest.hexdigest())
+
+        if sha256 and digest.hexdigest() != sha256:
+            self.discard(name)
+            raise BlobStoreError(f"Blob content does not match sha256 {sha256}")
+        sha256 = digest.hexdigest()
+        if self.has_blob(sha256):
+            self.discard(name)
+        else:
+            os.replace(self.partial_path(name), self.blob_path(sha256))
+        return sha256, size, chunk_hashes
+
+    def read_chunk(self, sha256: str, index: int, chunk_size: int) -> bytes:
+        """Read one transfer chunk of a stored blob."""
+        with open(self.blob_path(sha256), "rb") as blob:
+            blob.seek(index * chunk_size)
+            return blob.read(chunk_size)
@@ -6,6 +6,7 @@ from typing import Coroutine
 
 from aiohttp import web
 
+from ...storage.blob_store import BlobStore, BlobStoreError
 from .base import BaseInboundTransport, InboundTransportSetupError
 
 
@@ -18,6 +19,7 @@ class HttpTransport(BaseInboundTransport):
         port: int,
         message_router: Coroutine,
         register_socket: Coroutine,
+        blob_dir: str = None,
     ) -> None:
         """
         Initialize a Transport instance.
@@ -27,12 +29,14 @@ class HttpTransport(BaseInboundTransport):
             port: Port to listen on
             message_router: Function to pass incoming messages to
             register_socket: A coroutine for registering a new socket
+            blob_dir: Directory of the content-addressed model files to serve
 
         """
         self.host = host
         self.port = port
         self.message_router = message_router
         self.register_socket = register_socket
+        self.blob_store = BlobStore(blob_dir)
         self.site = None
 
         self._scheme = "http"
@@ -48,6 +52,7 @@ class HttpTransport(BaseInboundTransport):
         app = web.Application()
         app.add_routes([web.get("/", self.invite_message_handler)])
         app.add_routes([web.post("/", self.inbound_message_handler)])
+        app.add_routes([web.get("/blobs/{sha256}", self.blob_handler)])
         return app
 
     async def start(self) -> None:
@@ -143,3 +148,25 @@ class HttpTransport(BaseInboundTransport):
             )
         else:
             return web.Response(status=200)
+
+    async def blob_handler(self, request: web.BaseRequest):
+        """
+        Serve content-addressed model files to other agents.
+
+        Args:
+            request: aiohttp request object
+
+        Returns:
+            The file response
+
+        """
+        sha256 = request.match_info["sha256"]
+        try:
+            if not self.blob_store.has_blob(sha256):
+                raise web.HTTPNotFound()
+            path = self.blob_store.blob_path(sha256)
+        except BlobStoreError:
+            raise web.HTTPNotFound()
+        return web.FileResponse(
+            path, headers={"Content-Type": "application/octet-stream"}
+        )
@@ -7,6 +7,7 @@ from .base import (
     InboundTransportConfiguration,
     InboundTransportRegistrationError,
 )
+from .http import HttpTransport
 from ...classloader import ClassLoader, ModuleLoadError, ClassNotFoundError
 
 MODULE_BASE_PATH = "aries_cloudagent.transport.inbound"
@@ -15,8 +16,14 @@ MODULE_BASE_PATH = "aries_cloudagent.transport.inbound"
 class InboundTransportManager:
     """Inbound transport manager class."""
 
-    def __init__(self):
-        """Initialize an `InboundTransportManager` instance."""
+    def __init__(self, blob_dir: str = None):
+        """
+        Initialize an `InboundTransportManager` instance.
+
+        Args:
+            blob_dir: Directory of model files for HTTP transports to serve
+        """
+        self.blob_dir = blob_dir
         self.logger = logging.getLogger(__name__)
         self.class_loader = ClassLoader(MODULE_BASE_PATH, BaseInboundTransport)
         self.registered_transports = []
@@ -42,8 +49,11 @@ class InboundTransportManager:
                 f"Failed to load module {config.module}"
             )
 
+        options = {}
+        if issubclass(imported_class, HttpTransport):
+            options["blob_dir"] = self.blob_dir
         instance = imported_class(
-            config.host, config.port, message_handler, register_socket
+            config.host, config.port, message_handler, register_socket, **options
         )
         self.register_instance(instance)
 
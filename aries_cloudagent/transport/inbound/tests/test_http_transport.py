@@ -1,5 +1,9 @@
 import asyncio
+import hashlib
 import json
+import os
+import shutil
+import tempfile
 
 from aiohttp.test_utils import AioHTTPTestCase, unittest_run_loop, unused_port
 from aiohttp import web
@@ -12,12 +16,17 @@ class TestHttpTransport(AioHTTPTestCase):
         self.message_results = []
         self.port = unused_port()
         self.transport = None
+        self.blob_dir = tempfile.mkdtemp()
         super(TestHttpTransport, self).setUp()
 
+    def tearDown(self):
+        super(TestHttpTransport, self).tearDown()
+        shutil.rmtree(self.blob_dir)
+
     def get_transport(self):
         if not self.transport:
             self.transport = HttpTransport(
-                "0.0.0.0", self.port, self.receive_message, None
+                "0.0.0.0", self.port, self.receive_message, None, self.blob_dir
             )
         return self.transport
 
@@ -40,3 +49,19 @@ class TestHttpTransport(AioHTTPTestCase):
         assert await resp.json() == {"response": "ok"}
 
         await self.transport.stop()
+
+    @unittest_run_loop
+    async def test_blob(self):
+        blob = b"model-bytes"
+        sha256 = hashlib.sha256(blob).hexdigest()
+        with open(os.path.join(self.blob_dir, sha256), "wb") as f:
+            f.write(blob)
+
+        resp = await self.client.get(f"/blobs/{sha256}")
+        assert resp.status == 200
+        assert await resp.read() == blob
+
+        resp = await self.client.get(f"/blobs/{'0' * 64}")
+        assert resp.status == 404
+        resp = await self.client.get("/blobs/..%2Fsecret")
+        assert resp.status == 404
@@ -19,6 +19,13 @@ class TestInboundTransportManager(AsyncTestCase):
         with self.assertRaises(InboundTransportRegistrationError):
             mgr.register(config, None, None)
 
+    def test_register_blob_dir(self):
+        mgr = InboundTransportManager("/tmp/fl-models")
+
+        config = InboundTransportConfiguration(module="http", host="0.0.0.0", port=80)
+        mgr.register(config, None, None)
+        assert mgr.registered_transports[0].blob_store.root == "/tmp/fl-models"
+
     async def test_start_stop(self):
         transport = async_mock.MagicMock()
         transport.start = async_mock.CoroutineMock()
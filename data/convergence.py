@@ -0,0 +1,107 @@
+import math
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from demo.runners.support.utils import log_msg
+
+
+# Runs of rounds stop by themselves: when the validation metric has not improved
+# on its best by more than PLATEAU_TOLERANCE for PLATEAU_ROUNDS rounds in a row,
+# after MAX_ROUNDS rounds, or when the time or byte budget (0 for none) would
+# not cover another round as costly as the last one.
+#   loss: validation loss, lower is better
+#   auc: validation AUC, higher is better
+STOP_METRICS = ('loss', 'auc')
+STOP_METRIC = os.getenv('FL_STOP_METRIC', 'loss')
+PLATEAU_ROUNDS = int(os.getenv('FL_PLATEAU_ROUNDS', '5'))
+PLATEAU_TOLERANCE = float(os.getenv('FL_PLATEAU_TOLERANCE', '0.001'))
+MAX_ROUNDS = int(os.getenv('FL_MAX_ROUNDS', '50'))
+TIME_BUDGET = float(os.getenv('FL_TIME_BUDGET', '0'))
+BYTE_BUDGET = int(float(os.getenv('FL_BYTE_BUDGET_MB', '0')) * 1024 * 1024)
+
+STOP_PLATEAU = 'plateau'
+STOP_MAX_ROUNDS = 'max_rounds'
+STOP_TIME_BUDGET = 'time_budget'
+STOP_BYTE_BUDGET = 'byte_budget'
+
+
+class ConvergenceMonitor:
+    def __init__(self, metric=STOP_METRIC, patience=PLATEAU_ROUNDS, tolerance=PLATEAU_TOLERANCE,
+                 max_rounds=MAX_ROUNDS, time_budget=TIME_BUDGET, byte_budget=BYTE_BUDGET):
+        if metric not in STOP_METRICS:
+            raise ValueError('Unknown stop metric: ' + str(metric))
+        self.metric = metric
+        self.patience = patience
+        self.tolerance = tolerance
+        self.max_rounds = max_rounds
+        self.time_budget = time_budget
+        self.byte_budget = byte_budget
+        self.rounds = []
+        self.best = None
+        self.best_round = None
+        self.stale_rounds = 0
+        self.seconds = 0.0
+        self.bytes = 0
+        self.stop_reason = None
+
+    def improvement(self, value):
+        if self.best is None:
+            return math.inf
+        return self.best - value if self.metric == 'loss' else value - self.best
+
+    def record(self, round_number, metrics, seconds, num_bytes):
+        # Returns why the run should stop after this round, or None to go on
+        value = (metrics or {}).get(self.metric)
+        self.seconds += seconds
+        self.bytes += num_bytes
+        if value is None:
+            # A round without a usable metric, e.g. no quorum, counts as no progress
+            self.stale_rounds += 1
+        elif self.improvement(value) > self.tolerance:
+            self.stale_rounds = 0
+        else:
+            self.stale_rounds += 1
+        if value is not None and (self.best is None or self.improvement(value) > 0):
+            self.best = value
+            self.best_round = round_number
+
+        entry = {
+            'round': round_number,
+            'loss': (metrics or {}).get('loss'),
+            'auc': (metrics or {}).get('auc'),
+            'accuracy': (metrics or {}).get('accuracy'),
+            'best': self.best,
+            'best_round': self.best_round,
+            'stale_rounds': self.stale_rounds,
+            'seconds': round(seconds, 2),
+            'bytes': num_bytes,
+            'total_seconds': round(self.seconds, 2),
+            'total_bytes': self.bytes,
+        }
+        self.rounds.append(entry)
+
+        if self.patience and self.stale_rounds >= self.patience:
+            self.stop_reason = STOP_PLATEAU
+        elif self.max_rounds and len(self.rounds) >= self.max_rounds:
+            self.stop_reason = STOP_MAX_ROUNDS
+        elif self.time_budget and self.seconds + seconds > self.time_budget:
+            self.stop_reason = STOP_TIME_BUDGET
+        elif self.byte_budget and self.bytes + num_bytes > self.byte_budget:
+            self.stop_reason = STOP_BYTE_BUDGET
+        entry['stop'] = self.stop_reason
+        if self.stop_reason:
+            log_msg("STOPPING AFTER ROUND", round_number, "ON", self.stop_reason, "BEST", self.metric, self.best,
+                    "IN ROUND", self.best_round)
+        return self.stop_reason
+
+    def summary(self):
+        return {
+            'metric': self.metric,
+            'rounds': len(self.rounds),
+            'best': self.best,
+            'best_round': self.best_round,
+            'seconds': round(self.seconds, 2),
+            'bytes': self.bytes,
+            'stop': self.stop_reason,
+        }
@@ -0,0 +1,170 @@
+import datetime
+import math
+import os
+import socket
+import sys
+
+import torch
+import torch.distributed as dist
+import torch.multiprocessing as mp
+from torch.nn.parallel import DistributedDataParallel
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from demo.runners.support.utils import log_msg
+from data import model_format
+from data.parameter_groups import freeze
+from data.trainer import TrainingConfig, make_optimizer, make_scheduler, train
+
+
+# Data-parallel training on one machine: the dataset is split into equal shards,
+# one per process, each process trains a replica of the model on its shard, and
+# gradients are averaged over torch.distributed's gloo backend after every batch,
+# so all replicas take the same steps. The calling process is rank 0 and trains
+# the caller's own model and optimizer in place, so they carry on across rounds
+# as with data/trainer.py; ranks 1 to N-1 are started for the call only.
+# Datasets with fewer than min_samples_per_worker samples per process, or a
+# workers setting of 1, train in the calling process alone.
+BACKEND = 'gloo'
+HOST = '127.0.0.1'
+# How long a rank waits for the others before giving up
+TIMEOUT = datetime.timedelta(seconds=int(os.getenv('FL_DISTRIBUTED_TIMEOUT', '600')))
+
+
+def cpu_count():
+    return os.cpu_count() or 1
+
+
+def worker_count(num_samples, config):
+    workers = config.workers or cpu_count()
+    return max(1, min(workers, num_samples // max(1, config.min_samples_per_worker)))
+
+
+def thread_count(world_size, config):
+    # Cores are shared out between the ranks unless set explicitly
+    return config.threads or max(1, cpu_count() // world_size)
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind((HOST, 0))
+        return s.getsockname()[1]
+
+
+def shard(tensor, rank, world_size, shard_size):
+    # Equal shards: every rank runs the same number of batches, so the same all-reduces
+    return tensor[rank::world_size][:shard_size].contiguous()
+
+
+def shard_config(config, world_size):
+    # The batch is split between the ranks, so a step still averages batch_size samples
+    settings = config.as_dict()
+    settings['batch_size'] = max(1, int(math.ceil(config.batch_size / world_size)))
+    return TrainingConfig(**settings)
+
+
+def all_reduce_sum(values):
+    totals = torch.tensor(values, dtype=torch.float64)
+    dist.all_reduce(totals)
+    return totals.tolist()
+
+
+def join_group(rank, world_size, port):
+    dist.init_process_group(
+        BACKEND,
+        init_method='tcp://{}:{}'.format(HOST, port),
+        rank=rank,
+        world_size=world_size,
+        timeout=TIMEOUT,
+    )
+
+
+def replica(rank, world_size, port, model_bytes, optimizer_state, features, labels, settings, threads,
+            frozen=(), scheduler_state=None):
+    # Runs in ranks 1 to N-1; frozen names the parameters rank 0 does not train,
+    # and scheduler_state is rank 0's learning rate schedule if it carries one on
+    torch.set_num_threads(threads)
+    join_group(rank, world_size, port)
+    try:
+        config = TrainingConfig(**settings)
+        model = model_format.loads(model_bytes)
+        freeze(model, frozen)
+        optimizer = make_optimizer(model, config)
+        optimizer.load_state_dict(optimizer_state)
+        scheduler = None
+        if scheduler_state is not None:
+            scheduler = make_scheduler(optimizer, config)
+            scheduler.load_state_dict(scheduler_state)
+        train(
+            DistributedDataParallel(model), features, labels, config, None, optimizer,
+            reduce=all_reduce_sum, scheduler=scheduler,
+        )
+    finally:
+        dist.destroy_process_group()
+
+
+def train_distributed(model, features, labels, config=None, progress=None, optimizer=None, scheduler=None):
+    config = config or TrainingConfig.from_env()
+    world_size = worker_count(len(features), config)
+    threads = thread_count(world_size, config)
+    torch.set_num_threads(threads)
+    if world_size == 1:
+        return dict(train(model, features, labels, config, progress, optimizer, scheduler=scheduler), workers=1)
+
+    optimizer = optimizer or make_optimizer(model, config)
+    rank_config = shard_config(config, world_size)
+    shard_size = len(features) // world_size
+    port = free_port()
+    log_msg(
+        "TRAINING ON", world_size, "PROCESSES WITH", threads, "THREADS EACH,",
+        shard_size, "SAMPLES PER PROCESS",
+    )
+
+    context = mp.get_context('spawn')
+    processes = []
+    try:
+        model_bytes = model_format.dumps(model)
+        frozen = [name for name, parameter in model.named_parameters() if not parameter.requires_grad]
+        for rank in range(1, world_size):
+            process = context.Process(
+                target=replica,
+                args=(
+                    rank, world_size, port, model_bytes, optimizer.state_dict(),
+                    shard(features, rank, world_size, shard_size),
+                    shard(labels, rank, world_size, shard_size),
+                    rank_config.as_dict(), threads, frozen,
+                    scheduler.state_dict() if scheduler else None,
+                ),
+                daemon=True,
+            )
+            process.start()
+            processes.append(process)
+
+        def global_progress(**update):
+            # Rank 0 sees its own shard; every rank goes as fast
+            update['samples_per_sec'] *= world_size
+            progress(**update)
+
+        join_group(0, world_size, port)
+        try:
+            stats = train(
+                DistributedDataParallel(model),
+                shard(features, 0, world_size, shard_size),
+                shard(labels, 0, world_size, shard_size),
+                rank_config,
+                global_progress if progress else None,
+                optimizer,
+                reduce=all_reduce_sum,
+                scheduler=scheduler,
+            )
+        finally:
+            dist.destroy_process_group()
+    finally:
+        for process in processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+
+    stats['samples'] *= world_size
+    stats['samples_per_sec'] *= world_size
+    stats['workers'] = world_size
+    return stats
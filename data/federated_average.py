@@ -0,0 +1,98 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from demo.runners.support.utils import log_msg
+from data import model_format
+from data.parameter_groups import keep_frozen
+from data.update_codec import MAGIC, is_update, merge_update
+
+
+def accumulate(averaged_state, state, weight):
+    for name, tensor in state.items():
+        if name in averaged_state:
+            averaged_state[name] += tensor.float() * weight
+        else:
+            averaged_state[name] = tensor.float() * weight
+
+
+async def federated_average(model_paths, sample_counts, output_path, frozen=None, base_path=None):
+    # model_paths may also hold encoded updates against the model at base_path,
+    # which are merged in without being decoded to whole models, see merge_update
+    log_msg("COORDINATOR IS AGGREGATING", len(model_paths), "MODELS")
+
+    total_samples = float(sum(sample_counts))
+    if not model_paths or total_samples <= 0:
+        log_msg("NOTHING TO AGGREGATE")
+        return False
+
+    # FedAvg: weight every contribution by the share of samples it trained on
+    model = None
+    averaged_state = {}
+    updates = []
+    for model_path, sample_count in zip(model_paths, sample_counts):
+        weight = sample_count / total_samples
+        log_msg("Model", model_path, "trained on", sample_count, "samples, weight", weight)
+        with open(model_path, "rb") as f:
+            if is_update(f.read(len(MAGIC))):
+                updates.append((model_path, weight))
+                continue
+
+        contribution = model_format.load(model_path)
+        accumulate(averaged_state, contribution.state_dict(), weight)
+        if model is None:
+            model = contribution
+
+    if updates:
+        # Each update is the base model plus its change: the base model goes in
+        # once, at the updates' total weight, then every change is added
+        base = model_format.load(base_path)
+        base_state = base.state_dict()
+        accumulate(averaged_state, base_state, sum(weight for _, weight in updates))
+        for update_path, weight in updates:
+            with open(update_path, "rb") as f:
+                merge_update(f.read(), weight, averaged_state, base_state)
+        if model is None:
+            model = base
+
+    if frozen:
+        # Every contribution holds the same frozen weights; averaging them could round
+        keep_frozen(averaged_state, model.state_dict(), frozen)
+    model.load_state_dict(averaged_state)
+    model_format.save(model, output_path)
+
+    log_msg("AGGREGATED MODEL SAVED TO", output_path)
+
+    return True
+
+
+# FedAsync: an update is mixed into the global model as soon as it arrives, and
+# counts for less the more global versions were merged since it was sent out
+ASYNC_MIXING = float(os.getenv("FL_ASYNC_MIXING", "0.6"))
+STALENESS_EXPONENT = float(os.getenv("FL_STALENESS_EXPONENT", "0.5"))
+
+
+def staleness_weight(staleness, mixing=ASYNC_MIXING, exponent=STALENESS_EXPONENT):
+    # Polynomial discount: mixing at staleness 0, decaying as (1 + staleness)^-exponent
+    return mixing * (1 + max(staleness, 0)) ** -exponent
+
+
+async def federated_async_update(model_path, update_path, staleness, output_path,
+                                 mixing=ASYNC_MIXING, exponent=STALENESS_EXPONENT, frozen=None):
+    weight = staleness_weight(staleness, mixing, exponent)
+    log_msg("COORDINATOR IS MERGING AN UPDATE WITH STALENESS", staleness, "AT WEIGHT", weight)
+
+    model = model_format.load(model_path)
+    _, update_state = model_format.load_state(update_path)
+    merged_state = {
+        name: tensor.float() * (1 - weight) + update_state[name].float() * weight
+        for name, tensor in model.state_dict().items()
+    }
+    if frozen:
+        keep_frozen(merged_state, model.state_dict(), frozen)
+    model.load_state_dict(merged_state)
+    model_format.save(model, output_path)
+
+    log_msg("MERGED MODEL SAVED TO", output_path)
+
+    return weight
@@ -0,0 +1,183 @@
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import torch
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from demo.runners.support.utils import log_msg
+from data import model_format
+from data.preprocessing import SPLIT_HOLDOUT, CSVStream, load_dataset, streams, vocabulary_from_json
+
+
+# Federated evaluation: rather than the coordinator scoring models on its own
+# small validation set, each hospital scores the global model on the holdout
+# rows of its extract (see HOLDOUT_FRACTION in data/preprocessing.py) and sends
+# back counts only: samples, the sum of the squared errors, the confusion
+# matrix and a histogram of the scores of each class, a few hundred bytes
+# whatever the size of the holdout. Counts add up, so the coordinator (or a
+# regional aggregator on its way up) merges them by summing, and the merged
+# counts give the loss, accuracy and confusion matrix of the union of the
+# holdouts exactly, and its AUC to within the width of a histogram bin.
+HOLDOUT_CSV = 'data/data.csv'
+EVALUATION_BATCH_SIZE = int(os.getenv('FL_EVALUATION_BATCH_SIZE', '4096'))
+EVALUATION_BINS = int(os.getenv('FL_EVALUATION_BINS', '100'))
+# As in data/validate_model.py
+THRESHOLD = .5
+CONFUSION = ('true_positive', 'false_positive', 'false_negative', 'true_negative')
+
+inference_mode = getattr(torch, 'inference_mode', torch.no_grad)
+
+
+def holdout_batches(csv_path=HOLDOUT_CSV, vocabulary=None, age_median=None, batch_size=EVALUATION_BATCH_SIZE):
+    # The holdout rows in batches: streamed in order from an extract too large to load
+    if streams(csv_path):
+        return CSVStream(csv_path, vocabulary, age_median, batch_size=batch_size, shuffle=False, split=SPLIT_HOLDOUT)
+    features, labels = load_dataset(csv_path, vocabulary=vocabulary, age_median=age_median, split=SPLIT_HOLDOUT)
+    return [
+        (features[start:start + batch_size], labels[start:start + batch_size])
+        for start in range(0, len(features), batch_size)
+    ]
+
+
+_holdouts = {}
+
+
+def holdout(csv_path=HOLDOUT_CSV, vocabulary=None):
+    # Kept in the worker's memory, by extract and fixed vocabulary (its JSON payload)
+    key = (csv_path, json.dumps(vocabulary, sort_keys=True) if vocabulary else None)
+    if key not in _holdouts:
+        vocabulary, age_median = vocabulary_from_json(vocabulary) if vocabulary else (None, None)
+        _holdouts[key] = holdout_batches(csv_path, vocabulary, age_median)
+    return _holdouts[key]
+
+
+def empty_counts(bins=EVALUATION_BINS):
+    return {
+        'samples': 0,
+        'loss_sum': 0.0,
+        'confusion': {name: 0 for name in CONFUSION},
+        'histogram': {'positive': [0] * bins, 'negative': [0] * bins},
+        'seconds': 0.0,
+    }
+
+
+def evaluate(model, batches, bins=EVALUATION_BINS, threshold=THRESHOLD):
+    # One batched pass over the holdout; only counts come out of it
+    start = time.perf_counter()
+    samples = 0
+    loss_sum = 0.0
+    confusion = np.zeros(len(CONFUSION), dtype=np.int64)
+    positive_scores = np.zeros(bins, dtype=np.int64)
+    negative_scores = np.zeros(bins, dtype=np.int64)
+    model.eval()
+    with inference_mode():
+        for features, labels in batches:
+            scores = model(features)
+            loss_sum += ((scores - labels) ** 2).sum().item()
+            scores = scores.numpy().ravel()
+            positive = labels.numpy().ravel() == 1
+            predicted = scores > threshold
+            confusion += [
+                int((predicted & positive).sum()),
+                int((predicted & ~positive).sum()),
+                int((~predicted & positive).sum()),
+                int((~predicted & ~positive).sum()),
+            ]
+            index = np.clip((scores * bins).astype(np.int64), 0, bins - 1)
+            positive_scores += np.bincount(index[positive], minlength=bins)
+            negative_scores += np.bincount(index[~positive], minlength=bins)
+            samples += len(scores)
+
+    return {
+        'samples': samples,
+        'loss_sum': loss_sum,
+        'confusion': dict(zip(CONFUSION, confusion.tolist())),
+        'histogram': {'positive': positive_scores.tolist(), 'negative': negative_scores.tolist()},
+        'seconds': time.perf_counter() - start,
+    }
+
+
+def evaluate_model_bytes(model_bytes, csv_path=HOLDOUT_CSV, vocabulary=None, progress=None):
+    # Runs in a training worker, see data/training_executor.py: the counts of a
+    # model on this hospital's holdout. vocabulary is the coordinator's fixed one
+    counts = evaluate(model_format.loads(model_bytes), holdout(csv_path, vocabulary))
+    log_msg(
+        "EVALUATED ON", counts['samples'], "HOLDOUT SAMPLES IN",
+        round(counts['seconds'] * 1000, 1), "MS",
+    )
+    return counts
+
+
+def check_counts(counts):
+    # Counts come from other parties: they must add up before they are merged
+    try:
+        histogram = counts['histogram']
+        values = [counts['samples']] + [counts['confusion'][name] for name in CONFUSION]
+        values += list(histogram['positive']) + list(histogram['negative'])
+        loss_sum = float(counts['loss_sum'])
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError('Malformed evaluation counts: ' + str(e))
+    if any(not isinstance(value, int) or value < 0 for value in values) or loss_sum < 0:
+        raise ValueError('Evaluation counts must be non-negative integers')
+    if len(histogram['positive']) != len(histogram['negative']):
+        raise ValueError('Evaluation histograms differ in length')
+    if sum(counts['confusion'].values()) != counts['samples'] or \
+            sum(histogram['positive']) + sum(histogram['negative']) != counts['samples']:
+        raise ValueError('Evaluation counts do not add up to the samples')
+    return counts
+
+
+def merge(counts_list):
+    # Sums the counts of several holdouts; they are scored at once, so the
+    # merged evaluation took as long as the slowest
+    counts_list = [check_counts(counts) for counts in counts_list]
+    if not counts_list:
+        return empty_counts()
+    bins = len(counts_list[0]['histogram']['positive'])
+    if any(len(counts['histogram']['positive']) != bins for counts in counts_list):
+        raise ValueError('Evaluation histograms differ in length')
+    merged = empty_counts(bins)
+    for counts in counts_list:
+        merged['samples'] += counts['samples']
+        merged['loss_sum'] += counts['loss_sum']
+        for name in CONFUSION:
+            merged['confusion'][name] += counts['confusion'][name]
+        for label in ('positive', 'negative'):
+            merged['histogram'][label] = [
+                total + count for total, count in zip(merged['histogram'][label], counts['histogram'][label])
+            ]
+        merged['seconds'] = max(merged['seconds'], counts.get('seconds') or 0.0)
+    return merged
+
+
+def auc_from_histograms(positive, negative):
+    # The chance that a positive scores above a negative, ties within a bin
+    # counting half; None when the holdouts hold a single class
+    positives = sum(positive)
+    negatives = sum(negative)
+    if not positives or not negatives:
+        return None
+    area = 0.0
+    below = 0
+    for positive_count, negative_count in zip(positive, negative):
+        area += positive_count * (below + negative_count / 2)
+        below += negative_count
+    return area / (positives * negatives)
+
+
+def summarize(counts, name=None):
+    # The metrics of merged counts, in the form of data/validate_model.py's results
+    samples = counts['samples']
+    confusion = counts['confusion']
+    return {
+        'model': name,
+        'samples': samples,
+        'loss': counts['loss_sum'] / samples if samples else None,
+        'accuracy': (confusion['true_positive'] + confusion['true_negative']) / samples if samples else None,
+        'auc': auc_from_histograms(counts['histogram']['positive'], counts['histogram']['negative']),
+        'confusion': dict(confusion),
+        'seconds': counts['seconds'],
+    }
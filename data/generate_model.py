@@ -22,6 +22,7 @@ import sys
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from demo.runners.support.utils import log_msg
+from data import model_format
 
 async def generate_model():
     log_msg("COORDINATOR IS GENERATING THE INITIAL MODEL")
@@ -35,6 +36,6 @@ async def generate_model():
             nn.Linear(2, 1),
             nn.Sigmoid()
         )
-    torch.save(model, "model/model.pt")
+    model_format.save(model, "model/model.fltm")
 
     return True
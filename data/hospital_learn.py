@@ -9,9 +9,7 @@ import traceback
 
 # prep
 from sklearn.model_selection import train_test_split
-from sklearn import preprocessing
 from sklearn.datasets import make_classification
-from sklearn.preprocessing import binarize, LabelEncoder, MinMaxScaler
 
 # models
 from torch import nn
@@ -22,148 +20,31 @@ import sys
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from demo.runners.support.utils import log_msg
+from data import model_format
+from data.preprocessing import load_dataset
+from data.trainer import TrainingConfig, train
 
 
 
 
-async def hospital_learn():
+async def hospital_learn(model_path="model/untrained_model.fltm", trained_path="model/trained_model.fltm", progress=None, config=None):
+    # Run through data/training_executor.py, this executes in a worker process and
+    # progress(**update) reports back to the controller
     log_msg("HOSPITAL IS LEARNING")
 
 
-    #Read in Data
-    train_df = pd.read_csv('data/data.csv')
-
-    log_msg("HOSPITAL DATA", train_df)
-
-    ########## START DATA CLEANING ###############
-
-
-        #dealing with missing data
-    #Let’s get rid of the variables "Timestamp",“comments”, “state” just to make our lives easier.
-    train_df = train_df.drop(['comments'], axis= 1)
-    train_df = train_df.drop(['state'], axis= 1)
-    train_df = train_df.drop(['Timestamp'], axis= 1)
-
-    # Assign default values for each data type
-    defaultInt = 0
-    defaultString = 'NaN'
-    defaultFloat = 0.0
-
-    # Create lists by data tpe
-    intFeatures = ['Age']
-    stringFeatures = ['Gender', 'Country', 'self_employed', 'family_history', 'treatment', 'work_interfere',
-                     'no_employees', 'remote_work', 'tech_company', 'anonymity', 'leave', 'mental_health_consequence',
-                     'phys_health_consequence', 'coworkers', 'supervisor', 'mental_health_interview', 'phys_health_interview',
-                     'mental_vs_physical', 'obs_consequence', 'benefits', 'care_options', 'wellness_program',
-                     'seek_help']
-    floatFeatures = []
-
-    # Clean the NaN's
-    for feature in train_df:
-        if feature in intFeatures:
-            train_df[feature] = train_df[feature].fillna(defaultInt)
-        elif feature in stringFeatures:
-            train_df[feature] = train_df[feature].fillna(defaultString)
-        elif feature in floatFeatures:
-            train_df[feature] = train_df[feature].fillna(defaultFloat)
-        else:
-            log_msg('Error: Feature %s not recognized.' % feature)
-
-    #clean 'Gender'
-    #Slower case all columm's elements
-    gender = train_df['Gender'].str.lower()
-    #log_msg(gender)
-
-    #Select unique elements
-    gender = train_df['Gender'].unique()
-
-    #Made gender groups
-    male_str = ["male", "m", "male-ish", "maile", "mal", "male (cis)", "make", "male ", "man","msle", "mail", "malr","cis man", "Cis Male", "cis male"]
-    trans_str = ["trans-female", "something kinda male?", "queer/she/they", "non-binary","nah", "all", "enby", "fluid", "genderqueer", "androgyne", "agender", "male leaning androgynous", "guy (-ish) ^_^", "trans woman", "neuter", "female (trans)", "queer", "ostensibly male, unsure what that really means"]
-    female_str = ["cis female", "f", "female", "woman",  "femake", "female ","cis-female/femme", "female (cis)", "femail"]
-
-    for (row, col) in train_df.iterrows():
-
-        if str.lower(col.Gender) in male_str:
-            train_df['Gender'].replace(to_replace=col.Gender, value='male', inplace=True)
-
-        if str.lower(col.Gender) in female_str:
-            train_df['Gender'].replace(to_replace=col.Gender, value='female', inplace=True)
-
-        if str.lower(col.Gender) in trans_str:
-            train_df['Gender'].replace(to_replace=col.Gender, value='trans', inplace=True)
-
-    #Get rid of bullshit
-    stk_list = ['A little about you', 'p']
-    train_df = train_df[~train_df['Gender'].isin(stk_list)]
-
-    #complete missing age with mean
-    train_df['Age'].fillna(train_df['Age'].median(), inplace = True)
-
-    # Fill with media() values < 18 and > 120
-    s = pd.Series(train_df['Age'])
-    s[s<18] = train_df['Age'].median()
-    train_df['Age'] = s
-    s = pd.Series(train_df['Age'])
-    s[s>120] = train_df['Age'].median()
-    train_df['Age'] = s
-
-    #Ranges of Age
-    train_df['age_range'] = pd.cut(train_df['Age'], [0,20,30,65,100], labels=["0-20", "21-30", "31-65", "66-100"], include_lowest=True)
-
-    #There are only 0.20% of self work_interfere so let's change NaN to "Don't know
-    #Replace "NaN" string from defaultString
-
-    train_df['work_interfere'] = train_df['work_interfere'].replace([defaultString], 'Don\'t know' )
-
-    #Encoding data
-    labelDict = {}
-    for feature in train_df:
-        le = preprocessing.LabelEncoder()
-        le.fit(train_df[feature])
-        le_name_mapping = dict(zip(le.classes_, le.transform(le.classes_)))
-        train_df[feature] = le.transform(train_df[feature])
-        # Get labels
-        labelKey = 'label_' + feature
-        labelValue = [*le_name_mapping]
-        labelDict[labelKey] =labelValue
-
-    #Get rid of 'Country'
-    train_df = train_df.drop(['Country'], axis= 1)
-
-    # Scaling Age
-    scaler = MinMaxScaler()
-    train_df['Age'] = scaler.fit_transform(train_df[['Age']])
-
-    # define X and y
-    feature_cols = ['Age', 'Gender', 'family_history', 'benefits', 'care_options', 'anonymity', 'leave', 'work_interfere']
-    X = train_df[feature_cols]
-    y = train_df.treatment
-
-    # split X and y into training and testing sets
-    X_train, y_train = X, y
-
-    # Transform pandas dataframe to torch tensor for DL
-
-    x_train_data = torch.from_numpy(X_train.values)
-    x_train_data = x_train_data.float()
-
-    y_train_data = []
-    for data in y_train.values:
-        y_train_data.append([data])
-    y_train_data = torch.tensor(y_train_data).float()
-
+    # Read in and clean the data, see data/preprocessing.py
+    x_train_data, y_train_data = load_dataset('data/data.csv')
 
     log_msg("HOSPITAL DATA CLEAN")
 
-    ########## END DATA CLEANING ###############
 
-    model_dir = os.getcwd() + "/model/untrained_model.pt"
+    model_dir = os.path.join(os.getcwd(), model_path)
 
     log_msg(model_dir)
     # Pull in model
     try:
-        model = torch.load(model_dir)
+        model = model_format.load(model_dir)
     except Exception as e:
         log_msg("HOSPITAL FAILED TO LOAD MODEL")
         log_msg("Exception Value: ",e)
@@ -173,32 +54,11 @@ async def hospital_learn():
     log_msg("HOSPITAL MODEL LOADED")
 
 
-    # Training Logic
+    # Training Logic, see data/trainer.py for the settings
     log_msg("HOSPITAL IS TRAINING")
+    train(model, x_train_data, y_train_data, config or TrainingConfig.from_env(), progress)
 
-    opt = optim.SGD(params=model.parameters(), lr=0.1)
-    for iter in range(50000):
-
-        # 1) erase previous gradients (if they exist)
-        opt.zero_grad()
-        # log_msg("TRAIN DATA", x_train_data)
-
-        # 2) make a prediction
-        pred = model(x_train_data)
-
-        # 3) calculate how much we missed
-        loss = (((y_train_data - pred) ** 2).sum()) / len(x_train_data)
-
-        # 4) figure out which weights caused us to miss
-        loss.backward()
-
-        # 5) change those weights
-        opt.step()
-
-        # 6) log_msg our progress
-        if (iter % 5000 == 0):
-            log_msg("loss at epoch ", iter, ": ", loss.data)
-
-    torch.save(model, "model/trained_model.pt")
+    model_format.save(model, trained_path)
 
-    return True
+    # The coordinator weights this contribution by the number of samples
+    return len(x_train_data)
@@ -0,0 +1,211 @@
+import json
+import os
+import struct
+import warnings
+from collections import OrderedDict
+
+import numpy as np
+import torch
+from torch import nn
+
+from data.parameter_groups import frozen_sha256, in_groups
+
+
+# Models are stored and sent as a flat tensor table rather than a pickled module:
+#
+#   MAGIC | <I header length | JSON header | padding | tensor data
+#
+# The header names each tensor with its dtype, shape and offset in the data
+# section (every tensor starts on an ALIGNMENT boundary), and describes the
+# architecture, so a module is rebuilt without running any pickled code. The
+# data section is read with numpy.memmap: no tensor is copied until it is used.
+# A model exchanged with frozen groups names them, with the hash of their
+# tensors, under "frozen"; a partial model leaves those tensors out, and is
+# completed from a model holding them, see data/parameter_groups.py.
+MAGIC = b"FLTM"
+VERSION = 1
+ALIGNMENT = 64
+MODEL_MIME_TYPE = "application/x-fl-model"
+# What a participant answers a partial model with when it lacks the frozen
+# weights pinned (a restart, a new worker): the sender sends the whole model
+NEED_FULL_MODEL = "need_full_model"
+
+# Layers an architecture descriptor may hold, with the constructor arguments kept
+LAYERS = {
+    "Linear": lambda layer: {
+        "in_features": layer.in_features,
+        "out_features": layer.out_features,
+        "bias": layer.bias is not None,
+    },
+    "Sigmoid": lambda layer: {},
+    "ReLU": lambda layer: {},
+    "Tanh": lambda layer: {},
+    "Dropout": lambda layer: {"p": layer.p},
+}
+
+
+def describe(model):
+    if not isinstance(model, nn.Sequential):
+        raise ValueError("Only nn.Sequential models can be described, not " + type(model).__name__)
+    layers = []
+    for layer in model:
+        kind = type(layer).__name__
+        if kind not in LAYERS or type(layer) is not getattr(nn, kind):
+            raise ValueError("Unsupported layer: " + kind)
+        layers.append(dict(LAYERS[kind](layer), type=kind))
+    return {"type": "Sequential", "layers": layers}
+
+
+def build(architecture):
+    if architecture.get("type") != "Sequential":
+        raise ValueError("Unsupported architecture: " + str(architecture.get("type")))
+    layers = []
+    for layer in architecture["layers"]:
+        args = dict(layer)
+        kind = args.pop("type")
+        if kind not in LAYERS:
+            raise ValueError("Unsupported layer: " + str(kind))
+        layers.append(getattr(nn, kind)(**args))
+    return nn.Sequential(*layers)
+
+
+def aligned(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def dumps(model, frozen=None, partial=False):
+    state = model.state_dict()
+    entries = []
+    blobs = []
+    offset = 0
+    for name, tensor in state.items():
+        if partial and in_groups(name, frozen):
+            continue
+        array = np.ascontiguousarray(tensor.detach().cpu().numpy())
+        offset = aligned(offset)
+        entries.append({
+            "name": name,
+            "dtype": array.dtype.str,
+            "shape": list(array.shape),
+            "offset": offset,
+            "nbytes": array.nbytes,
+        })
+        blobs.append((offset, array.tobytes()))
+        offset += array.nbytes
+
+    header = {
+        "version": VERSION,
+        "architecture": describe(model),
+        "tensors": entries,
+    }
+    if frozen:
+        header["frozen"] = {"groups": list(frozen), "sha256": frozen_sha256(state, frozen)}
+        header["partial"] = bool(partial)
+    header = json.dumps(header).encode()
+    data_start = aligned(len(MAGIC) + 4 + len(header))
+    data = bytearray(data_start + offset)
+    data[:len(MAGIC)] = MAGIC
+    data[len(MAGIC):len(MAGIC) + 4] = struct.pack("<I", len(header))
+    data[len(MAGIC) + 4:len(MAGIC) + 4 + len(header)] = header
+    for tensor_offset, blob in blobs:
+        data[data_start + tensor_offset:data_start + tensor_offset + len(blob)] = blob
+    return bytes(data)
+
+
+def save(model, path):
+    # Written next to the final path, then renamed, so readers never see half a file
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(dumps(model))
+    os.replace(tmp_path, path)
+
+
+def is_model_format(data):
+    return data[:len(MAGIC)] == MAGIC
+
+
+def parse_header(data):
+    # data holds at least the header: the file's first bytes are enough
+    if not is_model_format(data):
+        raise ValueError("Not an FL model file")
+    (header_len,) = struct.unpack("<I", data[len(MAGIC):len(MAGIC) + 4])
+    header = json.loads(bytes(data[len(MAGIC) + 4:len(MAGIC) + 4 + header_len]).decode())
+    if header.get("version") != VERSION:
+        raise ValueError("Unsupported FL model version: " + str(header.get("version")))
+    header["data_offset"] = aligned(len(MAGIC) + 4 + header_len)
+    return header
+
+
+def read_header(path):
+    with open(path, "rb") as f:
+        start = f.read(len(MAGIC) + 4)
+        if not is_model_format(start):
+            raise ValueError("Not an FL model file: " + path)
+        (header_len,) = struct.unpack("<I", start[len(MAGIC):])
+        return parse_header(start + f.read(header_len))
+
+
+def tensor_table(header, buffer):
+    # buffer is a uint8 array over the whole file, in memory or memory-mapped
+    state = OrderedDict()
+    with warnings.catch_warnings():
+        # tensors over read-only bytes are only read; load_state_dict copies them
+        warnings.simplefilter("ignore")
+        for entry in header["tensors"]:
+            start = header["data_offset"] + entry["offset"]
+            array = buffer[start:start + entry["nbytes"]].view(np.dtype(entry["dtype"]))
+            state[entry["name"]] = torch.from_numpy(array.reshape(entry["shape"]))
+    return state
+
+
+def loads_state(data):
+    header = parse_header(data)
+    return header, tensor_table(header, np.frombuffer(data, dtype=np.uint8))
+
+
+def load_state(path):
+    header = read_header(path)
+    # Copy-on-write mapping: pages are read from disk only when a tensor is used
+    return header, tensor_table(header, np.memmap(path, dtype=np.uint8, mode="c"))
+
+
+class FrozenWeightsMissing(ValueError):
+    # A partial model pins frozen weights that are not held here
+    pass
+
+
+def needs_full_model(error):
+    # Errors from a training worker come back as its traceback's text
+    return isinstance(error, FrozenWeightsMissing) or FrozenWeightsMissing.__name__ in str(error)
+
+
+def frozen_groups(header):
+    return header.get("frozen", {}).get("groups", [])
+
+
+def complete_state(header, state, full_state):
+    # Fills a partial model's frozen tensors in from full_state, which must hold
+    # the very weights the partial model pinned
+    if not header.get("partial"):
+        return header, state
+    if frozen_sha256(full_state, frozen_groups(header)) != header["frozen"]["sha256"]:
+        raise FrozenWeightsMissing("The frozen weights pinned by the partial model are not held here")
+    completed = OrderedDict(full_state)
+    completed.update(state)
+    return dict(header, partial=False), completed
+
+
+def module_from(header, state):
+    if header.get("partial"):
+        raise ValueError("A partial model needs its frozen weights, see complete_state")
+    model = build(header["architecture"])
+    model.load_state_dict(state)
+    return model
+
+
+def loads(data):
+    return module_from(*loads_state(data))
+
+
+def load(path):
+    return module_from(*load_state(path))
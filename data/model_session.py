@@ -0,0 +1,197 @@
+import hashlib
+import os
+import sys
+import time
+
+import torch
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from demo.runners.support.utils import log_msg
+from data import model_format
+from data.preprocessing import SPLIT_TRAIN, CSVStream, load_dataset, streams, vocabulary_from_json
+from data.distributed_trainer import train_distributed
+from data.parameter_groups import freeze
+from data.trainer import TrainingConfig, make_optimizer, make_scheduler, train
+from data.update_codec import DEFAULT_CODEC, encode_update
+
+
+# A hospital keeps its live model, optimizer and training tensors in memory from
+# one round to the next: a received model is copied into the live module in
+# place and the trained weights are encoded straight from memory, so a round
+# does not write, re-read or re-pickle any model file. An extract too large to
+# hold in memory is streamed from the CSV instead, see data/preprocessing.py.
+# A session belongs to one connection and FL job: its optimizer state (e.g.
+# momentum), learning rate schedule and sparse residual carry on through the
+# job's rounds, and are saved to SESSION_DIR after each round so that they
+# survive a restart of the worker or the hospital.
+TRAINING_CSV = 'data/data.csv'
+SESSION_DIR = os.getenv('FL_SESSION_DIR', 'model/sessions')
+
+
+def same_architecture(state, other_state):
+    return list(state) == list(other_state) and all(
+        state[name].shape == other_state[name].shape for name in state
+    )
+
+
+def session_path(session_key, job_id=None, session_dir=SESSION_DIR):
+    name = hashlib.sha256('{}/{}'.format(session_key, job_id).encode()).hexdigest()[:32]
+    return os.path.join(session_dir, name + '.pt')
+
+
+class ModelSession:
+    def __init__(self, csv_path=TRAINING_CSV, state_path=None, job_id=None):
+        self.csv_path = csv_path
+        self.state_path = state_path
+        self.job_id = job_id
+        self.model = None
+        self.optimizer = None
+        self.scheduler = None
+        self.base_state = None
+        self.rounds = 0
+        self.frozen = []
+        # What sparse updates have not sent yet, see data/update_codec.py
+        self.residual = {}
+        self.vocabulary = None
+        self._data = None
+
+    @property
+    def streaming(self):
+        return isinstance(self.data, CSVStream)
+
+    @property
+    def data(self):
+        # The training tensors, or a CSVStream of their batches; the holdout rows
+        # are left for evaluation, see data/federated_evaluation.py
+        if self._data is None:
+            vocabulary, age_median = vocabulary_from_json(self.vocabulary) if self.vocabulary else (None, None)
+            if streams(self.csv_path):
+                self._data = CSVStream(self.csv_path, vocabulary, age_median, split=SPLIT_TRAIN)
+            else:
+                self._data = load_dataset(
+                    self.csv_path, vocabulary=vocabulary, age_median=age_median, split=SPLIT_TRAIN
+                )
+        return self._data
+
+    @property
+    def num_samples(self):
+        if self.streaming:
+            return self.data.num_samples
+        return len(self.data[0])
+
+    def set_vocabulary(self, vocabulary):
+        # A fixed vocabulary from the coordinator, see vocabulary_from_json; the data
+        # is encoded again if it changed
+        if vocabulary != self.vocabulary:
+            self.vocabulary = vocabulary
+            self._data = None
+
+    def load(self, model_bytes):
+        header, state = model_format.loads_state(model_bytes)
+        if header.get("partial"):
+            # Only the trainable tensors came: the frozen ones must be those held here
+            if self.model is None:
+                raise model_format.FrozenWeightsMissing("A partial model came before the frozen weights it pins")
+            header, state = model_format.complete_state(header, state, self.model.state_dict())
+        if self.model is not None and same_architecture(self.model.state_dict(), state):
+            # The optimizer holds references to these very parameters, so it stays valid
+            self.model.load_state_dict(state)
+        else:
+            self.model = model_format.module_from(header, state)
+            self.optimizer = None
+            self.scheduler = None
+            self.residual = {}
+        # Frozen groups get no gradients, so backward stops short of them
+        self.frozen = model_format.frozen_groups(header)
+        frozen_share = freeze(self.model, self.frozen)
+        if self.frozen:
+            log_msg("TRAINING", round(100 * (1 - frozen_share), 1), "% OF THE PARAMETERS")
+        # The round's starting point, which the update is encoded against
+        self.base_state = {name: tensor.clone() for name, tensor in self.model.state_dict().items()}
+
+    def train(self, config=None, progress=None):
+        config = config or TrainingConfig.from_env()
+        if self.optimizer is None:
+            self.optimizer = make_optimizer(self.model, config)
+            self.scheduler = make_scheduler(self.optimizer, config)
+            self.restore(config)
+        if self.streaming:
+            # Batches come off the stream in order, so it trains in this process alone
+            stream = self.data
+            stream.batch_size, stream.shuffle = config.batch_size, config.shuffle
+            stats = dict(train(self.model, config=config, progress=progress, optimizer=self.optimizer,
+                               loader=stream, scheduler=self.scheduler), workers=1)
+        else:
+            x_train_data, y_train_data = self.data
+            stats = train_distributed(
+                self.model, x_train_data, y_train_data, config, progress, self.optimizer, self.scheduler
+            )
+        self.rounds += 1
+        return stats
+
+    def save(self):
+        if not self.state_path:
+            return
+        os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+        # Written next to the final path, then renamed, so a restart never reads half a file
+        tmp_path = self.state_path + '.tmp'
+        torch.save({
+            'job_id': self.job_id,
+            'rounds': self.rounds,
+            'optimizer': self.optimizer.state_dict(),
+            'scheduler': self.scheduler.state_dict() if self.scheduler else None,
+            'residual': {name: torch.from_numpy(array) for name, array in self.residual.items()},
+        }, tmp_path)
+        os.replace(tmp_path, self.state_path)
+
+    def restore(self, config):
+        # The state saved by an earlier run of this session's job, if it fits the model
+        if not self.state_path or not os.path.exists(self.state_path):
+            return False
+        try:
+            saved = torch.load(self.state_path)
+            self.optimizer.load_state_dict(saved['optimizer'])
+            if self.scheduler and saved['scheduler']:
+                self.scheduler.load_state_dict(saved['scheduler'])
+        except (ValueError, KeyError, RuntimeError) as e:
+            log_msg("DISCARDING SAVED SESSION STATE", self.state_path, e)
+            self.optimizer = make_optimizer(self.model, config)
+            self.scheduler = make_scheduler(self.optimizer, config)
+            return False
+        self.rounds = saved['rounds']
+        self.residual = {name: tensor.numpy() for name, tensor in saved['residual'].items()}
+        log_msg("RESTORED SESSION STATE AFTER", self.rounds, "ROUNDS")
+        return True
+
+    def encode_update(self, codec=DEFAULT_CODEC):
+        # Frozen tensors are left out of the update
+        return encode_update(self.model.state_dict(), self.base_state, codec, self.frozen, self.residual)
+
+
+# Sessions live in the training worker's memory, see data/training_executor.py,
+# one per connection: a model from a new job replaces the connection's session
+_sessions = {}
+
+
+def train_session(session_key, model_bytes, codec=DEFAULT_CODEC, config=None, progress=None, vocabulary=None,
+                  job_id=None):
+    # Runs one round in the worker: returns the sample count and the encoded update.
+    # vocabulary is the fixed vocabulary the coordinator sent, if any
+    start = time.perf_counter()
+    session = _sessions.get(session_key)
+    if session is None or session.job_id != job_id:
+        session = _sessions[session_key] = ModelSession(
+            state_path=session_path(session_key, job_id), job_id=job_id
+        )
+        log_msg("NEW MODEL SESSION FOR", session_key, "JOB", job_id)
+
+    session.set_vocabulary(vocabulary)
+    session.load(model_bytes)
+    session.train(config, progress)
+    update = session.encode_update(codec)
+    session.save()
+    log_msg(
+        "SESSION", session_key, "ROUND", session.rounds, "TOOK",
+        round(time.perf_counter() - start, 2), "S, UPDATE IS", len(update), "BYTES WITH", codec,
+    )
+    return session.num_samples, update
@@ -0,0 +1,159 @@
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from uuid import uuid4
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from demo.runners.support.utils import log_msg
+
+
+# Models are stored once per SHA-256 of their bytes, the same hash the agents use
+# for links and transfers. The index records where each model came from
+# (lineage); how many users hold each model (refs) is kept in this process's
+# memory only, so that a crash cannot leave models held forever. Unreferenced
+# models are evicted, least recently used first, once the store holds more than
+# max_models.
+DEFAULT_ROOT = 'model/store'
+DEFAULT_MAX_MODELS = int(os.getenv('FL_MODEL_STORE_MAX', '50'))
+INDEX_FILE = 'index.json'
+SHA256_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+
+
+class ModelStoreError(Exception):
+    pass
+
+
+def sha256_of(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+class ModelStore:
+    def __init__(self, root=DEFAULT_ROOT, max_models=DEFAULT_MAX_MODELS):
+        self.root = root
+        self.max_models = max_models
+        os.makedirs(root, exist_ok=True)
+        self.index = self.load_index()
+        # sha256 -> number of users holding the model in this process
+        self.refs = {}
+
+    @property
+    def index_path(self):
+        return os.path.join(self.root, INDEX_FILE)
+
+    def load_index(self):
+        if not os.path.exists(self.index_path):
+            return {}
+        with open(self.index_path) as f:
+            index = json.load(f)
+        for entry in index.values():
+            # Written by earlier versions: whoever held the models is gone
+            entry.pop('refs', None)
+        # Drop entries whose file has gone, e.g. removed by hand
+        return {sha256: entry for sha256, entry in index.items() if os.path.exists(self.path(sha256))}
+
+    def save_index(self):
+        tmp_path = self.index_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.index, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.index_path)
+
+    def path(self, sha256):
+        if not SHA256_PATTERN.match(sha256 or ''):
+            raise ModelStoreError('Invalid model hash: ' + str(sha256))
+        return os.path.join(self.root, sha256 + '.bin')
+
+    def scratch_path(self):
+        # A unique path inside the store, for files that are about to be put
+        return os.path.join(self.root, 'scratch-' + str(uuid4()) + '.bin')
+
+    def has(self, sha256):
+        return sha256 in self.index
+
+    def info(self, sha256):
+        return self.index.get(sha256)
+
+    def put(self, data, round=None, parent=None, connection_id=None, ref=False):
+        sha256 = sha256_of(data)
+        entry = self.index.get(sha256)
+        if entry is None:
+            # Identical models are written once
+            path = self.path(sha256)
+            tmp_path = path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            entry = self.index[sha256] = {
+                'size': len(data),
+                'created': time.time(),
+                'lineage': [],
+            }
+            log_msg("STORED MODEL", sha256, "(" + str(len(data)), "BYTES)")
+
+        origin = {'round': round, 'parent': parent, 'connection_id': connection_id}
+        if any(origin.values()) and origin not in entry['lineage']:
+            entry['lineage'].append(origin)
+        entry['last_used'] = time.time()
+        if ref:
+            self.refs[sha256] = self.refs.get(sha256, 0) + 1
+        self.save_index()
+        self.evict()
+        return sha256
+
+    def put_file(self, path, remove=False, **lineage):
+        with open(path, 'rb') as f:
+            sha256 = self.put(f.read(), **lineage)
+        if remove:
+            os.remove(path)
+        return sha256
+
+    def get(self, sha256):
+        if not self.has(sha256):
+            raise ModelStoreError('Unknown model: ' + sha256)
+        self.index[sha256]['last_used'] = time.time()
+        with open(self.path(sha256), 'rb') as f:
+            return f.read()
+
+    def acquire(self, sha256):
+        if not self.has(sha256):
+            raise ModelStoreError('Unknown model: ' + sha256)
+        self.refs[sha256] = self.refs.get(sha256, 0) + 1
+        self.index[sha256]['last_used'] = time.time()
+
+    def release(self, sha256):
+        if self.refs.get(sha256, 0) > 0:
+            self.refs[sha256] -= 1
+            if not self.refs[sha256]:
+                del self.refs[sha256]
+            self.evict()
+
+    def ancestry(self, sha256):
+        # The chain of parents, following the first recorded origin of each model
+        chain = []
+        while sha256 in self.index and sha256 not in chain:
+            chain.append(sha256)
+            parents = [origin['parent'] for origin in self.index[sha256]['lineage'] if origin['parent']]
+            if not parents:
+                break
+            sha256 = parents[0]
+        return chain
+
+    def evict(self):
+        if not self.max_models or len(self.index) <= self.max_models:
+            return []
+        unreferenced = sorted(
+            (entry['last_used'], sha256) for sha256, entry in self.index.items() if sha256 not in self.refs
+        )
+        evicted = [sha256 for _, sha256 in unreferenced[:len(self.index) - self.max_models]]
+        for sha256 in evicted:
+            try:
+                os.remove(self.path(sha256))
+            except FileNotFoundError:
+                pass
+            del self.index[sha256]
+        if evicted:
+            self.save_index()
+            log_msg("EVICTED", len(evicted), "MODELS FROM THE STORE")
+        return evicted
@@ -0,0 +1,67 @@
+import hashlib
+import os
+
+import numpy as np
+
+
+# Partial-model exchange: an FL job may freeze groups of parameters, e.g. a
+# pretrained backbone, and train only the rest. A group is a prefix of the
+# state dict names: "0" is the first layer of an nn.Sequential ("0.weight",
+# "0.bias"), "0,2" the first and third. Frozen tensors go to a hospital once,
+# after which models and updates carry the trainable tensors only, and the
+# frozen ones are pinned by the hash of their bytes (see frozen_sha256).
+# Hospitals turn gradients off for frozen parameters, so the backward pass
+# stops short of them.
+FROZEN_GROUPS = os.getenv('FL_FROZEN_GROUPS', '')
+
+
+def parse_groups(spec):
+    # '0,2' or ['0', '2'] -> ['0', '2']
+    if not spec:
+        return []
+    if isinstance(spec, str):
+        spec = spec.split(',')
+    return [group.strip() for group in spec if group.strip()]
+
+
+def in_groups(name, groups):
+    return any(name == group or name.startswith(group + '.') for group in groups)
+
+
+def frozen_names(state, groups):
+    return [name for name in state if in_groups(name, groups)]
+
+
+def trainable_names(state, groups):
+    return [name for name in state if not in_groups(name, groups)]
+
+
+def frozen_sha256(state, groups):
+    # Names, dtypes, shapes and bytes of the frozen tensors, in state dict order
+    digest = hashlib.sha256()
+    for name in frozen_names(state, groups):
+        array = np.ascontiguousarray(state[name].detach().cpu().numpy())
+        digest.update(name.encode())
+        digest.update(array.dtype.str.encode())
+        digest.update(str(array.shape).encode())
+        digest.update(array.tobytes())
+    return digest.hexdigest()
+
+
+def freeze(model, groups):
+    # Returns the share of the parameters frozen
+    frozen = 0
+    total = 0
+    for name, parameter in model.named_parameters():
+        is_frozen = in_groups(name, groups)
+        parameter.requires_grad_(not is_frozen)
+        frozen += parameter.numel() if is_frozen else 0
+        total += parameter.numel()
+    return frozen / total if total else 0.0
+
+
+def keep_frozen(state, reference_state, groups):
+    # Averaging identical tensors can still round; frozen ones are copied as they were
+    for name in frozen_names(state, groups):
+        state[name] = reference_state[name].clone()
+    return state
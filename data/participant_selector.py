@@ -0,0 +1,220 @@
+import math
+import os
+import random
+import sys
+import time
+from collections import deque
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from demo.runners.support.utils import log_msg
+
+
+# Each round trains on a sample of the trusted hospitals rather than all of them.
+# The selector keeps a record per connection (latency of its recent rounds,
+# whether they came back, and the dataset size it reported) to choose from:
+#   random: a uniform sample
+#   stratified: hospitals are grouped by dataset size and every group is sampled
+#     in proportion, so small and large datasets are both represented
+#   availability: hospitals that answer reliably and quickly are more likely to
+#     be chosen; none has zero chance, so a slow hospital still contributes
+# A hospital that misses a round's deadline sits out the next round, and twice
+# as many after each further timeout in a row, up to MAX_BACKOFF_ROUNDS.
+POLICY_RANDOM = 'random'
+POLICY_STRATIFIED = 'stratified'
+POLICY_AVAILABILITY = 'availability'
+POLICIES = (POLICY_RANDOM, POLICY_STRATIFIED, POLICY_AVAILABILITY)
+
+DEFAULT_POLICY = os.getenv('FL_SELECTION_POLICY', POLICY_RANDOM)
+# A fraction of the hospitals (0 < x <= 1) or a number of them (x > 1)
+DEFAULT_PARTICIPANTS = os.getenv('FL_PARTICIPANTS', '1.0')
+DEFAULT_STRATA = int(os.getenv('FL_SELECTION_STRATA', '3'))
+# Rounds of outcomes kept per connection, and the weight of the latest latency
+HISTORY = 10
+LATENCY_SMOOTHING = 0.3
+# Least chance of selection, relative to the most available hospital
+MIN_AVAILABILITY = 0.05
+MAX_BACKOFF_ROUNDS = int(os.getenv('FL_MAX_BACKOFF_ROUNDS', '16'))
+
+
+def parse_participants(value):
+    # '0.1' is a tenth of the hospitals, '20' is twenty of them
+    value = float(value)
+    if value <= 0:
+        raise ValueError('The number of participants must be positive, not ' + str(value))
+    if value <= 1:
+        return value, None
+    return None, int(value)
+
+
+class ParticipantStats:
+    def __init__(self, connection_id):
+        self.connection_id = connection_id
+        self.sent = 0
+        self.completed = 0
+        self.failed = 0
+        self.timeouts = 0
+        self.consecutive_timeouts = 0
+        self.backoff_until = None
+        self.latency = None
+        self.num_samples = None
+        self.recent = deque(maxlen=HISTORY)
+        self.dispatched_at = None
+
+    @property
+    def outstanding(self):
+        return self.dispatched_at is not None
+
+    @property
+    def success_rate(self):
+        # Hospitals without a record yet are assumed to be available
+        if not self.recent:
+            return 1.0
+        return sum(self.recent) / len(self.recent)
+
+    def backing_off(self, round):
+        return self.backoff_until is not None and round is not None and round < self.backoff_until
+
+    def as_dict(self):
+        return {
+            'connection_id': self.connection_id,
+            'sent': self.sent,
+            'completed': self.completed,
+            'failed': self.failed,
+            'timeouts': self.timeouts,
+            'backoff_until': self.backoff_until,
+            'latency': self.latency,
+            'success_rate': self.success_rate,
+            'num_samples': self.num_samples,
+        }
+
+
+class ParticipantSelector:
+    def __init__(self, policy=DEFAULT_POLICY, participants=DEFAULT_PARTICIPANTS,
+                 strata=DEFAULT_STRATA, seed=None):
+        if policy not in POLICIES:
+            raise ValueError('Unknown selection policy: ' + str(policy))
+        self.policy = policy
+        self.fraction, self.count = parse_participants(participants)
+        self.strata = max(1, strata)
+        self.random = random.Random(seed)
+        self.stats = {}
+
+    def record(self, connection_id):
+        if connection_id not in self.stats:
+            self.stats[connection_id] = ParticipantStats(connection_id)
+        return self.stats[connection_id]
+
+    def sample_size(self, available):
+        if self.count is not None:
+            return min(self.count, available)
+        return min(available, max(1, int(math.ceil(self.fraction * available))))
+
+    def select(self, connection_ids, round=None):
+        candidates = list(connection_ids)
+        available = [c for c in candidates if not self.record(c).backing_off(round)]
+        if available:
+            # Hospitals backing off are left out, unless that would leave nobody
+            candidates = available
+        size = self.sample_size(len(candidates))
+        if size >= len(candidates):
+            selected = candidates
+        elif self.policy == POLICY_STRATIFIED:
+            selected = self.select_stratified(candidates, size)
+        elif self.policy == POLICY_AVAILABILITY:
+            selected = self.select_available(candidates, size)
+        else:
+            selected = self.random.sample(candidates, size)
+        # Keep the trusted list's order, which sequential rounds follow
+        chosen = set(selected)
+        selected = [connection_id for connection_id in candidates if connection_id in chosen]
+        log_msg(
+            "SELECTED", len(selected), "OF", len(candidates), "HOSPITALS WITH", self.policy, "POLICY"
+        )
+        return selected
+
+    def select_stratified(self, candidates, size):
+        # Hospitals that have not reported a dataset size yet form a stratum of their own
+        known = sorted(
+            (c for c in candidates if self.record(c).num_samples is not None),
+            key=lambda c: self.stats[c].num_samples,
+        )
+        unknown = [c for c in candidates if self.stats[c].num_samples is None]
+        strata = [unknown] if unknown else []
+        if known:
+            bounds = [len(known) * i // self.strata for i in range(self.strata + 1)]
+            strata += [known[start:end] for start, end in zip(bounds, bounds[1:]) if end > start]
+
+        # Proportional allocation, the remainders going to the largest fractions
+        quotas = [size * len(stratum) / len(candidates) for stratum in strata]
+        allocation = [int(quota) for quota in quotas]
+        by_remainder = sorted(range(len(strata)), key=lambda i: quotas[i] - allocation[i], reverse=True)
+        for i in by_remainder[:size - sum(allocation)]:
+            allocation[i] += 1
+
+        selected = []
+        for stratum, take in zip(strata, allocation):
+            selected += self.random.sample(stratum, take)
+        return selected
+
+    def availability(self, connection_id, typical_latency):
+        stats = self.record(connection_id)
+        latency = stats.latency if stats.latency is not None else typical_latency
+        speed = typical_latency / latency if latency and typical_latency else 1.0
+        return max(MIN_AVAILABILITY, stats.success_rate * min(speed, 1.0 / MIN_AVAILABILITY))
+
+    def select_available(self, candidates, size):
+        latencies = sorted(self.stats[c].latency for c in candidates if self.record(c).latency is not None)
+        typical_latency = latencies[len(latencies) // 2] if latencies else None
+        # Weighted sampling without replacement: the largest u ** (1 / weight) win
+        keys = {
+            c: self.random.random() ** (1.0 / self.availability(c, typical_latency))
+            for c in candidates
+        }
+        return sorted(candidates, key=keys.get, reverse=True)[:size]
+
+    def dispatched(self, connection_id):
+        stats = self.record(connection_id)
+        if stats.outstanding:
+            # The model sent last time never came back
+            self.failed(connection_id)
+        stats.sent += 1
+        stats.dispatched_at = time.monotonic()
+
+    def completed(self, connection_id, num_samples=None):
+        stats = self.record(connection_id)
+        if not stats.outstanding:
+            # Nothing was sent to it, so there is no round to credit
+            return False
+        latency = time.monotonic() - stats.dispatched_at
+        if stats.latency is None:
+            stats.latency = latency
+        else:
+            stats.latency += LATENCY_SMOOTHING * (latency - stats.latency)
+        stats.dispatched_at = None
+        stats.completed += 1
+        stats.consecutive_timeouts = 0
+        stats.backoff_until = None
+        stats.recent.append(1)
+        if num_samples:
+            stats.num_samples = num_samples
+        return True
+
+    def failed(self, connection_id):
+        stats = self.record(connection_id)
+        stats.dispatched_at = None
+        stats.failed += 1
+        stats.recent.append(0)
+
+    def timed_out(self, connection_id, round):
+        # Missed the deadline of round: skip the next 1, 2, 4, ... rounds
+        self.failed(connection_id)
+        stats = self.record(connection_id)
+        stats.timeouts += 1
+        stats.consecutive_timeouts += 1
+        backoff = min(2 ** (stats.consecutive_timeouts - 1), MAX_BACKOFF_ROUNDS)
+        stats.backoff_until = round + 1 + backoff
+        log_msg("HOSPITAL", connection_id, "TIMED OUT, SKIPPING", backoff, "ROUNDS")
+
+    def summary(self, connection_ids=None):
+        ids = self.stats if connection_ids is None else connection_ids
+        return [self.record(connection_id).as_dict() for connection_id in ids]
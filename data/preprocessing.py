@@ -0,0 +1,362 @@
+import hashlib
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import torch
+from torch.utils.data import IterableDataset
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from demo.runners.support.utils import log_msg
+
+
+FEATURE_COLUMNS = ['Age', 'Gender', 'family_history', 'benefits', 'care_options', 'anonymity', 'leave', 'work_interfere']
+LABEL_COLUMN = 'treatment'
+
+# Assign default values for each data type
+DEFAULT_INT = 0
+DEFAULT_STRING = 'NaN'
+
+# Made gender groups, matched against the lower cased answer
+GENDER_GROUPS = {
+    'male': ["male", "m", "male-ish", "maile", "mal", "male (cis)", "make", "male ", "man", "msle", "mail", "malr", "cis man", "cis male"],
+    'trans': ["trans-female", "something kinda male?", "queer/she/they", "non-binary", "nah", "all", "enby", "fluid", "genderqueer", "androgyne", "agender", "male leaning androgynous", "guy (-ish) ^_^", "trans woman", "neuter", "female (trans)", "queer", "ostensibly male, unsure what that really means"],
+    'female': ["cis female", "f", "female", "woman", "femake", "female ", "cis-female/femme", "female (cis)", "femail"],
+}
+GENDER_LOOKUP = {answer: group for group, answers in GENDER_GROUPS.items() for answer in answers}
+
+# Answers that are not a gender at all
+GENDER_JUNK = ['A little about you', 'p']
+
+MIN_AGE = 18
+MAX_AGE = 120
+
+# Bump whenever cleaning or encoding changes, so that cached tensors are rebuilt
+PIPELINE_VERSION = 1
+CACHE_DIR = 'data/cache'
+
+# Extracts larger than STREAM_ABOVE_MB are not loaded at once but streamed, see
+# CSVStream: STREAM_CHUNK_ROWS rows are read, cleaned and encoded at a time, so
+# memory use depends on the chunk size rather than on the size of the extract
+STREAM_CHUNK_ROWS = int(os.getenv('FL_STREAM_CHUNK_ROWS', '100000'))
+STREAM_ABOVE_MB = float(os.getenv('FL_STREAM_ABOVE_MB', '512'))
+# A fixed vocabulary the coordinator sends to the hospitals and validates with,
+# written by vocabulary_to_json, e.g. from scan of a reference extract
+VOCABULARY_FILE = os.getenv('FL_VOCABULARY')
+
+# Hospitals keep HOLDOUT_FRACTION of their rows out of training, to evaluate
+# models on (see data/federated_evaluation.py). Whether a row is held out
+# depends on its line in the extract alone, so loading the extract at once or
+# streaming it in chunks holds out the same rows, round after round.
+HOLDOUT_FRACTION = float(os.getenv('FL_HOLDOUT_FRACTION', '0.1'))
+SPLIT_TRAIN = 'train'
+SPLIT_HOLDOUT = 'holdout'
+
+
+def prepare(df):
+    # Every step but the age median's works row by row, so a chunk of the
+    # extract prepares the same as the whole of it.
+    # Only the model's columns are kept: no other answer affects the result
+    df = df[FEATURE_COLUMNS + [LABEL_COLUMN]].copy()
+
+    # Clean the NaN's
+    for feature in df:
+        if feature == 'Age':
+            df[feature] = df[feature].fillna(DEFAULT_INT)
+        else:
+            df[feature] = df[feature].fillna(DEFAULT_STRING)
+
+    # Normalise 'Gender' through the lookup table, keeping unknown answers as is
+    gender = df['Gender']
+    df['Gender'] = gender.str.lower().map(GENDER_LOOKUP).fillna(gender)
+    df = df[~df['Gender'].isin(GENDER_JUNK)].copy()
+
+    # There are only 0.20% of self work_interfere so let's change NaN to "Don't know"
+    df['work_interfere'] = df['work_interfere'].replace([DEFAULT_STRING], "Don't know")
+
+    return df
+
+
+def clean(df, age_median=None):
+    # Every step works on whole columns, so cleaning time is linear in the rows.
+    # A chunk is cleaned with the whole extract's age median, see scan
+    df = prepare(df)
+
+    # Replace implausible ages with the median
+    age = df['Age']
+    if age_median is None:
+        age_median = age.median()
+    age = age.mask(age < MIN_AGE, age_median)
+    age = age.mask(age > MAX_AGE, age_median)
+    df['Age'] = age
+
+    return df
+
+
+def fit_vocabulary(df):
+    # The sorted distinct values of each column, as a LabelEncoder would fit them;
+    # hashing out the distinct values first leaves only a handful to sort
+    return {column: np.sort(pd.unique(df[column].values)) for column in FEATURE_COLUMNS + [LABEL_COLUMN]}
+
+
+def codes_of(df, column, vocabulary):
+    # A fixed vocabulary may lack values of this extract, e.g. free-text Gender
+    # answers or ages no reference hospital had: an answer it lacks takes the
+    # reserved unknown code, one past the vocabulary's, and an age lacking falls
+    # between the codes of the ages either side of it
+    values = df[column].values
+    if column == 'Age':
+        ages = vocabulary[column]
+        return np.interp(values.astype(np.float64), ages, np.arange(len(ages)))
+    codes = pd.Index(vocabulary[column]).get_indexer(values)
+    unseen = codes < 0
+    if unseen.any():
+        log_msg("ENCODED", int(unseen.sum()), column, "VALUES NOT IN THE VOCABULARY AS UNKNOWN")
+        codes[unseen] = len(vocabulary[column])
+    return codes
+
+
+def encode(df, vocabulary):
+    # Rows whose label the vocabulary lacks can be neither trained nor scored on
+    labels = pd.Index(vocabulary[LABEL_COLUMN]).get_indexer(df[LABEL_COLUMN].values)
+    known = labels >= 0
+    if not known.all():
+        log_msg("DROPPED", int((~known).sum()), "ROWS WITH A LABEL NOT IN THE VOCABULARY")
+        df, labels = df[known], labels[known]
+
+    columns = []
+    for column in FEATURE_COLUMNS:
+        codes = codes_of(df, column, vocabulary).astype(np.float32)
+        if column == 'Age':
+            # Scaling Age codes to [0, 1]
+            top = len(vocabulary[column]) - 1
+            codes = codes / top if top else codes * 0
+        columns.append(codes)
+    features = np.stack(columns, axis=1)
+
+    return features, labels.astype(np.float32).reshape(-1, 1)
+
+
+def holdout_mask(rows, fraction=HOLDOUT_FRACTION):
+    # Fibonacci hashing spreads consecutive line numbers evenly over [0, 2**32)
+    hashed = (np.asarray(rows, dtype=np.uint64) * np.uint64(2654435761)) % np.uint64(2 ** 32)
+    return hashed < np.uint64(fraction * 2 ** 32)
+
+
+def split_rows(df, split=None, fraction=HOLDOUT_FRACTION):
+    # The rows of a split, by their line in the extract: read_csv numbers the
+    # rows of every chunk on from the last, and cleaning keeps the numbers
+    if split is None or not fraction:
+        return df
+    mask = holdout_mask(df.index.values, fraction)
+    return df[mask if split == SPLIT_HOLDOUT else ~mask]
+
+
+def median_of_counts(counts):
+    # The median of the values counted, averaging the middle two as pandas does
+    counts = counts.sort_index()
+    positions = counts.cumsum().values
+    total = positions[-1]
+    lower = counts.index[np.searchsorted(positions, (total - 1) // 2, side='right')]
+    upper = counts.index[np.searchsorted(positions, total // 2, side='right')]
+    return (lower + upper) / 2
+
+
+def scan(csv_path, chunk_rows=STREAM_CHUNK_ROWS):
+    # The first pass over an extract too large to load: only the distinct values
+    # and the ages' counts are kept, which gives the same vocabulary and age
+    # median that clean and fit_vocabulary would give for the whole extract
+    start = time.perf_counter()
+    columns = FEATURE_COLUMNS + [LABEL_COLUMN]
+    distinct = {column: set() for column in columns if column != 'Age'}
+    age_counts = pd.Series([], dtype=np.float64)
+    rows = 0
+    for chunk in pd.read_csv(csv_path, usecols=columns, chunksize=chunk_rows):
+        df = prepare(chunk)
+        rows += len(df)
+        age_counts = age_counts.add(df['Age'].value_counts(), fill_value=0)
+        for column, values in distinct.items():
+            values.update(pd.unique(df[column].values))
+    if not rows:
+        raise ValueError('No usable rows in ' + csv_path)
+
+    age_median = median_of_counts(age_counts)
+    ages = age_counts.index.values.astype(np.float64)
+    plausible = (ages >= MIN_AGE) & (ages <= MAX_AGE)
+    if not plausible.all():
+        ages = np.append(ages[plausible], age_median)
+    vocabulary = {column: np.array(sorted(values), dtype=object) for column, values in distinct.items()}
+    vocabulary['Age'] = np.unique(ages)
+    log_msg("SCANNED", rows, "ROWS IN", round((time.perf_counter() - start) * 1000, 1), "MS")
+    return vocabulary, age_median, rows
+
+
+def vocabulary_to_json(vocabulary, age_median=None):
+    # A fixed vocabulary, e.g. sent by the coordinator so that every hospital
+    # encodes its extract the same way, and streams it without a first pass
+    return json.dumps({
+        'vocabulary': {column: values.tolist() for column, values in vocabulary.items()},
+        'age_median': None if age_median is None else float(age_median),
+    })
+
+
+def vocabulary_from_json(text):
+    payload = json.loads(text) if isinstance(text, str) else text
+    columns = payload['vocabulary']
+    missing = set(FEATURE_COLUMNS + [LABEL_COLUMN]) - set(columns)
+    if missing:
+        raise ValueError('Vocabulary has no values for ' + ', '.join(sorted(missing)))
+    vocabulary = {
+        column: np.array(values, dtype=np.float64 if column == 'Age' else object)
+        for column, values in columns.items()
+    }
+    return vocabulary, payload.get('age_median')
+
+
+def read_vocabulary(path=VOCABULARY_FILE):
+    # The fixed vocabulary's JSON payload, or None if there is none
+    if not path:
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def vocabulary_key(vocabulary, age_median=None):
+    return hashlib.sha256(vocabulary_to_json(vocabulary, age_median).encode()).hexdigest()[:16]
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def cache_paths(cache_dir, key):
+    return {
+        'features': os.path.join(cache_dir, key + '.features.npy'),
+        'labels': os.path.join(cache_dir, key + '.labels.npy'),
+        'vocabulary': os.path.join(cache_dir, key + '.vocabulary.npz'),
+    }
+
+
+def save_arrays(path, save, *args, **kwargs):
+    # Write next to the final path, then rename, so readers never see half a file
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        save(f, *args, **kwargs)
+    os.replace(tmp_path, path)
+
+
+def read_cache(paths):
+    if not all(os.path.exists(path) for path in paths.values()):
+        return None
+    # Memory-mapped copy-on-write: no copy is made unless a tensor is written to
+    features = np.load(paths['features'], mmap_mode='c')
+    labels = np.load(paths['labels'], mmap_mode='c')
+    with np.load(paths['vocabulary']) as vocabulary:
+        vocabulary = {column: vocabulary[column] for column in vocabulary.files}
+    return features, labels, vocabulary
+
+
+def write_cache(paths, features, labels, vocabulary):
+    os.makedirs(os.path.dirname(paths['features']), exist_ok=True)
+    save_arrays(paths['features'], np.save, features)
+    save_arrays(paths['labels'], np.save, labels)
+    # Store text vocabularies as fixed width unicode, so loading needs no pickle
+    save_arrays(paths['vocabulary'], np.savez, **{
+        column: values.astype(str) if values.dtype == object else values
+        for column, values in vocabulary.items()
+    })
+
+
+def load_dataset(csv_path, cache_dir=CACHE_DIR, vocabulary=None, age_median=None, split=None,
+                 holdout_fraction=HOLDOUT_FRACTION):
+    # A vocabulary given is used as is rather than fitted to the extract, which
+    # is the whole extract's whichever split is loaded
+    start = time.perf_counter()
+    key = file_sha256(csv_path) + '-v' + str(PIPELINE_VERSION)
+    if vocabulary is not None:
+        key += '-' + vocabulary_key(vocabulary, age_median)
+    if split is not None and holdout_fraction:
+        key += '-{}{:g}'.format(split, holdout_fraction)
+    paths = cache_paths(cache_dir, key)
+
+    cached = read_cache(paths)
+    if cached:
+        features, labels, vocabulary = cached
+        log_msg("LOADED", len(features), "CACHED ROWS IN", round((time.perf_counter() - start) * 1000, 1), "MS")
+    else:
+        df = clean(pd.read_csv(csv_path), age_median)
+        if vocabulary is None:
+            vocabulary = fit_vocabulary(df)
+        df = split_rows(df, split, holdout_fraction)
+        features, labels = encode(df, vocabulary)
+        write_cache(paths, features, labels, vocabulary)
+        log_msg("CLEANED", len(df), "ROWS IN", round((time.perf_counter() - start) * 1000, 1), "MS")
+
+    return torch.from_numpy(features), torch.from_numpy(labels)
+
+
+def streams(csv_path):
+    return os.path.getsize(csv_path) > STREAM_ABOVE_MB * 1024 * 1024
+
+
+class CSVStream(IterableDataset):
+    # Yields the extract's mini-batches, reading chunk_rows rows of the CSV at a
+    # time; rows are shuffled within each chunk, and batches run on across chunk
+    # boundaries so that all but the last one are full. Without a vocabulary, or
+    # with one but no age median, a first pass fits them (see scan): a fixed
+    # vocabulary is kept, and only the whole extract's age median is taken from
+    # it. With a split, only its rows are yielded.
+    def __init__(self, csv_path, vocabulary=None, age_median=None,
+                 batch_size=32, shuffle=True, chunk_rows=STREAM_CHUNK_ROWS, split=None,
+                 holdout_fraction=HOLDOUT_FRACTION):
+        self.csv_path = csv_path
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.chunk_rows = chunk_rows
+        self.split = split
+        self.holdout_fraction = holdout_fraction
+        self.num_samples = None
+        if vocabulary is None:
+            vocabulary, age_median, rows = scan(csv_path, chunk_rows)
+            # The scan counts every row; a split's count is known after a pass
+            if split is None or not holdout_fraction:
+                self.num_samples = rows
+        elif age_median is None:
+            _, age_median, _ = scan(csv_path, chunk_rows)
+        self.vocabulary = vocabulary
+        self.age_median = age_median
+
+    def chunks(self):
+        reader = pd.read_csv(self.csv_path, usecols=FEATURE_COLUMNS + [LABEL_COLUMN], chunksize=self.chunk_rows)
+        for chunk in reader:
+            df = split_rows(clean(chunk, self.age_median), self.split, self.holdout_fraction)
+            if len(df):
+                features, labels = encode(df, self.vocabulary)
+                yield torch.from_numpy(features), torch.from_numpy(labels)
+
+    def __iter__(self):
+        rows = 0
+        features = torch.empty(0, len(FEATURE_COLUMNS))
+        labels = torch.empty(0, 1)
+        for chunk_features, chunk_labels in self.chunks():
+            rows += len(chunk_features)
+            if self.shuffle:
+                order = torch.randperm(len(chunk_features))
+                chunk_features, chunk_labels = chunk_features[order], chunk_labels[order]
+            # Only the rows left over from the last chunk are carried on
+            features = torch.cat([features, chunk_features])
+            labels = torch.cat([labels, chunk_labels])
+            full = len(features) - len(features) % self.batch_size
+            for start in range(0, full, self.batch_size):
+                yield features[start:start + self.batch_size], labels[start:start + self.batch_size]
+            features, labels = features[full:], labels[full:]
+        if len(features):
+            yield features, labels
+        self.num_samples = rows
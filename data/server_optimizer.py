@@ -0,0 +1,148 @@
+import os
+import sys
+
+import torch
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from demo.runners.support.utils import log_msg
+from data import model_format
+from data.parameter_groups import in_groups
+
+
+# Adaptive federated optimization (Reddi et al., 2021): rather than taking the
+# average of the hospitals' models as the new global model, the coordinator
+# treats the change from the global model to the average as a pseudo-gradient
+# and applies it with an optimizer of its own, whose state lasts the whole job:
+#   none      plain FedAvg, the average is the new model
+#   fedavgm   server momentum:  m = beta1 * m + change;  x += lr * m
+#   fedadam   m = beta1 * m + (1 - beta1) * change
+#             v = beta2 * v + (1 - beta2) * change ** 2
+#             x += lr * m / (sqrt(v) + tau)
+#   fedyogi   as fedadam, but v moves towards change ** 2 additively:
+#             v = v - (1 - beta2) * change ** 2 * sign(v - change ** 2)
+# Only parallel rounds are aggregated this way.
+SERVER_OPTIMIZERS = ('none', 'fedavgm', 'fedadam', 'fedyogi')
+DEFAULT_SERVER_OPTIMIZER = os.getenv('FL_SERVER_OPTIMIZER', 'none')
+# The server learning rate, by default 1 with momentum alone and 0.01 with an
+# adaptive optimizer, whose steps are about lr in size whatever the change's
+SERVER_LR = os.getenv('FL_SERVER_LR')
+DEFAULT_SERVER_LRS = {'none': 1.0, 'fedavgm': 1.0, 'fedadam': 0.01, 'fedyogi': 0.01}
+SERVER_BETA1 = float(os.getenv('FL_SERVER_BETA1', '0.9'))
+SERVER_BETA2 = float(os.getenv('FL_SERVER_BETA2', '0.99'))
+SERVER_TAU = float(os.getenv('FL_SERVER_TAU', '0.001'))
+
+
+class ServerOptimizer:
+    def __init__(self, kind=DEFAULT_SERVER_OPTIMIZER, lr=SERVER_LR, beta1=SERVER_BETA1,
+                 beta2=SERVER_BETA2, tau=SERVER_TAU):
+        if kind not in SERVER_OPTIMIZERS:
+            raise ValueError('Unknown server optimizer: ' + str(kind))
+        self.kind = kind
+        self.lr = DEFAULT_SERVER_LRS[kind] if lr is None else float(lr)
+        self.beta1 = beta1
+        self.beta2 = beta2
+        self.tau = tau
+        self.reset()
+
+    @classmethod
+    def from_settings(cls, settings):
+        # The optimizer settings() described, e.g. in an FL job's settings
+        return cls(
+            settings.get('server_optimizer', DEFAULT_SERVER_OPTIMIZER),
+            settings.get('server_lr'),
+            settings.get('server_beta1', SERVER_BETA1),
+            settings.get('server_beta2', SERVER_BETA2),
+            settings.get('server_tau', SERVER_TAU),
+        )
+
+    def reset(self):
+        # A new job starts without moments
+        self.steps = 0
+        # Moments per tensor name, as float32 tensors
+        self.m = {}
+        self.v = {}
+
+    @property
+    def enabled(self):
+        return self.kind != 'none'
+
+    def settings(self):
+        return {
+            'server_optimizer': self.kind,
+            'server_lr': self.lr,
+            'server_beta1': self.beta1,
+            'server_beta2': self.beta2,
+            'server_tau': self.tau,
+        }
+
+    def save(self, path, model_sha256=None):
+        # The moments, with the hash of the global model they brought about
+        tmp_path = path + '.tmp'
+        torch.save({
+            'settings': self.settings(),
+            'model_sha256': model_sha256,
+            'steps': self.steps,
+            'm': self.m,
+            'v': self.v,
+        }, tmp_path)
+        os.replace(tmp_path, path)
+
+    def restore(self, path, model_sha256=None):
+        # The moments saved at path, if they were saved with these settings and
+        # the same global model; otherwise the optimizer starts without moments
+        self.reset()
+        if not os.path.exists(path):
+            return False
+        try:
+            saved = torch.load(path)
+        except (OSError, EOFError, RuntimeError, ValueError) as e:
+            log_msg("DISCARDING SERVER OPTIMIZER STATE", path, e)
+            return False
+        if saved.get('settings') != self.settings() or saved.get('model_sha256') != model_sha256:
+            log_msg("DISCARDING SERVER OPTIMIZER STATE OF ANOTHER MODEL OR SETTINGS", path)
+            return False
+        self.steps = saved['steps']
+        self.m = saved['m']
+        self.v = saved['v']
+        log_msg("RESTORED", self.kind, "STATE AFTER", self.steps, "STEPS")
+        return True
+
+    def step(self, state, averaged_state, frozen=None):
+        # The new global state from the current one and the round's average
+        if not self.enabled:
+            return dict(averaged_state)
+        new_state = {}
+        for name, tensor in state.items():
+            if not tensor.is_floating_point() or (frozen and in_groups(name, frozen)):
+                new_state[name] = averaged_state[name]
+                continue
+            current = tensor.float()
+            change = averaged_state[name].float() - current
+            m = self.m.get(name)
+            if m is None or m.shape != change.shape:
+                m = self.m[name] = torch.zeros_like(change)
+                self.v[name] = torch.zeros_like(change)
+            v = self.v[name]
+
+            if self.kind == 'fedavgm':
+                m.mul_(self.beta1).add_(change)
+                new_state[name] = current + self.lr * m
+                continue
+            m.mul_(self.beta1).add_(change * (1 - self.beta1))
+            squared = change * change
+            if self.kind == 'fedadam':
+                v.mul_(self.beta2).add_(squared * (1 - self.beta2))
+            else:
+                v.sub_(squared * (1 - self.beta2) * torch.sign(v - squared))
+            new_state[name] = current + self.lr * m / (v.sqrt() + self.tau)
+        self.steps += 1
+        return new_state
+
+    def apply(self, model_path, average_path, output_path, frozen=None):
+        # Writes the new global model, from the one at model_path and the round's average
+        model = model_format.load(model_path)
+        _, averaged_state = model_format.load_state(average_path)
+        model.load_state_dict(self.step(model.state_dict(), averaged_state, frozen))
+        model_format.save(model, output_path)
+        log_msg("APPLIED THE ROUND'S AVERAGE WITH", self.kind, "STEP", self.steps)
+        return output_path
@@ -0,0 +1,78 @@
+import os
+import sys
+from unittest import TestCase
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from data.convergence import (
+    STOP_BYTE_BUDGET,
+    STOP_MAX_ROUNDS,
+    STOP_PLATEAU,
+    STOP_TIME_BUDGET,
+    ConvergenceMonitor,
+)
+
+
+def monitor(**kwargs):
+    settings = dict(metric="loss", patience=0, tolerance=0.01, max_rounds=0, time_budget=0, byte_budget=0)
+    settings.update(kwargs)
+    return ConvergenceMonitor(**settings)
+
+
+class TestConvergenceMonitor(TestCase):
+    def test_unknown_metric(self):
+        with self.assertRaises(ValueError):
+            monitor(metric="f1")
+
+    def test_plateau(self):
+        convergence = monitor(patience=2)
+        assert convergence.record(1, {"loss": 0.5}, 1, 10) is None
+        assert convergence.record(2, {"loss": 0.4}, 1, 10) is None
+        # Improvements within the tolerance count as none
+        assert convergence.record(3, {"loss": 0.395}, 1, 10) is None
+        assert convergence.record(4, {"loss": 0.41}, 1, 10) == STOP_PLATEAU
+        assert convergence.best == 0.395 and convergence.best_round == 3
+
+    def test_improvement_resets_the_patience(self):
+        convergence = monitor(patience=2)
+        convergence.record(1, {"loss": 0.5}, 1, 10)
+        convergence.record(2, {"loss": 0.5}, 1, 10)
+        convergence.record(3, {"loss": 0.3}, 1, 10)
+        assert convergence.stale_rounds == 0
+        assert convergence.record(4, None, 1, 10) is None
+        assert convergence.record(5, {}, 1, 10) == STOP_PLATEAU
+
+    def test_auc_rises(self):
+        convergence = monitor(metric="auc", patience=1)
+        assert convergence.record(1, {"auc": 0.6}, 1, 10) is None
+        assert convergence.record(2, {"auc": 0.7}, 1, 10) is None
+        assert convergence.record(3, {"auc": 0.65}, 1, 10) == STOP_PLATEAU
+        assert convergence.best == 0.7
+
+    def test_max_rounds(self):
+        convergence = monitor(max_rounds=2)
+        assert convergence.record(1, {"loss": 0.5}, 1, 10) is None
+        assert convergence.record(2, {"loss": 0.4}, 1, 10) == STOP_MAX_ROUNDS
+
+    def test_budgets_stop_before_they_run_out(self):
+        # Another round like the last would exceed the budget
+        convergence = monitor(time_budget=25)
+        assert convergence.record(1, {"loss": 0.5}, 10, 10) is None
+        assert convergence.record(2, {"loss": 0.4}, 10, 10) == STOP_TIME_BUDGET
+        convergence = monitor(byte_budget=250)
+        assert convergence.record(1, {"loss": 0.5}, 1, 100) is None
+        assert convergence.record(2, {"loss": 0.4}, 1, 100) == STOP_BYTE_BUDGET
+
+    def test_summary(self):
+        convergence = monitor(max_rounds=2)
+        convergence.record(1, {"loss": 0.5}, 1.5, 10)
+        convergence.record(2, {"loss": 0.4}, 2.5, 20)
+        assert convergence.summary() == {
+            "metric": "loss",
+            "rounds": 2,
+            "best": 0.4,
+            "best_round": 2,
+            "seconds": 4.0,
+            "bytes": 30,
+            "stop": STOP_MAX_ROUNDS,
+        }
+        assert convergence.rounds[-1]["stop"] == STOP_MAX_ROUNDS
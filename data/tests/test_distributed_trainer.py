@@ -0,0 +1,59 @@
+import os
+import sys
+from unittest import TestCase
+
+import pytest
+
+torch = pytest.importorskip("torch")
+from torch import nn
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from data.distributed_trainer import shard, shard_config, train_distributed, worker_count
+from data.trainer import TrainingConfig
+
+
+def dataset(samples=64):
+    generator = torch.Generator().manual_seed(0)
+    features = torch.rand(samples, 4, generator=generator)
+    return features, (features.sum(dim=1, keepdim=True) > 2).float()
+
+
+def model():
+    torch.manual_seed(0)
+    return nn.Sequential(nn.Linear(4, 1), nn.Sigmoid())
+
+
+class TestSharding(TestCase):
+    def test_worker_count(self):
+        assert worker_count(1000, TrainingConfig(workers=4, min_samples_per_worker=100)) == 4
+        assert worker_count(250, TrainingConfig(workers=4, min_samples_per_worker=100)) == 2
+        assert worker_count(10, TrainingConfig(workers=4, min_samples_per_worker=100)) == 1
+
+    def test_shards_are_equal_and_disjoint(self):
+        tensor = torch.arange(11)
+        shards = [shard(tensor, rank, 3, len(tensor) // 3) for rank in range(3)]
+        assert all(len(part) == 3 for part in shards)
+        assert not set.intersection(*(set(part.tolist()) for part in shards))
+
+    def test_batch_is_split_between_the_ranks(self):
+        config = TrainingConfig(batch_size=32, epochs=7)
+        assert shard_config(config, 3).batch_size == 11
+        assert shard_config(config, 3).epochs == 7
+
+
+class TestTrainDistributed(TestCase):
+    def test_single_process(self):
+        config = TrainingConfig(workers=1, epochs=2, batch_size=16, plateau_patience=0, seed=1)
+        stats = train_distributed(model(), *dataset(), config)
+        assert stats["workers"] == 1 and stats["samples"] == 128
+
+    def test_two_processes(self):
+        config = TrainingConfig(
+            workers=2, min_samples_per_worker=1, threads=1, epochs=2, batch_size=16,
+            plateau_patience=0, seed=1,
+        )
+        trained = model()
+        before = [parameter.clone() for parameter in trained.parameters()]
+        stats = train_distributed(trained, *dataset(), config)
+        assert stats["workers"] == 2 and stats["samples"] == 128 and stats["epochs"] == 2
+        assert any(not torch.equal(a, b) for a, b in zip(before, trained.parameters()))
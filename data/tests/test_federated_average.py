@@ -0,0 +1,118 @@
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+from unittest import TestCase
+
+import pytest
+
+torch = pytest.importorskip("torch")
+from torch import nn
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from data import model_format
+from data.federated_average import federated_async_update, federated_average, staleness_weight
+from data.update_codec import encode_update
+
+
+def run(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+def model(seed):
+    torch.manual_seed(seed)
+    return nn.Sequential(nn.Linear(8, 4), nn.ReLU(), nn.Linear(4, 1), nn.Sigmoid())
+
+
+class TestFederatedAverage(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def saved(self, seed):
+        path = self.path("model{}.fltm".format(seed))
+        model_format.save(model(seed), path)
+        return path
+
+    def test_weights_by_samples(self):
+        paths = [self.saved(seed) for seed in (1, 2, 3)]
+        counts = [10, 30, 60]
+        assert run(federated_average(paths, counts, self.path("average.fltm")))
+
+        averaged = model_format.load(self.path("average.fltm")).state_dict()
+        states = [model_format.load(path).state_dict() for path in paths]
+        for name, tensor in averaged.items():
+            expected = sum(state[name] * count / 100 for state, count in zip(states, counts))
+            assert torch.allclose(tensor, expected, atol=1e-6)
+
+    def test_nothing_to_aggregate(self):
+        assert not run(federated_average([], [], self.path("average.fltm")))
+        assert not run(federated_average([self.saved(1)], [0], self.path("average.fltm")))
+        assert not os.path.exists(self.path("average.fltm"))
+
+    def test_updates_and_models_mixed(self):
+        base_path = self.saved(0)
+        base_state = model_format.load(base_path).state_dict()
+        models = [model(seed) for seed in (1, 2)]
+        update_path = self.path("update.flup")
+        with open(update_path, "wb") as f:
+            f.write(encode_update(models[0].state_dict(), base_state, "delta+fp32+deflate"))
+        model_path = self.path("model2.fltm")
+        model_format.save(models[1], model_path)
+
+        assert run(federated_average(
+            [update_path, model_path], [1, 3], self.path("average.fltm"), base_path=base_path
+        ))
+        averaged = model_format.load(self.path("average.fltm")).state_dict()
+        for name, tensor in averaged.items():
+            expected = models[0].state_dict()[name] * 0.25 + models[1].state_dict()[name] * 0.75
+            assert torch.allclose(tensor, expected, atol=1e-5)
+
+    def test_keeps_frozen_weights(self):
+        frozen_model = model(1)
+        paths = []
+        for seed in (2, 3):
+            trained = model(seed)
+            trained[0].load_state_dict(frozen_model[0].state_dict())
+            path = self.path("model{}.fltm".format(seed))
+            model_format.save(trained, path)
+            paths.append(path)
+
+        assert run(federated_average(paths, [1, 2], self.path("average.fltm"), frozen=["0"]))
+        averaged = model_format.load(self.path("average.fltm"))
+        assert torch.equal(averaged[0].weight, frozen_model[0].weight)
+        assert torch.equal(averaged[0].bias, frozen_model[0].bias)
+
+
+class TestFederatedAsync(TestCase):
+    def test_staleness_weight(self):
+        assert staleness_weight(0, mixing=0.6) == pytest.approx(0.6)
+        assert staleness_weight(3, mixing=0.6, exponent=0.5) == pytest.approx(0.3)
+        assert staleness_weight(-2, mixing=0.6) == pytest.approx(0.6)
+        assert staleness_weight(8, mixing=1.0) < staleness_weight(1, mixing=1.0)
+
+    def test_mixes_at_the_staleness_weight(self):
+        directory = tempfile.mkdtemp()
+        try:
+            paths = [os.path.join(directory, name) for name in ("global", "update", "merged")]
+            model_format.save(model(1), paths[0])
+            model_format.save(model(2), paths[1])
+            weight = run(federated_async_update(paths[0], paths[1], 3, paths[2], mixing=0.6, exponent=0.5))
+            assert weight == pytest.approx(0.3)
+
+            merged = model_format.load(paths[2]).state_dict()
+            for name, tensor in merged.items():
+                expected = model(1).state_dict()[name] * 0.7 + model(2).state_dict()[name] * 0.3
+                assert torch.allclose(tensor, expected, atol=1e-6)
+        finally:
+            shutil.rmtree(directory)
@@ -0,0 +1,79 @@
+import os
+import sys
+from unittest import TestCase
+
+import pytest
+
+torch = pytest.importorskip("torch")
+from torch import nn
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from data.federated_evaluation import (
+    auc_from_histograms,
+    check_counts,
+    empty_counts,
+    evaluate,
+    merge,
+    summarize,
+)
+
+
+class Scores(nn.Module):
+    # Returns the first feature as the score
+    def forward(self, features):
+        return features[:, :1]
+
+
+def batches(scores, labels, batch_size=2):
+    features = torch.tensor(scores).view(-1, 1)
+    labels = torch.tensor(labels).view(-1, 1)
+    return [
+        (features[start:start + batch_size], labels[start:start + batch_size])
+        for start in range(0, len(features), batch_size)
+    ]
+
+
+class TestFederatedEvaluation(TestCase):
+    def test_evaluate(self):
+        counts = evaluate(Scores(), batches([0.9, 0.2, 0.7, 0.4, 0.6], [1.0, 0.0, 0.0, 1.0, 1.0]), bins=10)
+        assert counts["samples"] == 5
+        assert counts["loss_sum"] == pytest.approx(0.01 + 0.04 + 0.49 + 0.36 + 0.16)
+        assert counts["confusion"] == {
+            "true_positive": 2, "false_positive": 1, "false_negative": 1, "true_negative": 1,
+        }
+        assert counts["histogram"]["positive"][9] == 1 and counts["histogram"]["negative"][2] == 1
+        assert check_counts(counts) is counts
+
+    def test_merge_is_exact(self):
+        scores = [0.9, 0.2, 0.7, 0.4, 0.6, 0.1]
+        labels = [1.0, 0.0, 0.0, 1.0, 1.0, 0.0]
+        whole = evaluate(Scores(), batches(scores, labels), bins=10)
+        parts = [
+            evaluate(Scores(), batches(scores[:4], labels[:4]), bins=10),
+            evaluate(Scores(), batches(scores[4:], labels[4:]), bins=10),
+        ]
+        merged = merge(parts)
+        for name in ("samples", "confusion", "histogram"):
+            assert merged[name] == whole[name]
+        assert merged["loss_sum"] == pytest.approx(whole["loss_sum"])
+        assert summarize(merged)["accuracy"] == pytest.approx(4 / 6)
+
+    def test_merge_nothing(self):
+        assert merge([])["samples"] == 0
+        assert summarize(merge([]))["loss"] is None
+
+    def test_check_counts(self):
+        counts = empty_counts(4)
+        counts["samples"] = 1
+        with self.assertRaises(ValueError):
+            check_counts(counts)
+        with self.assertRaises(ValueError):
+            check_counts({"samples": 1})
+        with self.assertRaises(ValueError):
+            merge([empty_counts(4), empty_counts(8)])
+
+    def test_auc(self):
+        assert auc_from_histograms([0, 0, 3], [2, 0, 0]) == 1.0
+        assert auc_from_histograms([2, 0], [2, 0]) == 0.5
+        assert auc_from_histograms([0, 1, 1], [1, 1, 0]) == pytest.approx(0.875)
+        assert auc_from_histograms([1, 2], [0, 0]) is None
@@ -0,0 +1,116 @@
+import os
+import shutil
+import sys
+import tempfile
+from unittest import TestCase
+
+import pytest
+
+torch = pytest.importorskip("torch")
+from torch import nn
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from data import model_format
+from data.parameter_groups import freeze, keep_frozen, parse_groups
+
+
+def model(seed=0):
+    torch.manual_seed(seed)
+    return nn.Sequential(nn.Linear(8, 4), nn.ReLU(), nn.Dropout(0.2), nn.Linear(4, 1), nn.Sigmoid())
+
+
+def same_state(state, other_state):
+    return list(state) == list(other_state) and all(
+        torch.equal(tensor, other_state[name]) for name, tensor in state.items()
+    )
+
+
+class TestModelFormat(TestCase):
+    def test_round_trip(self):
+        original = model()
+        data = model_format.dumps(original)
+        assert model_format.is_model_format(data)
+        loaded = model_format.loads(data)
+        assert model_format.describe(loaded) == model_format.describe(original)
+        assert same_state(loaded.state_dict(), original.state_dict())
+
+    def test_tensors_are_aligned(self):
+        header, _ = model_format.loads_state(model_format.dumps(model()))
+        assert header["data_offset"] % model_format.ALIGNMENT == 0
+        for entry in header["tensors"]:
+            assert entry["offset"] % model_format.ALIGNMENT == 0
+
+    def test_save_and_load_mapped(self):
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, "model.fltm")
+            original = model()
+            model_format.save(original, path)
+            assert not os.path.exists(path + ".tmp")
+            assert model_format.read_header(path)["version"] == model_format.VERSION
+            assert same_state(model_format.load(path).state_dict(), original.state_dict())
+        finally:
+            shutil.rmtree(directory)
+
+    def test_rejects_other_data(self):
+        with self.assertRaises(ValueError):
+            model_format.loads(b"PK\x03\x04" + bytes(64))
+
+    def test_rejects_unsupported_layers(self):
+        with self.assertRaises(ValueError):
+            model_format.dumps(nn.Sequential(nn.Conv1d(1, 1, 3)))
+        with self.assertRaises(ValueError):
+            model_format.build({"type": "Sequential", "layers": [{"type": "Module"}]})
+
+
+class TestPartialModels(TestCase):
+    def setUp(self):
+        self.full = model(1)
+        self.frozen = parse_groups("0")
+        # Trained on with the first layer frozen
+        self.trained = model(2)
+        self.trained[0].load_state_dict(self.full[0].state_dict())
+
+    def test_partial_leaves_the_frozen_tensors_out(self):
+        header, state = model_format.loads_state(model_format.dumps(self.trained, self.frozen, partial=True))
+        assert header["partial"]
+        assert model_format.frozen_groups(header) == ["0"]
+        assert list(state) == ["3.weight", "3.bias"]
+        with self.assertRaises(ValueError):
+            model_format.module_from(header, state)
+
+    def test_complete_state(self):
+        header, state = model_format.loads_state(model_format.dumps(self.trained, self.frozen, partial=True))
+        header, state = model_format.complete_state(header, state, self.full.state_dict())
+        assert not header["partial"]
+        assert same_state(model_format.module_from(header, state).state_dict(), self.trained.state_dict())
+
+    def test_complete_state_needs_the_pinned_weights(self):
+        header, state = model_format.loads_state(model_format.dumps(self.trained, self.frozen, partial=True))
+        with self.assertRaises(model_format.FrozenWeightsMissing) as context:
+            model_format.complete_state(header, state, model(3).state_dict())
+        assert model_format.needs_full_model(context.exception)
+        # As a training worker reports it
+        assert model_format.needs_full_model(Exception("data.model_format.FrozenWeightsMissing: ..."))
+        assert not model_format.needs_full_model(ValueError("Unsupported layer"))
+
+    def test_full_model_is_left_as_is(self):
+        header, state = model_format.loads_state(model_format.dumps(self.trained, self.frozen))
+        assert model_format.complete_state(header, state, model(3).state_dict()) == (header, state)
+
+    def test_parse_groups(self):
+        assert parse_groups("0, 2,") == ["0", "2"]
+        assert parse_groups(["1"]) == ["1"]
+        assert parse_groups("") == []
+
+    def test_freeze(self):
+        share = freeze(self.trained, self.frozen)
+        assert share == pytest.approx(36 / 41)
+        assert not self.trained[0].weight.requires_grad
+        assert self.trained[3].weight.requires_grad
+
+    def test_keep_frozen(self):
+        averaged = {name: tensor + 1 for name, tensor in self.trained.state_dict().items()}
+        keep_frozen(averaged, self.full.state_dict(), self.frozen)
+        assert torch.equal(averaged["0.weight"], self.full[0].weight)
+        assert torch.equal(averaged["3.weight"], self.trained[3].weight + 1)
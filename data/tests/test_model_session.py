@@ -0,0 +1,78 @@
+import os
+import shutil
+import sys
+import tempfile
+from unittest import TestCase
+
+import pytest
+
+torch = pytest.importorskip("torch")
+from torch import nn
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from data import model_format
+from data.model_session import ModelSession, session_path
+from data.trainer import TrainingConfig
+from data.update_codec import decode_update
+
+
+def model_bytes(seed, hidden=4):
+    torch.manual_seed(seed)
+    return model_format.dumps(nn.Sequential(nn.Linear(4, hidden), nn.ReLU(), nn.Linear(hidden, 1), nn.Sigmoid()))
+
+
+class TestModelSession(TestCase):
+    def setUp(self):
+        self.session = ModelSession()
+        self.set_data()
+        self.config = TrainingConfig(epochs=2, batch_size=8, plateau_patience=0, seed=1)
+
+    def set_data(self):
+        generator = torch.Generator().manual_seed(0)
+        features = torch.rand(32, 4, generator=generator)
+        self.session._data = (features, (features.sum(dim=1, keepdim=True) > 2).float())
+
+    def test_live_model_is_updated_in_place(self):
+        self.session.load(model_bytes(1))
+        self.session.train(self.config)
+        model, optimizer = self.session.model, self.session.optimizer
+
+        self.session.load(model_bytes(2))
+        assert self.session.model is model and self.session.optimizer is optimizer
+        assert self.session.rounds == 1
+
+    def test_other_architecture_replaces_the_model(self):
+        self.session.load(model_bytes(1))
+        self.session.train(self.config)
+        model = self.session.model
+        self.session.load(model_bytes(1, hidden=8))
+        assert self.session.model is not model and self.session.optimizer is None
+
+    def test_update_is_encoded_against_the_round_base(self):
+        self.session.load(model_bytes(1))
+        base_state = {name: tensor.clone() for name, tensor in self.session.base_state.items()}
+        self.session.train(self.config)
+        state, _ = decode_update(self.session.encode_update("delta+fp32"), base_state)
+        for name, tensor in self.session.model.state_dict().items():
+            assert torch.allclose(state[name], tensor, atol=1e-6)
+
+    def test_state_survives_a_restart(self):
+        directory = tempfile.mkdtemp()
+        try:
+            path = session_path("connection", "job", directory)
+            config = TrainingConfig(epochs=2, batch_size=8, momentum=0.9, plateau_patience=0, seed=1)
+            self.session = ModelSession(state_path=path, job_id="job")
+            self.set_data()
+            self.session.load(model_bytes(1))
+            self.session.train(config)
+            self.session.save()
+            momentum = self.session.optimizer.state_dict()["state"][0]["momentum_buffer"]
+
+            restarted = ModelSession(state_path=path, job_id="job")
+            restarted._data = self.session._data
+            restarted.load(model_bytes(1))
+            restarted.train(TrainingConfig(epochs=0, momentum=0.9))
+            assert restarted.rounds == 2
+            assert torch.equal(restarted.optimizer.state_dict()["state"][0]["momentum_buffer"], momentum)
+        finally:
+            shutil.rmtree(directory)
@@ -0,0 +1,78 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from unittest import TestCase
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from data.model_store import ModelStore, ModelStoreError
+
+
+class TestModelStore(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.store = ModelStore(self.root, max_models=2)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def put(self, data, **kwargs):
+        # last_used orders eviction: keep the puts apart
+        time.sleep(0.01)
+        return self.store.put(data, **kwargs)
+
+    def test_put_once_with_lineage(self):
+        first = self.put(b"a", round=1)
+        assert self.put(b"a", round=2, connection_id="c1") == first
+        child = self.put(b"b", parent=first)
+        assert self.store.get(first) == b"a"
+        assert [origin["round"] for origin in self.store.info(first)["lineage"]] == [1, 2]
+        assert self.store.ancestry(child) == [child, first]
+
+    def test_evicts_least_recently_used_unreferenced(self):
+        held = self.put(b"a", ref=True)
+        second = self.put(b"b")
+        third = self.put(b"c")
+        assert self.store.has(held) and not self.store.has(second) and self.store.has(third)
+
+        self.store.release(held)
+        self.put(b"d")
+        assert not self.store.has(held)
+
+    def test_index_is_reloaded(self):
+        first = self.put(b"a", round=1)
+        store = ModelStore(self.root, max_models=2)
+        assert store.get(first) == b"a"
+        assert store.info(first)["lineage"] == self.store.info(first)["lineage"]
+
+    def test_refs_do_not_outlive_the_process(self):
+        held = self.put(b"a", ref=True)
+        self.store.acquire(held)
+        with open(self.store.index_path) as f:
+            assert "refs" not in json.load(f)[held]
+
+        # After a crash nothing holds the model any more
+        store = ModelStore(self.root, max_models=2)
+        assert store.has(held)
+        time.sleep(0.01)
+        store.put(b"b")
+        time.sleep(0.01)
+        store.put(b"c")
+        assert not store.has(held)
+
+    def test_refs_of_older_indexes_are_dropped(self):
+        held = self.put(b"a")
+        with open(self.store.index_path) as f:
+            index = json.load(f)
+        index[held]["refs"] = 3
+        with open(self.store.index_path, "w") as f:
+            json.dump(index, f)
+        assert "refs" not in ModelStore(self.root).info(held)
+
+    def test_invalid_hash(self):
+        with self.assertRaises(ModelStoreError):
+            self.store.path("../index")
+        with self.assertRaises(ModelStoreError):
+            self.store.acquire("0" * 64)
@@ -0,0 +1,100 @@
+import os
+import sys
+from unittest import TestCase
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from data.participant_selector import (
+    MAX_BACKOFF_ROUNDS,
+    POLICY_AVAILABILITY,
+    POLICY_STRATIFIED,
+    ParticipantSelector,
+    parse_participants,
+)
+
+HOSPITALS = ["hospital{}".format(i) for i in range(10)]
+
+
+class TestParticipantSelector(TestCase):
+    def test_parse_participants(self):
+        assert parse_participants("0.3") == (0.3, None)
+        assert parse_participants("1") == (1.0, None)
+        assert parse_participants("4") == (None, 4)
+        with self.assertRaises(ValueError):
+            parse_participants("0")
+
+    def test_unknown_policy(self):
+        with self.assertRaises(ValueError):
+            ParticipantSelector("fastest")
+
+    def test_sample_size(self):
+        assert ParticipantSelector(participants="0.25", seed=1).sample_size(10) == 3
+        assert ParticipantSelector(participants="0.01", seed=1).sample_size(10) == 1
+        assert ParticipantSelector(participants="20", seed=1).sample_size(10) == 10
+
+    def test_selection_keeps_the_order(self):
+        for policy in ("random", POLICY_STRATIFIED, POLICY_AVAILABILITY):
+            selector = ParticipantSelector(policy, participants="4", seed=1)
+            selected = selector.select(HOSPITALS, round=1)
+            assert len(selected) == 4
+            assert selected == sorted(selected, key=HOSPITALS.index)
+
+    def test_stratified_covers_the_strata(self):
+        selector = ParticipantSelector(POLICY_STRATIFIED, participants="4", strata=4, seed=1)
+        for i, connection_id in enumerate(HOSPITALS[:8]):
+            selector.record(connection_id).num_samples = (i + 1) * 100
+        selected = selector.select(HOSPITALS[:8], round=1)
+        strata = {HOSPITALS.index(connection_id) // 2 for connection_id in selected}
+        assert strata == {0, 1, 2, 3}
+
+    def test_completion_is_recorded(self):
+        selector = ParticipantSelector(seed=1)
+        selector.completed("early", num_samples=10)
+        assert selector.stats["early"].completed == 0
+        selector.dispatched("fast")
+        selector.completed("fast", num_samples=50)
+        stats = selector.stats["fast"]
+        assert stats.completed == 1 and stats.num_samples == 50
+        assert stats.latency is not None and not stats.outstanding
+        assert stats.success_rate == 1.0
+
+    def test_backoff_doubles(self):
+        selector = ParticipantSelector(participants="1", seed=1)
+        selector.dispatched("slow")
+        selector.timed_out("slow", 1)
+        assert selector.stats["slow"].backoff_until == 3
+        assert "slow" not in selector.select(["slow", "fast"], round=2)
+        assert "slow" in selector.select(["slow", "fast"], round=3)
+
+        selector.dispatched("slow")
+        selector.timed_out("slow", 3)
+        assert selector.stats["slow"].backoff_until == 3 + 1 + 2
+        for round_number in range(4, 20):
+            selector.dispatched("slow")
+            selector.timed_out("slow", round_number)
+        assert selector.stats["slow"].backoff_until == 19 + 1 + MAX_BACKOFF_ROUNDS
+
+    def test_completion_ends_the_backoff(self):
+        selector = ParticipantSelector(seed=1)
+        selector.dispatched("slow")
+        selector.timed_out("slow", 1)
+        assert not selector.completed("slow")
+        selector.dispatched("slow")
+        assert selector.completed("slow", num_samples=50)
+        stats = selector.stats["slow"]
+        assert stats.backoff_until is None and stats.consecutive_timeouts == 0
+        assert stats.num_samples == 50 and stats.latency is not None
+        assert stats.success_rate == 0.5
+
+    def test_everybody_backing_off_is_still_selected(self):
+        selector = ParticipantSelector(participants="1", seed=1)
+        for connection_id in HOSPITALS[:2]:
+            selector.dispatched(connection_id)
+            selector.timed_out(connection_id, 1)
+        assert selector.select(HOSPITALS[:2], round=2) == HOSPITALS[:2]
+
+    def test_unanswered_dispatch_is_a_failure(self):
+        selector = ParticipantSelector(seed=1)
+        selector.dispatched("quiet")
+        selector.dispatched("quiet")
+        summary = selector.summary(["quiet"])[0]
+        assert summary["sent"] == 2 and summary["failed"] == 1
@@ -0,0 +1,182 @@
+import os
+import shutil
+import sys
+import tempfile
+from unittest import TestCase
+
+import pytest
+
+torch = pytest.importorskip("torch")
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from data import preprocessing
+from data.preprocessing import (
+    LABEL_COLUMN,
+    SPLIT_HOLDOUT,
+    SPLIT_TRAIN,
+    CSVStream,
+    clean,
+    encode,
+    fit_vocabulary,
+    holdout_mask,
+    load_dataset,
+    median_of_counts,
+    scan,
+    split_rows,
+    vocabulary_from_json,
+    vocabulary_to_json,
+)
+
+HOSPITAL_CSV = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "hospital1.csv")
+
+
+class TestClean(TestCase):
+    def test_clean(self):
+        df = clean(pd.read_csv(HOSPITAL_CSV))
+        assert list(df) == preprocessing.FEATURE_COLUMNS + [preprocessing.LABEL_COLUMN]
+        assert df["Age"].between(preprocessing.MIN_AGE, preprocessing.MAX_AGE).all()
+        assert not df["Gender"].isin(preprocessing.GENDER_JUNK).any()
+        assert not df.isnull().values.any()
+
+
+class TestLoadDataset(TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def test_load_dataset(self):
+        features, labels = load_dataset(HOSPITAL_CSV, cache_dir=self.cache_dir)
+        assert features.dtype == torch.float32 and labels.dtype == torch.float32
+        assert features.shape[1] == len(preprocessing.FEATURE_COLUMNS)
+        assert labels.shape == (len(features), 1)
+
+    def test_cached_tensors_are_the_same(self):
+        features, labels = load_dataset(HOSPITAL_CSV, cache_dir=self.cache_dir)
+        assert os.listdir(self.cache_dir)
+        cached_features, cached_labels = load_dataset(HOSPITAL_CSV, cache_dir=self.cache_dir)
+        assert torch.equal(cached_features, features)
+        assert torch.equal(cached_labels, labels)
+
+
+class TestHoldoutSplit(TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def test_mask_is_stable_and_near_the_fraction(self):
+        rows = np.arange(100000)
+        mask = holdout_mask(rows, 0.1)
+        assert abs(mask.mean() - 0.1) < 0.005
+        # A row's split depends on its line only, not on the rows around it
+        assert (holdout_mask(rows[5000:6000], 0.1) == mask[5000:6000]).all()
+
+    def test_splits_are_complementary(self):
+        df = pd.DataFrame({"value": range(1000)})
+        train = split_rows(df, SPLIT_TRAIN, 0.2)
+        holdout = split_rows(df, SPLIT_HOLDOUT, 0.2)
+        assert len(train) + len(holdout) == len(df)
+        assert not set(train.index) & set(holdout.index)
+        assert split_rows(df, None, 0.2) is df
+        assert split_rows(df, SPLIT_HOLDOUT, 0) is df
+
+    def test_load_dataset_splits(self):
+        features, labels = load_dataset(HOSPITAL_CSV, cache_dir=self.cache_dir)
+        train, train_labels = load_dataset(HOSPITAL_CSV, cache_dir=self.cache_dir, split=SPLIT_TRAIN)
+        holdout, holdout_labels = load_dataset(HOSPITAL_CSV, cache_dir=self.cache_dir, split=SPLIT_HOLDOUT)
+        assert len(train) + len(holdout) == len(features)
+        assert len(holdout) > 0
+        assert len(train_labels) == len(train) and len(holdout_labels) == len(holdout)
+
+    def test_stream_holds_the_same_holdout(self):
+        _, holdout_labels = load_dataset(HOSPITAL_CSV, cache_dir=self.cache_dir, split=SPLIT_HOLDOUT)
+        stream = CSVStream(HOSPITAL_CSV, batch_size=1, shuffle=False, chunk_rows=50, split=SPLIT_HOLDOUT)
+        streamed = torch.cat([labels for _, labels in stream])
+        assert torch.equal(streamed, holdout_labels)
+
+
+class TestVocabulary(TestCase):
+    def setUp(self):
+        self.df = clean(pd.read_csv(HOSPITAL_CSV))
+        self.vocabulary = fit_vocabulary(self.df)
+
+    def test_encode(self):
+        features, labels = encode(self.df, self.vocabulary)
+        assert features.shape == (len(self.df), len(preprocessing.FEATURE_COLUMNS))
+        assert features.min() >= 0
+        assert set(np.unique(labels)) <= {0.0, 1.0}
+
+    def test_unseen_values_are_unknown(self):
+        gender = self.vocabulary["Gender"]
+        vocabulary = dict(self.vocabulary, Gender=gender[:-1])
+        features, labels = encode(self.df, vocabulary)
+        column = preprocessing.FEATURE_COLUMNS.index("Gender")
+        unseen = (self.df["Gender"] == gender[-1]).values
+        assert unseen.any()
+        assert (features[unseen, column] == len(gender) - 1).all()
+        assert (features[~unseen, column] < len(gender) - 1).all()
+        assert len(labels) == len(self.df)
+
+    def test_unseen_ages_fall_between(self):
+        ages = self.vocabulary["Age"]
+        vocabulary = dict(self.vocabulary, Age=ages[::2])
+        features, _ = encode(self.df, vocabulary)
+        codes = features[:, preprocessing.FEATURE_COLUMNS.index("Age")]
+        order = np.argsort(self.df["Age"].values, kind="stable")
+        assert (np.diff(codes[order]) >= 0).all()
+        assert codes.min() >= 0 and codes.max() <= 1
+
+    def test_unseen_labels_are_dropped(self):
+        vocabulary = dict(self.vocabulary)
+        vocabulary[LABEL_COLUMN] = self.vocabulary[LABEL_COLUMN][:1]
+        features, labels = encode(self.df, vocabulary)
+        kept = (self.df[LABEL_COLUMN] == vocabulary[LABEL_COLUMN][0]).sum()
+        assert 0 < len(features) == len(labels) == kept
+        assert (labels == 0).all()
+
+
+class TestStream(TestCase):
+    def setUp(self):
+        self.df = clean(pd.read_csv(HOSPITAL_CSV))
+        self.vocabulary = fit_vocabulary(self.df)
+
+    def test_median_of_counts(self):
+        for values in ([3, 1, 2], [4, 1, 3, 2], [5, 5, 1, 7]):
+            counts = pd.Series(values).value_counts()
+            assert median_of_counts(counts) == pd.Series(values).median()
+
+    def test_scan_matches_the_whole_extract(self):
+        vocabulary, age_median, rows = scan(HOSPITAL_CSV, chunk_rows=50)
+        assert rows == len(self.df)
+        assert age_median == pd.read_csv(HOSPITAL_CSV)["Age"].median()
+        for column, values in self.vocabulary.items():
+            assert list(vocabulary[column]) == list(values)
+
+    def test_stream_matches_the_loaded_tensors(self):
+        features, labels = encode(self.df, self.vocabulary)
+        stream = CSVStream(HOSPITAL_CSV, batch_size=16, shuffle=False, chunk_rows=50)
+        batches = list(stream)
+        assert all(len(batch_labels) == 16 for _, batch_labels in batches[:-1])
+        assert torch.equal(torch.cat([f for f, _ in batches]), torch.from_numpy(features))
+        assert torch.equal(torch.cat([l for _, l in batches]), torch.from_numpy(labels))
+        assert stream.num_samples == len(self.df)
+
+    def test_stream_with_a_vocabulary_takes_the_whole_median(self):
+        _, age_median, _ = scan(HOSPITAL_CSV, chunk_rows=50)
+        stream = CSVStream(HOSPITAL_CSV, self.vocabulary, shuffle=False, chunk_rows=50)
+        assert stream.age_median == age_median
+        features, _ = encode(self.df, self.vocabulary)
+        assert torch.equal(torch.cat([f for f, _ in stream]), torch.from_numpy(features))
+
+    def test_vocabulary_json(self):
+        vocabulary, age_median = vocabulary_from_json(vocabulary_to_json(self.vocabulary, 31.0))
+        assert age_median == 31.0
+        for column, values in self.vocabulary.items():
+            assert list(vocabulary[column]) == list(values)
+        with self.assertRaises(ValueError):
+            vocabulary_from_json({"vocabulary": {"Age": [20]}})
@@ -0,0 +1,110 @@
+import os
+import shutil
+import sys
+import tempfile
+from unittest import TestCase
+
+import pytest
+
+torch = pytest.importorskip("torch")
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from data.server_optimizer import DEFAULT_SERVER_LRS, ServerOptimizer
+
+
+def states():
+    state = {"weight": torch.tensor([1.0, -2.0, 0.5]), "steps": torch.tensor(4)}
+    averaged_state = {"weight": torch.tensor([1.5, -2.0, 0.0]), "steps": torch.tensor(5)}
+    return state, averaged_state
+
+
+class TestServerOptimizer(TestCase):
+    def test_unknown_kind(self):
+        with self.assertRaises(ValueError):
+            ServerOptimizer("sgd")
+
+    def test_default_learning_rates(self):
+        for kind, lr in DEFAULT_SERVER_LRS.items():
+            assert ServerOptimizer(kind).lr == lr
+        assert ServerOptimizer("fedadam", lr="0.1").lr == 0.1
+
+    def test_none_takes_the_average(self):
+        optimizer = ServerOptimizer("none")
+        state, averaged_state = states()
+        new_state = optimizer.step(state, averaged_state)
+        assert torch.equal(new_state["weight"], averaged_state["weight"])
+        assert not optimizer.enabled and optimizer.steps == 0
+
+    def test_fedavgm_momentum(self):
+        optimizer = ServerOptimizer("fedavgm", lr=1.0, beta1=0.9)
+        state, averaged_state = states()
+        change = averaged_state["weight"] - state["weight"]
+        first = optimizer.step(state, averaged_state)
+        assert torch.allclose(first["weight"], averaged_state["weight"])
+        # The same change again moves on by the momentum as well
+        second = optimizer.step(state, averaged_state)
+        assert torch.allclose(second["weight"], state["weight"] + 1.9 * change)
+        assert torch.equal(second["steps"], averaged_state["steps"])
+        assert optimizer.steps == 2
+
+    def test_fedadam_step(self):
+        optimizer = ServerOptimizer("fedadam", lr=0.01, beta1=0.9, beta2=0.99, tau=0.001)
+        state, averaged_state = states()
+        change = averaged_state["weight"] - state["weight"]
+        new_state = optimizer.step(state, averaged_state)
+        m = 0.1 * change
+        v = 0.01 * change * change
+        expected = state["weight"] + 0.01 * m / (v.sqrt() + 0.001)
+        assert torch.allclose(new_state["weight"], expected)
+
+    def test_fedyogi_second_moment(self):
+        optimizer = ServerOptimizer("fedyogi", lr=0.01, beta2=0.99)
+        state, averaged_state = states()
+        change = averaged_state["weight"] - state["weight"]
+        optimizer.step(state, averaged_state)
+        squared = change * change
+        assert torch.allclose(optimizer.v["weight"], 0.01 * squared)
+
+    def test_frozen_tensors_take_the_average(self):
+        optimizer = ServerOptimizer("fedavgm")
+        state, averaged_state = states()
+        new_state = optimizer.step(state, averaged_state, frozen=["weight"])
+        assert torch.equal(new_state["weight"], averaged_state["weight"])
+        assert "weight" not in optimizer.m
+
+    def test_reset(self):
+        optimizer = ServerOptimizer("fedadam")
+        optimizer.step(*states())
+        optimizer.reset()
+        assert optimizer.steps == 0 and not optimizer.m and not optimizer.v
+
+    def test_from_settings(self):
+        optimizer = ServerOptimizer("fedyogi", lr=0.05, beta1=0.8, beta2=0.9, tau=0.01)
+        assert ServerOptimizer.from_settings(optimizer.settings()).settings() == optimizer.settings()
+        assert ServerOptimizer.from_settings({}).kind == ServerOptimizer().kind
+
+
+class TestServerOptimizerState(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "server-optimizer.pt")
+        self.optimizer = ServerOptimizer("fedadam")
+        self.optimizer.step(*states())
+        self.optimizer.save(self.path, "a" * 64)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_restore(self):
+        restored = ServerOptimizer.from_settings(self.optimizer.settings())
+        assert restored.restore(self.path, "a" * 64)
+        assert restored.steps == 1
+        assert torch.equal(restored.m["weight"], self.optimizer.m["weight"])
+        assert torch.equal(restored.v["weight"], self.optimizer.v["weight"])
+
+    def test_restore_other_model_or_settings(self):
+        restored = ServerOptimizer("fedadam")
+        assert not restored.restore(self.path, "b" * 64)
+        assert restored.steps == 0 and not restored.m
+        assert not ServerOptimizer("fedyogi").restore(self.path, "a" * 64)
+        assert not ServerOptimizer("fedadam").restore(os.path.join(self.directory, "none.pt"))
@@ -0,0 +1,64 @@
+import os
+import sys
+from unittest import TestCase
+
+import pytest
+
+torch = pytest.importorskip("torch")
+from torch import nn
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from data.trainer import TrainingConfig, train
+
+
+def dataset(samples=64):
+    generator = torch.Generator().manual_seed(0)
+    features = torch.rand(samples, 4, generator=generator)
+    labels = (features.sum(dim=1, keepdim=True) > 2).float()
+    return features, labels
+
+
+def model():
+    torch.manual_seed(0)
+    return nn.Sequential(nn.Linear(4, 1), nn.Sigmoid())
+
+
+class TestTrainingConfig(TestCase):
+    def test_unknown_setting(self):
+        with self.assertRaises(ValueError):
+            TrainingConfig(batch=32)
+        with self.assertRaises(ValueError):
+            TrainingConfig(lr_schedule="linear")
+
+    def test_from_env(self):
+        config = TrainingConfig.from_env(
+            {"FL_BATCH_SIZE": "128", "FL_LEARNING_RATE": "0.5", "FL_SHUFFLE": "no", "FL_EPOCHS": "7"},
+            epochs=3,
+        )
+        assert config.batch_size == 128 and config.learning_rate == 0.5
+        assert config.shuffle is False
+        # Settings given directly win over the environment
+        assert config.epochs == 3
+
+
+class TestTrain(TestCase):
+    def test_mini_batches_and_progress(self):
+        updates = []
+        config = TrainingConfig(batch_size=16, epochs=4, report_every=2, plateau_patience=0, seed=1)
+        stats = train(model(), *dataset(), config, progress=lambda **update: updates.append(update))
+        assert stats["epochs"] == 4 and stats["steps"] == 16 and stats["samples"] == 256
+        assert not stats["stopped_early"]
+        assert [update["epoch"] for update in updates] == [2, 4]
+
+    def test_loss_goes_down(self):
+        features, labels = dataset()
+        trained = model()
+        before = ((trained(features) - labels) ** 2).mean().item()
+        train(trained, features, labels, TrainingConfig(epochs=50, plateau_patience=0, seed=1))
+        assert ((trained(features) - labels) ** 2).mean().item() < before
+
+    def test_stops_on_a_plateau(self):
+        # With no learning rate the loss never improves
+        config = TrainingConfig(epochs=100, learning_rate=0.0, plateau_patience=3, seed=1)
+        stats = train(model(), *dataset(), config)
+        assert stats["stopped_early"] and stats["epochs"] == 4
@@ -0,0 +1,98 @@
+import asyncio
+import os
+import sys
+import time
+from unittest import TestCase
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from data.training_executor import (
+    STATE_CANCELLED,
+    STATE_DONE,
+    STATE_FAILED,
+    TrainingExecutor,
+    TrainingJobError,
+)
+
+
+# Targets run in the spawned worker, so they live at module level
+def add(a, b, progress=None):
+    progress(step=1)
+    return a + b
+
+
+async def add_later(a, b, progress=None):
+    await asyncio.sleep(0)
+    return a + b
+
+
+def fail(progress=None):
+    raise ValueError("no data")
+
+
+def sleep(seconds, progress=None):
+    time.sleep(seconds)
+
+
+def worker_pid(progress=None):
+    return os.getpid()
+
+
+class TestTrainingExecutor(TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.executor = TrainingExecutor()
+
+    def tearDown(self):
+        self.executor.shutdown()
+        self.loop.close()
+        asyncio.set_event_loop(None)
+
+    def run_job(self, job):
+        return self.loop.run_until_complete(asyncio.wait_for(job, 60))
+
+    def test_result_and_progress(self):
+        updates = []
+        job = self.executor.submit(add, 2, 3, on_progress=lambda job, update: updates.append(update))
+        assert self.run_job(job) == 5
+        assert job.state == STATE_DONE
+        assert updates == [{"step": 1}] and job.progress == {"step": 1}
+        assert not self.executor.active_jobs()
+
+    def test_coroutine_target(self):
+        assert self.run_job(self.executor.submit(add_later, 2, 3)) == 5
+
+    def test_failure_carries_the_traceback(self):
+        job = self.executor.submit(fail)
+        with self.assertRaises(TrainingJobError) as context:
+            self.run_job(job)
+        assert job.state == STATE_FAILED
+        assert "ValueError: no data" in str(context.exception)
+
+    def test_cancel(self):
+        job = self.executor.submit(sleep, 30)
+        self.loop.run_until_complete(asyncio.sleep(0.5))
+        assert self.executor.cancel(job.job_id)
+        assert job.state == STATE_CANCELLED
+        with self.assertRaises(asyncio.CancelledError):
+            self.run_job(job)
+        assert not self.executor.cancel(job.job_id)
+
+    def test_worker_is_kept_between_jobs(self):
+        first = self.run_job(self.executor.submit(worker_pid))
+        assert self.run_job(self.executor.submit(worker_pid)) == first
+
+    def test_affinity_picks_the_same_worker(self):
+        executor = TrainingExecutor(max_jobs=2)
+        try:
+            pids = [self.run_job(executor.submit(worker_pid, affinity="hospital")) for _ in range(3)]
+            assert len(set(pids)) == 1
+        finally:
+            executor.shutdown()
+
+    def test_cancel_replaces_the_worker(self):
+        first = self.run_job(self.executor.submit(worker_pid))
+        job = self.executor.submit(sleep, 30)
+        self.loop.run_until_complete(asyncio.sleep(0.5))
+        self.executor.cancel(job.job_id)
+        assert self.run_job(self.executor.submit(worker_pid)) != first
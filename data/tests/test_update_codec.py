@@ -0,0 +1,177 @@
+import math
+import os
+import sys
+from collections import OrderedDict
+from unittest import TestCase
+
+import pytest
+
+torch = pytest.importorskip("torch")
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from data import update_codec
+from data.update_codec import decode_update, encode_update, merge_update, parse_codec
+
+
+def random_state(seed=0):
+    generator = torch.Generator().manual_seed(seed)
+    return OrderedDict([
+        ("0.weight", torch.randn(16, 8, generator=generator)),
+        ("0.bias", torch.randn(16, generator=generator)),
+        ("1.num_batches_tracked", torch.tensor(7)),
+    ])
+
+
+def changed_state(base_state, seed=1, scale=0.1):
+    generator = torch.Generator().manual_seed(seed)
+    return OrderedDict(
+        (name, tensor + scale * torch.randn(tensor.shape, generator=generator)
+         if tensor.is_floating_point() else tensor + 1)
+        for name, tensor in base_state.items()
+    )
+
+
+class TestParseCodec(TestCase):
+    def test_parts(self):
+        assert parse_codec("delta+topk+int8+deflate") == (True, "topk", "int8", "deflate")
+        assert parse_codec("fp32") == (False, None, "fp32", "none")
+
+    def test_unknown_part(self):
+        with self.assertRaises(ValueError):
+            parse_codec("delta+int4")
+
+    def test_sparse_needs_delta(self):
+        with self.assertRaises(ValueError):
+            parse_codec("topk+fp32")
+
+
+class TestRoundTrip(TestCase):
+    def setUp(self):
+        self.base_state = random_state()
+        self.state = changed_state(self.base_state)
+
+    def decoded(self, codec):
+        data = encode_update(self.state, self.base_state, codec)
+        state, decoded_codec = decode_update(data, self.base_state)
+        assert decoded_codec == codec
+        assert list(state) == list(self.state)
+        for name, tensor in state.items():
+            assert tensor.dtype == self.state[name].dtype
+            assert tensor.shape == self.state[name].shape
+        assert torch.equal(state["1.num_batches_tracked"], self.state["1.num_batches_tracked"])
+        return state
+
+    def test_fp32_is_exact(self):
+        for codec in ("fp32", "fp32+deflate", "delta+fp32+deflate"):
+            state = self.decoded(codec)
+            for name in ("0.weight", "0.bias"):
+                assert torch.allclose(state[name], self.state[name], atol=1e-6)
+
+    def test_fp16(self):
+        state = self.decoded("fp16+deflate")
+        for name in ("0.weight", "0.bias"):
+            assert torch.allclose(state[name], self.state[name], atol=1e-2)
+
+    def test_int8_within_half_a_step(self):
+        # Deltas are quantized, so the error is half of the delta's scale at most
+        state = self.decoded("delta+int8+deflate")
+        for name in ("0.weight", "0.bias"):
+            change = self.state[name] - self.base_state[name]
+            step = change.abs().max() / 127
+            error = (state[name] - self.state[name]).abs().max()
+            assert error <= step / 2 + 1e-6
+
+    def test_delta_needs_base(self):
+        with self.assertRaises(ValueError):
+            encode_update(self.state, None, "delta+fp32")
+        data = encode_update(self.state, self.base_state, "delta+fp32")
+        with self.assertRaises(ValueError):
+            decode_update(data)
+
+    def test_not_an_update(self):
+        with self.assertRaises(ValueError):
+            decode_update(b"FLTM" + bytes(16))
+
+
+class TestSparse(TestCase):
+    def setUp(self):
+        self.base_state = random_state()
+        self.state = changed_state(self.base_state)
+
+    def test_topk_sends_the_largest_changes(self):
+        data = encode_update(self.state, self.base_state, "delta+topk+fp32+deflate")
+        state, _ = decode_update(data, self.base_state)
+        change = (self.state["0.weight"] - self.base_state["0.weight"]).view(-1)
+        sent = (state["0.weight"] - self.base_state["0.weight"]).view(-1)
+        keep = max(1, int(math.ceil(update_codec.TOPK_FRACTION * change.numel())))
+        assert int((sent != 0).sum()) == keep
+        assert set(sent.nonzero().view(-1).tolist()) == set(change.abs().topk(keep).indices.tolist())
+
+    def test_residual_carries_what_was_not_sent(self):
+        for codec in ("delta+topk+int8", "delta+threshold+fp32"):
+            residual = {}
+            data = encode_update(self.state, self.base_state, codec, residual=residual)
+            state, _ = decode_update(data, self.base_state)
+            for name in ("0.weight", "0.bias"):
+                change = self.state[name] - self.base_state[name]
+                sent = state[name] - self.base_state[name]
+                carried = torch.from_numpy(residual[name])
+                assert torch.allclose(sent + carried, change, atol=1e-5)
+
+    def test_residual_is_sent_later(self):
+        residual = {}
+        encode_update(self.state, self.base_state, "delta+topk+fp32", residual=residual)
+        carried = residual["0.bias"].copy()
+        # No change at all this time: what is sent comes from the residual
+        data = encode_update(self.base_state, self.base_state, "delta+topk+fp32", residual=residual)
+        state, _ = decode_update(data, self.base_state)
+        sent = (state["0.bias"] - self.base_state["0.bias"]).numpy()
+        assert sent.any()
+        assert ((sent == 0) | (abs(sent - carried) < 1e-6)).all()
+
+
+class TestMergeUpdate(TestCase):
+    def test_matches_the_decoded_average(self):
+        base_state = random_state()
+        states = [changed_state(base_state, seed) for seed in (1, 2, 3)]
+        codecs = ("delta+topk+fp32", "delta+int8+deflate", "fp32")
+        weights = (0.5, 0.3, 0.2)
+
+        merged = {name: tensor.float() * sum(weights) for name, tensor in base_state.items()}
+        expected = {name: torch.zeros_like(tensor.float()) for name, tensor in base_state.items()}
+        for state, codec, weight in zip(states, codecs, weights):
+            data = encode_update(state, base_state, codec)
+            assert merge_update(data, weight, merged, base_state) == codec
+            decoded, _ = decode_update(data, base_state)
+            for name, tensor in decoded.items():
+                expected[name] += tensor.float() * weight
+
+        for name in expected:
+            assert torch.allclose(merged[name], expected[name], atol=1e-5)
+
+    def test_rejects_other_frozen_weights(self):
+        base_state = random_state()
+        state = changed_state(base_state)
+        state.update((name, base_state[name]) for name in ("0.weight", "0.bias"))
+        data = encode_update(state, base_state, "delta+fp32", frozen=["0"])
+        other_state = changed_state(base_state, seed=5)
+        with self.assertRaises(ValueError):
+            merge_update(data, 1.0, {n: t.float() for n, t in base_state.items()}, other_state)
+
+
+class TestFrozenGroups(TestCase):
+    def setUp(self):
+        self.base_state = random_state()
+        # Trained from the base model with its first layer frozen
+        self.state = changed_state(self.base_state)
+        self.state.update((name, self.base_state[name]) for name in ("0.weight", "0.bias"))
+
+    def test_frozen_tensors_are_not_sent(self):
+        data = encode_update(self.state, self.base_state, "delta+fp32", frozen=["0"])
+        decoded, _ = decode_update(data, self.base_state)
+        assert list(decoded) == ["1.num_batches_tracked"]
+
+    def test_rejects_other_frozen_weights(self):
+        data = encode_update(self.state, self.base_state, "delta+fp32", frozen=["0"])
+        with self.assertRaises(ValueError):
+            decode_update(data, changed_state(self.base_state, seed=5))
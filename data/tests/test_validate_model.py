@@ -0,0 +1,53 @@
+import os
+import sys
+from unittest import TestCase, mock
+
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("sklearn")
+pytest.importorskip("matplotlib")
+pytest.importorskip("seaborn")
+from torch import nn
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from data import validate_model
+from data.validate_model import ValidationService
+
+
+class Scores(nn.Module):
+    # Returns the first feature as the score
+    def forward(self, features):
+        return features[:, :1]
+
+
+def service(scores, labels, batch_size=2):
+    features = torch.tensor(scores).view(-1, 1)
+    labels = torch.tensor(labels).view(-1, 1)
+    with mock.patch.object(validate_model, "load_dataset", return_value=(features, labels)):
+        return ValidationService("validation.csv", batch_size=batch_size)
+
+
+class TestValidationService(TestCase):
+    def test_score(self):
+        result = service([0.9, 0.2, 0.7, 0.4, 0.6], [1.0, 0.0, 0.0, 1.0, 1.0]).score(Scores(), "model")
+        assert result["model"] == "model" and result["samples"] == 5
+        assert result["loss"] == pytest.approx((0.01 + 0.04 + 0.49 + 0.36 + 0.16) / 5)
+        assert result["accuracy"] == pytest.approx(0.6)
+        assert result["auc"] == pytest.approx(4 / 6)
+        assert result["confusion"] == {
+            "true_positive": 2, "false_positive": 1, "false_negative": 1, "true_negative": 1,
+        }
+
+    def test_batches_match_one_pass(self):
+        scores = [0.9, 0.2, 0.7, 0.4, 0.6]
+        labels = [1.0, 0.0, 0.0, 1.0, 1.0]
+        batched = service(scores, labels, batch_size=2).predict(Scores())
+        whole = service(scores, labels, batch_size=100).predict(Scores())
+        assert torch.equal(batched, whole)
+
+    def test_score_many(self):
+        validation = service([0.9, 0.2], [1.0, 0.0])
+        results = validation.score_many({"first": Scores(), "second": Scores()})
+        assert [result["model"] for result in results] == ["first", "second"]
+        assert len(validation.score_many([Scores()])) == 1
@@ -0,0 +1,187 @@
+import math
+import os
+import sys
+import time
+
+import torch
+from torch import optim
+from torch.utils.data import DataLoader, TensorDataset
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from demo.runners.support.utils import log_msg
+
+
+LR_SCHEDULES = ("constant", "step", "exponential", "cosine")
+
+
+class TrainingConfig:
+    # Every setting can be overridden from the environment, e.g. FL_BATCH_SIZE=128
+    DEFAULTS = {
+        'batch_size': 32,
+        'epochs': 500,
+        'learning_rate': 0.1,
+        # SGD momentum; its buffers carry on from round to round with the optimizer
+        'momentum': 0.0,
+        # constant | step | exponential | cosine
+        'lr_schedule': 'constant',
+        # step: multiply by lr_gamma every lr_step_size epochs; exponential: every epoch
+        'lr_step_size': 100,
+        'lr_gamma': 0.5,
+        # Stop once the epoch loss has improved by less than plateau_tolerance
+        # for plateau_patience epochs in a row; 0 patience never stops early
+        'plateau_tolerance': 1e-5,
+        'plateau_patience': 20,
+        'shuffle': True,
+        'seed': None,
+        # Progress is reported every this many epochs, and when training stops
+        'report_every': 10,
+        # Processes to train on, see data/distributed_trainer.py: 0 is one per
+        # core, and fewer are used when a process would get too few samples
+        'workers': 0,
+        'min_samples_per_worker': 50000,
+        # Torch threads per process; 0 shares the cores out between the processes
+        'threads': 0,
+    }
+
+    def __init__(self, **settings):
+        unknown = set(settings) - set(self.DEFAULTS)
+        if unknown:
+            raise ValueError("Unknown training settings: " + ", ".join(sorted(unknown)))
+        for name, default in self.DEFAULTS.items():
+            setattr(self, name, settings.get(name, default))
+        if self.lr_schedule not in LR_SCHEDULES:
+            raise ValueError("Unknown learning rate schedule: " + str(self.lr_schedule))
+
+    @classmethod
+    def from_env(cls, environ=os.environ, **settings):
+        for name, default in cls.DEFAULTS.items():
+            value = environ.get('FL_' + name.upper())
+            if value is None or name in settings:
+                continue
+            if isinstance(default, bool):
+                settings[name] = value.lower() in ('1', 'true', 'yes')
+            elif isinstance(default, int) or name == 'seed':
+                settings[name] = int(value)
+            elif isinstance(default, float):
+                settings[name] = float(value)
+            else:
+                settings[name] = value
+        return cls(**settings)
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.DEFAULTS}
+
+
+def make_scheduler(opt, config):
+    if config.lr_schedule == 'step':
+        return optim.lr_scheduler.StepLR(opt, config.lr_step_size, config.lr_gamma)
+    if config.lr_schedule == 'exponential':
+        return optim.lr_scheduler.ExponentialLR(opt, config.lr_gamma)
+    if config.lr_schedule == 'cosine':
+        return optim.lr_scheduler.CosineAnnealingLR(opt, config.epochs)
+    return None
+
+
+def make_optimizer(model, config):
+    return optim.SGD(params=model.parameters(), lr=config.learning_rate, momentum=config.momentum)
+
+
+def train(model, features=None, labels=None, config=None, progress=None, optimizer=None, reduce=None,
+          loader=None, scheduler=None):
+    # An optimizer kept from an earlier round carries on with its state, and so
+    # does the learning rate if its scheduler is given too; otherwise the
+    # schedule starts over from learning_rate.
+    # reduce sums values over all the processes training together, if any.
+    # loader, if given, is iterated for each epoch's batches instead of the
+    # features and labels, e.g. a data/preprocessing.py CSVStream
+    config = config or TrainingConfig()
+    if config.seed is not None:
+        torch.manual_seed(config.seed)
+
+    if loader is None:
+        # Only one batch at a time is gathered from the dataset tensors
+        loader = DataLoader(
+            TensorDataset(features, labels),
+            batch_size=config.batch_size,
+            shuffle=config.shuffle,
+        )
+    opt = optimizer or make_optimizer(model, config)
+    if scheduler is None:
+        for group in opt.param_groups:
+            group['lr'] = config.learning_rate
+        scheduler = make_scheduler(opt, config)
+
+    model.train()
+    start = time.perf_counter()
+    steps = 0
+    samples = 0
+    best_loss = math.inf
+    stale_epochs = 0
+    epoch_loss = math.nan
+    stopped_early = False
+    epoch = 0
+
+    for epoch in range(1, config.epochs + 1):
+        loss_sum = 0.0
+        epoch_samples = 0
+        for x_batch, y_batch in loader:
+            # 1) erase previous gradients (if they exist)
+            opt.zero_grad()
+            # 2) make a prediction
+            pred = model(x_batch)
+            # 3) calculate how much we missed
+            loss = ((y_batch - pred) ** 2).mean()
+            # 4) figure out which weights caused us to miss
+            loss.backward()
+            # 5) change those weights
+            opt.step()
+
+            loss_sum += loss.item() * len(x_batch)
+            steps += 1
+            samples += len(x_batch)
+            epoch_samples += len(x_batch)
+        if scheduler:
+            scheduler.step()
+
+        totals = [loss_sum, float(epoch_samples)]
+        if reduce:
+            # Every process sees the same loss, so they all stop at the same epoch
+            totals = reduce(totals)
+        epoch_loss = totals[0] / totals[1]
+        if best_loss - epoch_loss > config.plateau_tolerance:
+            stale_epochs = 0
+        else:
+            stale_epochs += 1
+        best_loss = min(best_loss, epoch_loss)
+
+        stopped_early = bool(config.plateau_patience) and stale_epochs >= config.plateau_patience
+        last = stopped_early or epoch == config.epochs
+        if progress and (last or epoch % config.report_every == 0):
+            elapsed = time.perf_counter() - start
+            progress(
+                epoch=epoch,
+                epochs=config.epochs,
+                loss=epoch_loss,
+                steps_per_sec=steps / elapsed,
+                samples_per_sec=samples / elapsed,
+            )
+        if stopped_early:
+            break
+
+    elapsed = time.perf_counter() - start
+    stats = {
+        'epochs': epoch,
+        'steps': steps,
+        'samples': samples,
+        'loss': epoch_loss,
+        'seconds': elapsed,
+        'steps_per_sec': steps / elapsed if elapsed else 0.0,
+        'samples_per_sec': samples / elapsed if elapsed else 0.0,
+        'stopped_early': stopped_early,
+    }
+    log_msg(
+        "TRAINED", epoch, "EPOCHS,", steps, "STEPS IN", round(elapsed, 2), "S:",
+        round(stats['steps_per_sec']), "STEPS/S,", round(stats['samples_per_sec']), "SAMPLES/S,",
+        "LOSS", round(epoch_loss, 6), "(PLATEAU)" if stopped_early else "",
+    )
+    return stats
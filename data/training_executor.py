@@ -0,0 +1,238 @@
+import asyncio
+import atexit
+import multiprocessing
+import os
+import queue
+import signal
+import sys
+import traceback
+import zlib
+from collections import deque
+from uuid import uuid4
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from demo.runners.support.utils import log_msg
+
+
+# Training jobs run in worker processes, so the controller's event loop
+# (webhooks, proofs, credentials) keeps running while a model trains.
+# Workers are fresh interpreters rather than forks: the controller has an event
+# loop and threads that a forked child must not inherit. A worker stays up
+# between jobs, so state it keeps (see data/model_session.py) lives on across
+# rounds; jobs submitted with the same affinity always go to the same worker.
+# Workers are not daemons, so a job may start processes of its own (see
+# data/distributed_trainer.py); instead they exit once the controller has gone.
+DEFAULT_MAX_JOBS = 1
+POLL_INTERVAL = 0.1
+
+STATE_QUEUED = "queued"
+STATE_RUNNING = "running"
+STATE_DONE = "done"
+STATE_FAILED = "failed"
+STATE_CANCELLED = "cancelled"
+
+
+class TrainingJobError(Exception):
+    pass
+
+
+def worker_loop(tasks, messages):
+    # Runs in the worker process; everything goes back through the message queue.
+    # Terminating the worker unwinds it, so the processes it started are stopped too
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(1))
+    parent = os.getppid()
+    loop = asyncio.new_event_loop()
+    while True:
+        try:
+            task = tasks.get(timeout=1)
+        except queue.Empty:
+            if os.getppid() != parent:
+                return
+            continue
+        if task is None:
+            return
+        target, args, kwargs = task
+
+        def progress(**update):
+            messages.put(("progress", update))
+
+        try:
+            result = target(*args, progress=progress, **kwargs)
+            if asyncio.iscoroutine(result):
+                result = loop.run_until_complete(result)
+            messages.put(("result", result))
+        except Exception:
+            messages.put(("error", traceback.format_exc()))
+
+
+class TrainingJob:
+    def __init__(self, target, args, kwargs, on_progress=None):
+        self.job_id = str(uuid4())
+        self.target = target
+        self.args = args
+        self.kwargs = kwargs
+        self.on_progress = on_progress
+        self.state = STATE_QUEUED
+        self.progress = None
+        self.worker = None
+        self.future = asyncio.get_event_loop().create_future()
+
+    def __await__(self):
+        return self.future.__await__()
+
+    def report(self, update):
+        self.progress = update
+        if self.on_progress:
+            try:
+                self.on_progress(self, update)
+            except Exception:
+                log_msg("TRAINING JOB", self.job_id, "PROGRESS CALLBACK FAILED")
+                log_msg(traceback.format_exc())
+
+
+class TrainingWorker:
+    def __init__(self, context):
+        self.context = context
+        self.process = None
+        self.tasks = None
+        self.messages = None
+        self.pending = deque()
+        self.job = None
+
+    @property
+    def load(self):
+        return len(self.pending) + (1 if self.job else 0)
+
+    def alive(self):
+        return self.process is not None and self.process.is_alive()
+
+    def start(self):
+        self.tasks = self.context.Queue()
+        self.messages = self.context.Queue()
+        self.process = self.context.Process(
+            target=worker_loop, args=(self.tasks, self.messages), daemon=False
+        )
+        self.process.start()
+        log_msg("TRAINING WORKER STARTED IN PROCESS", self.process.pid)
+
+    def stop(self, terminate=False):
+        if self.process is None:
+            return
+        if terminate:
+            self.process.terminate()
+        elif self.process.is_alive():
+            self.tasks.put(None)
+        self.process.join(timeout=1)
+        # A terminated worker may have died holding a queue lock: never reuse them
+        self.tasks.close()
+        self.messages.close()
+        self.process = None
+
+
+class TrainingExecutor:
+    def __init__(self, max_jobs=DEFAULT_MAX_JOBS):
+        # One worker per concurrent job; each runs its jobs one after another
+        self.max_jobs = max_jobs
+        self.jobs = {}
+        self._context = multiprocessing.get_context("spawn")
+        self._workers = [TrainingWorker(self._context) for _ in range(max_jobs)]
+        self._serving = [None] * max_jobs
+        # Workers are not daemons: make sure none outlives the controller
+        atexit.register(self.stop_workers)
+
+    def submit(self, target, *args, on_progress=None, affinity=None, **kwargs):
+        # target must be importable by the worker, i.e. a module level function;
+        # it is called with a progress(**update) keyword argument
+        job = TrainingJob(target, args, kwargs, on_progress)
+        self.jobs[job.job_id] = job
+        if affinity is not None:
+            index = zlib.crc32(str(affinity).encode()) % self.max_jobs
+        else:
+            index = min(range(self.max_jobs), key=lambda i: self._workers[i].load)
+        worker = self._workers[index]
+        job.worker = worker
+        worker.pending.append(job)
+        if not self._serving[index] or self._serving[index].done():
+            self._serving[index] = asyncio.ensure_future(self._serve(worker))
+        return job
+
+    def cancel(self, job_id):
+        job = self.jobs.get(job_id)
+        if not job or job.future.done():
+            return False
+        job.state = STATE_CANCELLED
+        if job.worker.job is job:
+            # The worker is busy with it: stop the worker, a new one takes the next job
+            job.worker.stop(terminate=True)
+        job.future.cancel()
+        log_msg("TRAINING JOB", job_id, "CANCELLED")
+        return True
+
+    def shutdown(self):
+        for job_id in list(self.jobs):
+            self.cancel(job_id)
+        for worker in self._workers:
+            worker.stop()
+
+    def stop_workers(self):
+        for worker in self._workers:
+            if worker.alive():
+                worker.stop(terminate=True)
+
+    def active_jobs(self):
+        return [job for job in self.jobs.values() if not job.future.done()]
+
+    async def _serve(self, worker):
+        while worker.pending:
+            job = worker.pending.popleft()
+            if job.state == STATE_CANCELLED:
+                continue
+            worker.job = job
+            try:
+                outcome = await self._run(worker, job)
+            finally:
+                worker.job = None
+
+            if job.state == STATE_CANCELLED:
+                continue
+            kind, value = outcome
+            if kind == "result":
+                job.state = STATE_DONE
+                job.future.set_result(value)
+            else:
+                job.state = STATE_FAILED
+                job.future.set_exception(TrainingJobError(value))
+
+    async def _run(self, worker, job):
+        try:
+            if not worker.alive():
+                if worker.process is not None:
+                    worker.stop(terminate=True)
+                worker.start()
+            worker.tasks.put((job.target, job.args, job.kwargs))
+        except Exception:
+            return "error", traceback.format_exc()
+        job.state = STATE_RUNNING
+        log_msg("TRAINING JOB", job.job_id, "STARTED IN PROCESS", worker.process.pid)
+        return await self._watch(worker, job)
+
+    async def _watch(self, worker, job):
+        # Polled rather than read in a thread, so a cancelled job leaves nothing behind
+        while True:
+            if job.state == STATE_CANCELLED or worker.process is None:
+                return None
+            alive = worker.process.is_alive()
+            try:
+                # once the worker has exited, wait briefly for what it flushed last
+                kind, value = worker.messages.get(block=not alive, timeout=POLL_INTERVAL)
+            except queue.Empty:
+                if not alive:
+                    exitcode = worker.process.exitcode
+                    worker.stop(terminate=True)
+                    return "error", "Training process exited with code {}".format(exitcode)
+                await asyncio.sleep(POLL_INTERVAL)
+                continue
+            if kind == "progress":
+                job.report(value)
+            else:
+                return kind, value
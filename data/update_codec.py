@@ -0,0 +1,280 @@
+import json
+import math
+import os
+import struct
+import sys
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+import torch
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from demo.runners.support.utils import log_msg
+from data import model_format
+from data.parameter_groups import frozen_sha256, in_groups
+
+
+# A codec is named by "+"-separated parts, e.g. "delta+int8+zstd":
+#   delta              send the difference from the round's base model
+#   topk | threshold   send only the largest changes (needs delta), see below
+#   fp32 | fp16 | int8 how floating point tensors are quantized
+#   none | deflate | zstd  how the encoded tensors are compressed
+SPARSIFIERS = ("topk", "threshold")
+QUANTIZATIONS = ("fp32", "fp16", "int8")
+COMPRESSIONS = ("none", "deflate", "zstd")
+DEFAULT_CODEC = "delta+int8+zstd" if zstandard else "delta+int8+deflate"
+
+# A sparse update keeps, of each tensor's change, the TOPK_FRACTION largest
+# coordinates (topk) or those of at least SPARSE_THRESHOLD in size (threshold),
+# sent as the gaps between their sorted indices followed by their values. The
+# rest is left in a residual that the encoder adds to the next change (error
+# feedback), so nothing dropped is lost, only delayed. Aggregation scatters
+# sparse updates into the average directly, see merge_update.
+TOPK_FRACTION = float(os.getenv("FL_TOPK_FRACTION", "0.01"))
+SPARSE_THRESHOLD = float(os.getenv("FL_SPARSE_THRESHOLD", "0.001"))
+
+# Tensors of frozen groups are left out of an update, which pins them by hash
+# instead, see data/parameter_groups.py
+UPDATE_MIME_TYPE = "application/x-fl-update"
+MAGIC = b"FLUP"
+
+
+def parse_codec(codec):
+    parts = codec.split("+")
+    delta = "delta" in parts
+    sparsifier = [part for part in parts if part in SPARSIFIERS] or [None]
+    quantization = [part for part in parts if part in QUANTIZATIONS] or ["fp32"]
+    compression = [part for part in parts if part in COMPRESSIONS] or ["none"]
+    unknown = set(parts) - {"delta"} - set(SPARSIFIERS) - set(QUANTIZATIONS) - set(COMPRESSIONS)
+    if unknown or len(sparsifier) > 1 or len(quantization) > 1 or len(compression) > 1:
+        raise ValueError("Unknown update codec: " + codec)
+    if sparsifier[0] and not delta:
+        raise ValueError("A sparse codec needs delta: " + codec)
+    if compression[0] == "zstd" and not zstandard:
+        raise ValueError("The zstd codec needs the zstandard package")
+    return delta, sparsifier[0], quantization[0], compression[0]
+
+
+def is_sparse(codec):
+    return parse_codec(codec)[1] is not None
+
+
+def update_mime_type(codec):
+    # The codec travels in the message, as a parameter of the attachment type
+    return UPDATE_MIME_TYPE + "; codec=" + codec
+
+
+def codec_from_mime_type(mime_type):
+    if not mime_type or not mime_type.startswith(UPDATE_MIME_TYPE):
+        return None
+    for param in mime_type.split(";")[1:]:
+        key, _, value = param.strip().partition("=")
+        if key == "codec":
+            return value
+    return None
+
+
+def compress(data, compression):
+    if compression == "deflate":
+        return zlib.compress(data, 9)
+    if compression == "zstd":
+        return zstandard.ZstdCompressor(level=19).compress(data)
+    return data
+
+
+def decompress(data, compression):
+    if compression == "deflate":
+        return zlib.decompress(data)
+    if compression == "zstd":
+        return zstandard.ZstdDecompressor().decompress(data)
+    return data
+
+
+def quantize(array, quantization, entry):
+    if quantization == "fp16":
+        return array.astype(np.float16)
+    if quantization == "int8":
+        # symmetric per-tensor scale
+        peak = float(np.abs(array).max()) if array.size else 0.0
+        scale = peak / 127.0 or 1.0
+        entry["scale"] = scale
+        return np.clip(np.rint(array / scale), -127, 127).astype(np.int8)
+    return array
+
+
+def dequantize(array, entry):
+    array = array.astype(np.float32)
+    if "scale" in entry:
+        array = array * np.float32(entry["scale"])
+    return array
+
+
+def sparsify(array, sparsifier):
+    # The sorted indices of the coordinates kept, into the flattened tensor
+    flat = np.abs(array.ravel())
+    if sparsifier == "threshold":
+        return np.flatnonzero(flat >= SPARSE_THRESHOLD)
+    keep = min(flat.size, max(1, int(math.ceil(TOPK_FRACTION * flat.size))))
+    if not keep:
+        return np.zeros(0, dtype=np.int64)
+    return np.sort(np.argpartition(flat, flat.size - keep)[flat.size - keep:])
+
+
+def index_encoding(size):
+    return np.dtype(np.uint16 if size <= 1 << 16 else np.uint32)
+
+
+def encode_update(state, base_state=None, codec=DEFAULT_CODEC, frozen=None, residual=None):
+    # residual, a dict kept by the caller from one update to the next, carries the
+    # coordinates a sparse codec did not send; it is updated in place
+    delta, sparsifier, quantization, compression = parse_codec(codec)
+    if delta and base_state is None:
+        raise ValueError("The delta codec needs the round's base model")
+
+    entries = []
+    blobs = []
+    for name, tensor in state.items():
+        if frozen and in_groups(name, frozen):
+            continue
+        array = tensor.detach().cpu().numpy()
+        entry = {"name": name, "shape": list(array.shape), "dtype": array.dtype.str}
+
+        # Integer buffers (counters and the like) are always sent exactly
+        if array.dtype.kind == "f":
+            array = array.astype(np.float32)
+            if delta:
+                array = array - base_state[name].detach().cpu().numpy()
+            if sparsifier:
+                if residual is not None and name in residual and residual[name].shape == array.shape:
+                    array = array + residual[name]
+                indices = sparsify(array, sparsifier)
+                values = quantize(array.ravel()[indices], quantization, entry)
+                if residual is not None:
+                    # What was not sent, quantization error included, goes next time
+                    carried = array.ravel().copy()
+                    carried[indices] -= dequantize(values, entry)
+                    residual[name] = carried.reshape(array.shape)
+                encoding = index_encoding(array.size)
+                entry["sparse"] = {"count": len(indices), "index_encoding": encoding.str}
+                blobs.append(np.diff(indices, prepend=0).astype(encoding).tobytes())
+                array = values
+            else:
+                array = quantize(array, quantization, entry)
+
+        entry["encoding"] = array.dtype.str
+        entries.append(entry)
+        blobs.append(np.ascontiguousarray(array).tobytes())
+
+    header = {"codec": codec, "tensors": entries}
+    if frozen:
+        header["frozen"] = {"groups": list(frozen), "sha256": frozen_sha256(state, frozen)}
+    header = json.dumps(header).encode()
+    body = compress(b"".join(blobs), compression)
+    return MAGIC + struct.pack("<I", len(header)) + header + body
+
+
+def is_update(data):
+    return data[:len(MAGIC)] == MAGIC
+
+
+def parse_update(data, base_state=None):
+    # The header and decompressed body of an update, checked against its base model
+    if not is_update(data):
+        raise ValueError("Not an encoded model update")
+    (header_len,) = struct.unpack("<I", data[4:8])
+    header = json.loads(data[8 : 8 + header_len].decode())
+    delta, _, _, compression = parse_codec(header["codec"])
+    if delta and base_state is None:
+        raise ValueError("The delta codec needs the round's base model")
+
+    frozen = header.get("frozen")
+    if frozen and base_state is not None:
+        if frozen_sha256(base_state, frozen["groups"]) != frozen["sha256"]:
+            raise ValueError("The update was trained from other frozen weights than the base model's")
+
+    return header, decompress(data[8 + header_len :], compression)
+
+
+def update_entries(header, body):
+    # (entry, indices, values) per tensor: indices are None for a dense tensor,
+    # and floating point values are dequantized to float32
+    offset = 0
+    for entry in header["tensors"]:
+        encoding = np.dtype(entry["encoding"])
+        sparse = entry.get("sparse")
+        indices = None
+        if sparse:
+            count = sparse["count"]
+            gap_encoding = np.dtype(sparse["index_encoding"])
+            gaps = np.frombuffer(body, dtype=gap_encoding, count=count, offset=offset)
+            offset += count * gap_encoding.itemsize
+            indices = np.cumsum(gaps, dtype=np.int64)
+        else:
+            count = int(np.prod(entry["shape"]))
+        array = np.frombuffer(body, dtype=encoding, count=count, offset=offset)
+        offset += count * encoding.itemsize
+        if not sparse:
+            array = array.reshape(entry["shape"])
+        if np.dtype(entry["dtype"]).kind == "f":
+            array = dequantize(array, entry)
+        yield entry, indices, array
+
+
+def decode_update(data, base_state=None):
+    header, body = parse_update(data, base_state)
+    delta = parse_codec(header["codec"])[0]
+
+    state = OrderedDict()
+    for entry, indices, array in update_entries(header, body):
+        dtype = np.dtype(entry["dtype"])
+        if indices is not None:
+            changed = base_state[entry["name"]].detach().cpu().numpy().astype(np.float32).ravel()
+            changed[indices] += array
+            array = changed.reshape(entry["shape"])
+        elif dtype.kind == "f" and delta:
+            array = array + base_state[entry["name"]].detach().cpu().numpy()
+        state[entry["name"]] = torch.from_numpy(array.astype(dtype))
+
+    return state, header["codec"]
+
+
+def merge_update(data, weight, averaged_state, base_state):
+    # Adds weight times the update's change from base_state into averaged_state,
+    # in place; a sparse tensor's coordinates are scattered in without making a
+    # dense copy of it
+    header, body = parse_update(data, base_state)
+    delta = parse_codec(header["codec"])[0]
+    for entry, indices, array in update_entries(header, body):
+        target = averaged_state[entry["name"]].view(-1)
+        if indices is not None:
+            target.index_add_(0, torch.from_numpy(indices), torch.from_numpy(array * np.float32(weight)))
+            continue
+        change = torch.from_numpy(array.astype(np.float32)).view(-1)
+        if not (delta and np.dtype(entry["dtype"]).kind == "f"):
+            change = change - base_state[entry["name"]].float().view(-1)
+        target.add_(change * weight)
+    return header["codec"]
+
+
+def encode_model_file(model_path, base_model_path=None, codec=DEFAULT_CODEC, frozen=None, residual=None):
+    _, state = model_format.load_state(model_path)
+    base_state = model_format.load_state(base_model_path)[1] if base_model_path else None
+    encoded = encode_update(state, base_state, codec, frozen, residual)
+    log_msg("ENCODED MODEL UPDATE WITH", codec, "TO", len(encoded), "BYTES")
+    return encoded
+
+
+def decode_model_bytes(data, base_model_path):
+    # Rebuild a full serialized model from an update against the base model;
+    # tensors the update leaves out, the frozen ones, are the base model's
+    model = model_format.load(base_model_path)
+    state, codec = decode_update(data, model.state_dict())
+    model.load_state_dict(state, strict=False)
+    log_msg("DECODED", len(data), "BYTES OF MODEL UPDATE WITH", codec)
+    return model_format.dumps(model)
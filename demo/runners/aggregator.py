@@ -0,0 +1,708 @@
+import asyncio
+import base64
+import binascii
+import json
+import logging
+import os
+import sys
+from urllib.parse import urlparse
+from uuid import uuid4
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # noqa
+
+from data.federated_average import federated_average
+from data.federated_evaluation import check_counts, merge
+from data import model_format
+from data.model_format import MODEL_MIME_TYPE
+from data.model_store import ModelStore
+from data.update_codec import (
+    DEFAULT_CODEC,
+    codec_from_mime_type,
+    decode_model_bytes,
+    encode_model_file,
+    is_sparse,
+    parse_update,
+    update_mime_type,
+)
+
+from runners.support.agent import DemoAgent, default_genesis_txns
+from runners.support.utils import (
+    log_json,
+    log_msg,
+    log_status,
+    log_timer,
+    prompt_loop,
+    require_indy,
+)
+
+LOGGER = logging.getLogger(__name__)
+
+REGION_NAME = os.getenv("REGION_NAME", "Region")
+# How the partial aggregate is encoded for the coordinator, see data/update_codec.py
+UPDATE_CODEC = os.getenv("FL_UPDATE_CODEC", DEFAULT_CODEC)
+# How long the region's hospitals have to evaluate a model: less than the
+# coordinator waits, so the region's sum gets there in time
+EVALUATION_DEADLINE = float(os.getenv("FL_REGION_EVALUATION_DEADLINE", "90"))
+# How long the region's hospitals have to send their updates, and the share of
+# them that must, as FL_ROUND_DEADLINE and FL_MIN_QUORUM do for the coordinator's
+# round; the deadline is shorter, so the region's aggregate gets there in time
+ROUND_DEADLINE = float(os.getenv("FL_REGION_ROUND_DEADLINE", "480"))
+MIN_QUORUM = float(os.getenv("FL_REGION_MIN_QUORUM", os.getenv("FL_MIN_QUORUM", "0.5")))
+
+
+class AggregatorAgent(DemoAgent):
+    """
+    A regional aggregator sits between the coordinator and its region's hospitals.
+
+    Towards the hospitals it acts as the coordinator: it proves it is a certified
+    researcher, verifies that they are hospitals, sends them the model and
+    averages their updates. Towards the coordinator it acts as one hospital,
+    sending a single partial aggregate weighted by the region's sample count, so
+    the coordinator's FedAvg over regions equals FedAvg over all hospitals.
+    """
+
+    def __init__(self, http_port: int, admin_port: int, **kwargs):
+        super().__init__(
+            REGION_NAME + " Aggregator",
+            http_port,
+            admin_port,
+            seed=None,
+            prefix="Aggregator",
+            extra_args=[
+                "--auto-accept-invites",
+                "--auto-accept-requests",
+                "--auto-store-credential",
+            ],
+            **kwargs,
+        )
+        self.regulator_did = "FEgQXGPN7gpbPqAU65weBT"
+        self.nhsheadoffice_did = "DukExq9foGb5DjDoRXx8G8"
+        self.active_connection_id = None
+        self._connection_ready = asyncio.Future()
+        self.cred_state = {}
+        # Downstream hospitals and the upstream coordinator, each proven by credential
+        self.trusted_hospital_ids = []
+        self.trusted_hospitals = []
+        self.trusted_researcher_connection_ids = []
+        self.model_store = ModelStore()
+        # The regional round: who the model came from, the model itself and the
+        # connection_id -> (update hash, number of samples) received so far
+        self.upstream_connection_id = None
+        self.upstream_content = None
+        self.base_model_hash = None
+        # Parameter groups the coordinator froze, see data/parameter_groups.py
+        self.frozen_groups = []
+        # What sparse partial aggregates have not sent upstream yet
+        self.residual = {}
+        self.round_participants = []
+        self.round_updates = {}
+        # Closes the regional round at its deadline, see close_regional_round
+        self.round_deadline = None
+        # Hospitals that missed the last regional round's deadline
+        self.late_hospital_ids = set()
+        # thread_id -> (connection_id, future) of the hospitals' evaluations awaited
+        self.pending_evaluations = {}
+
+    async def detect_connection(self):
+        await self._connection_ready
+
+    @property
+    def connection_ready(self):
+        return self._connection_ready.done() and self._connection_ready.result()
+
+    async def handle_connections(self, message):
+        if message["connection_id"] == self.active_connection_id:
+            if message["state"] == "active" and not self._connection_ready.done():
+                self.log("Connected")
+                self._connection_ready.set_result(True)
+
+    async def handle_issue_credential(self, message):
+        state = message["state"]
+        credential_exchange_id = message["credential_exchange_id"]
+        prev_state = self.cred_state.get(credential_exchange_id)
+        if prev_state == state:
+            return  # ignore
+        self.cred_state[credential_exchange_id] = state
+
+        self.log(
+            "Credential: state =",
+            state,
+            ", credential_exchange_id =",
+            credential_exchange_id,
+        )
+
+        if state == "offer_received":
+            log_status("#15 After receiving credential offer, send credential request")
+            await self.admin_POST(
+                "/issue-credential/records/" f"{credential_exchange_id}/send-request"
+            )
+
+        elif state == "stored":
+            self.log("Storing credential in wallet")
+            cred_id = message["credential_id"]
+            log_status(f"#18.1 Stored credential {cred_id} in wallet")
+            resp = await self.admin_GET(f"/credential/{cred_id}")
+            log_json(resp, label="Credential details:")
+
+    async def handle_present_proof(self, message):
+        state = message["state"]
+        presentation_request = message["presentation_request"]
+        presentation_exchange_id = message["presentation_exchange_id"]
+
+        self.log(
+            "Presentation: state =",
+            state,
+            ", presentation_exchange_id =",
+            presentation_exchange_id,
+        )
+
+        if state == "presentation_received":
+            log_status("#27 Process the proof provided by X")
+            log_status("#28 Check if proof is valid")
+            proof = await self.admin_POST(
+                f"/present-proof/records/{presentation_exchange_id}/"
+                "verify-presentation"
+            )
+            if not proof["verified"]:
+                self.log("Proof could not be verified")
+                return
+
+            connection_id = message["connection_id"]
+            attributes = {}
+            for referent, requested in presentation_request["requested_attributes"].items():
+                attributes[requested["name"]] = proof["presentation"]["requested_proof"][
+                    "revealed_attrs"
+                ][referent]["raw"]
+
+            if "hospital_name" in attributes:
+                if connection_id not in self.trusted_hospital_ids:
+                    self.log("Hospital", attributes["hospital_name"], "is now trusted")
+                    self.trusted_hospital_ids.append(connection_id)
+                    self.trusted_hospitals.append(dict(attributes, connection_id=connection_id))
+            elif "institution" in attributes:
+                if connection_id not in self.trusted_researcher_connection_ids:
+                    self.log("Researcher", attributes["institution"], "is now trusted")
+                    self.trusted_researcher_connection_ids.append(connection_id)
+
+        elif state == "request_received":
+            log_status(
+                "#24 Query for credentials in the wallet that satisfy the proof request"
+            )
+
+            # include self-attested attributes (not included in credentials)
+            credentials_by_reft = {}
+            revealed = {}
+            self_attested = {}
+            predicates = {}
+
+            # select credentials to provide for the proof
+            credentials = await self.admin_GET(
+                f"/present-proof/records/{presentation_exchange_id}/credentials"
+            )
+            if credentials:
+                for row in credentials:
+                    for referent in row["presentation_referents"]:
+                        if referent not in credentials_by_reft:
+                            credentials_by_reft[referent] = row
+
+            for referent in presentation_request["requested_attributes"]:
+                if referent in credentials_by_reft:
+                    revealed[referent] = {
+                        "cred_id": credentials_by_reft[referent]["cred_info"][
+                            "referent"
+                        ],
+                        "revealed": True,
+                    }
+                else:
+                    self_attested[referent] = REGION_NAME + " Aggregator"
+
+            for referent in presentation_request["requested_predicates"]:
+                if referent in credentials_by_reft:
+                    predicates[referent] = {
+                        "cred_id": credentials_by_reft[referent]["cred_info"][
+                            "referent"
+                        ],
+                        "revealed": True,
+                    }
+
+            log_status("#25 Generate the proof")
+            request = {
+                "requested_predicates": predicates,
+                "requested_attributes": revealed,
+                "self_attested_attributes": self_attested,
+            }
+
+            log_status("#26 Send the proof to X")
+            await self.admin_POST(
+                (
+                    "/present-proof/records/"
+                    f"{presentation_exchange_id}/send-presentation"
+                ),
+                request,
+            )
+
+    async def handle_basicmessages(self, message):
+        self.log("Received message:", message["content"])
+
+    async def handle_federatedlearningmessages(self, message):
+        if "model" in message:
+            model = base64.b64decode(message["model"])
+        elif message.get("model_sha256") and message["state"] == "received":
+            model = await self.fetch_model(message["model_sha256"])
+        else:
+            self.log("Received federated learning message:", message["content"])
+            return
+        await self.receive_model(
+            message["connection_id"], model, message["content"], message.get("mime_type")
+        )
+
+    async def handle_fl_model_transfer(self, transfer):
+        if transfer["role"] == "receiver" and transfer["state"] == "received":
+            model = await self.fetch_model(transfer["sha256"])
+            await self.receive_model(
+                transfer["connection_id"],
+                model,
+                transfer.get("content"),
+                transfer.get("mime_type"),
+            )
+
+    async def fetch_model(self, model_hash):
+        # A model this aggregator already holds is not copied from the agent again
+        if self.model_store.has(model_hash):
+            return self.model_store.get(model_hash)
+        return await self.admin_GET_binary(f"/fl-models/{model_hash}")
+
+    async def receive_model(self, connection_id, model, content, mime_type=None):
+        if connection_id in self.trusted_researcher_connection_ids:
+            await self.start_regional_round(connection_id, model, content)
+        elif connection_id in self.trusted_hospital_ids:
+            await self.handle_regional_update(connection_id, model, content, mime_type)
+        else:
+            self.log("Ignoring model from untrusted connection", connection_id)
+
+    async def send_model(self, connection_id, model_bytes, content):
+        # As the coordinator does: the agent serves the model and sends a link
+        await self.admin_POST_binary(
+            f"/connections/{connection_id}/send-fl-message",
+            model_bytes,
+            params={"content": content, "mime_type": MODEL_MIME_TYPE, "by_link": "true"},
+        )
+
+    async def handle_fl_evaluation_requests(self, request):
+        asyncio.ensure_future(self.evaluate_region(request))
+
+    async def evaluate_region(self, request):
+        # The region's hospitals score the model on their holdouts; counts add
+        # up, so the coordinator gets one sum for the region
+        connection_id = request["connection_id"]
+        if connection_id not in self.trusted_researcher_connection_ids:
+            self.log("Ignoring evaluation request from untrusted connection", connection_id)
+            return
+        result = {"thread_id": request["thread_id"], "model_sha256": request["model_sha256"]}
+        try:
+            if request["state"] != "received":
+                raise ValueError("model could not be fetched")
+            if not self.trusted_hospital_ids:
+                raise ValueError("no trusted hospitals in " + REGION_NAME)
+            model = await self.fetch_model(request["model_sha256"])
+            hospital_ids = list(self.trusted_hospital_ids)
+            tasks = [
+                asyncio.ensure_future(self.request_evaluation(hospital_id, model, request.get("content")))
+                for hospital_id in hospital_ids
+            ]
+            _, late = await asyncio.wait(tasks, timeout=EVALUATION_DEADLINE or None)
+            counts = []
+            for hospital_id, task in zip(hospital_ids, tasks):
+                if task in late:
+                    task.cancel()
+                    self.log("No evaluation from", hospital_id, "by the deadline")
+                elif task.exception():
+                    self.log("Evaluation failed at", hospital_id, task.exception())
+                else:
+                    try:
+                        counts.append(check_counts(task.result()))
+                    except ValueError as e:
+                        self.log("Ignoring evaluation from", hospital_id, e)
+            if not counts:
+                raise ValueError("no hospital in " + REGION_NAME + " evaluated the model")
+            result["metrics"] = merge(counts)
+            self.log("Sending", REGION_NAME, "evaluation of", len(counts), "hospitals upstream")
+        except Exception as e:
+            self.log("Error evaluating model", request["model_sha256"], e)
+            result["error"] = str(e) or type(e).__name__
+        await self.admin_POST(f"/connections/{connection_id}/send-fl-evaluation-result", result)
+
+    async def request_evaluation(self, connection_id, model_bytes, content):
+        future = asyncio.Future()
+        sent = await self.admin_POST_binary(
+            f"/connections/{connection_id}/send-fl-evaluation-request",
+            model_bytes,
+            params={"content": content, "mime_type": MODEL_MIME_TYPE},
+        )
+        self.pending_evaluations[sent["thread_id"]] = (connection_id, future)
+        try:
+            return await future
+        finally:
+            self.pending_evaluations.pop(sent["thread_id"], None)
+
+    async def handle_fl_evaluation_results(self, message):
+        connection_id, future = self.pending_evaluations.get(message["thread_id"], (None, None))
+        if connection_id != message["connection_id"] or future.done():
+            self.log("Ignoring evaluation result not awaited from", message["connection_id"])
+            return
+        if message.get("error"):
+            future.set_exception(Exception(message["error"]))
+        else:
+            future.set_result(message.get("metrics") or {})
+
+    def complete_model(self, model):
+        # A partial model from the coordinator is completed with the frozen weights
+        # of the last one; the region's hospitals are sent the whole model
+        header, state = model_format.loads_state(model)
+        if header.get("partial"):
+            if not self.base_model_hash:
+                raise model_format.FrozenWeightsMissing("A partial model came before the frozen weights it pins")
+            _, base_state = model_format.load_state(self.model_store.path(self.base_model_hash))
+            header, state = model_format.complete_state(header, state, base_state)
+        self.frozen_groups = model_format.frozen_groups(header)
+        if not self.frozen_groups:
+            return model
+        return model_format.dumps(model_format.module_from(header, state), self.frozen_groups)
+
+    async def request_full_model(self, connection_id):
+        # Rather than letting the coordinator's round time out on this region
+        await self.admin_POST(
+            f"/connections/{connection_id}/send-fl-message",
+            {"content": json.dumps({"error": model_format.NEED_FULL_MODEL})},
+        )
+
+    async def start_regional_round(self, connection_id, model, content):
+        if not self.trusted_hospital_ids:
+            self.log("No trusted hospitals in", REGION_NAME, "to learn from")
+            return
+
+        try:
+            model = self.complete_model(model)
+        except ValueError as e:
+            self.log("Cannot use the model from", connection_id, e)
+            if model_format.needs_full_model(e):
+                await self.request_full_model(connection_id)
+            return
+
+        self.cancel_round_deadline()
+        if self.base_model_hash:
+            self.model_store.release(self.base_model_hash)
+        for update_hash, _ in self.round_updates.values():
+            self.model_store.release(update_hash)
+        self.base_model_hash = self.model_store.put(model, connection_id=connection_id, ref=True)
+        self.upstream_connection_id = connection_id
+        self.upstream_content = content
+        self.round_participants = list(self.trusted_hospital_ids)
+        self.round_updates = {}
+        self.late_hospital_ids = set()
+        self.round_deadline = asyncio.ensure_future(self.close_regional_round())
+
+        self.log("Sending model to", len(self.round_participants), "hospitals in", REGION_NAME)
+        await asyncio.gather(
+            *[
+                self.send_model(hospital_id, model, content or "{}")
+                for hospital_id in self.round_participants
+            ]
+        )
+
+    def quorum(self):
+        return max(1, int(MIN_QUORUM * len(self.round_participants) + 0.999999))
+
+    def cancel_round_deadline(self):
+        if self.round_deadline and not self.round_deadline.done():
+            self.round_deadline.cancel()
+        self.round_deadline = None
+
+    async def close_regional_round(self):
+        # At the deadline the updates received go upstream if they make a quorum;
+        # short of one nothing is sent, and the coordinator's round times the region out
+        await asyncio.sleep(ROUND_DEADLINE)
+        self.round_deadline = None
+        missing = [c for c in self.round_participants if c not in self.round_updates]
+        self.log(
+            REGION_NAME, "round reached its deadline of", ROUND_DEADLINE, "seconds without",
+            len(missing), "of", len(self.round_participants), "hospitals",
+        )
+        quorum = self.quorum()
+        # The round closes now: updates arriving later are dropped
+        self.late_hospital_ids = set(missing)
+        self.round_participants = []
+        if len(self.round_updates) >= quorum:
+            await self.send_partial_aggregate()
+        else:
+            self.log(
+                "Only", len(self.round_updates), "hospitals in", REGION_NAME,
+                "answered, short of the quorum - no aggregate is sent",
+            )
+            for update_hash, _ in self.round_updates.values():
+                self.model_store.release(update_hash)
+            self.round_updates = {}
+
+    async def handle_regional_update(self, connection_id, model, content, mime_type=None):
+        if connection_id in self.late_hospital_ids:
+            self.late_hospital_ids.discard(connection_id)
+            self.log("Dropping update from", connection_id, "which missed the", REGION_NAME, "deadline")
+            return
+        if connection_id not in self.round_participants:
+            self.log("Ignoring update from hospital outside the current round:", connection_id)
+            return
+        if connection_id in self.round_updates:
+            self.log("Already received an update this round from", connection_id)
+            return
+
+        base_file = self.model_store.path(self.base_model_hash)
+        try:
+            metadata = json.loads(content or "{}")
+            codec = codec_from_mime_type(mime_type)
+            if codec and is_sparse(codec):
+                # Kept as sent: aggregation merges it into the average directly
+                parse_update(model, model_format.load_state(base_file)[1])
+            elif codec:
+                # Hospital updates are encoded against the model this aggregator sent
+                model = decode_model_bytes(model, base_file)
+            update_hash = self.model_store.put(
+                model, parent=self.base_model_hash, connection_id=connection_id, ref=True
+            )
+        except Exception as e:
+            self.log("Error storing update from", connection_id, e)
+            return
+
+        self.round_updates[connection_id] = (update_hash, metadata.get("num_samples") or 1)
+        self.log(
+            "Received update", len(self.round_updates), "of", len(self.round_participants),
+            "from", connection_id
+        )
+        if len(self.round_updates) == len(self.round_participants):
+            self.cancel_round_deadline()
+            await self.send_partial_aggregate()
+
+    async def send_partial_aggregate(self):
+        update_hashes, sample_counts = zip(*self.round_updates.values())
+        model_files = [self.model_store.path(update_hash) for update_hash in update_hashes]
+        aggregate_file = self.model_store.scratch_path()
+        try:
+            base_file = self.model_store.path(self.base_model_hash)
+            await federated_average(
+                model_files, sample_counts, aggregate_file, self.frozen_groups, base_file
+            )
+            # Only the change from the coordinator's model goes upstream
+            partial_aggregate = encode_model_file(
+                aggregate_file, base_file, UPDATE_CODEC, self.frozen_groups, self.residual
+            )
+            self.model_store.put_file(
+                aggregate_file, remove=True, parent=self.base_model_hash
+            )
+        except Exception as e:
+            self.log("Error aggregating regional models", e)
+            return
+        finally:
+            if os.path.exists(aggregate_file):
+                os.remove(aggregate_file)
+            for update_hash in update_hashes:
+                self.model_store.release(update_hash)
+            self.round_updates = {}
+
+        # The region's total sample count weights this aggregate at the coordinator
+        total_samples = sum(sample_counts)
+        self.log(
+            "Sending", REGION_NAME, "aggregate of", len(sample_counts), "hospitals and",
+            total_samples, "samples upstream"
+        )
+        await self.admin_POST_binary(
+            f"/connections/{self.upstream_connection_id}/send-fl-model",
+            partial_aggregate,
+            params={
+                "content": json.dumps(
+                    {
+                        "num_samples": total_samples,
+                        "hospitals": len(sample_counts),
+                        "region": REGION_NAME,
+                    }
+                ),
+                "mime_type": update_mime_type(UPDATE_CODEC),
+            },
+        )
+
+
+async def request_proof(agent, name, req_attrs):
+    indy_proof_request = {
+        "name": name,
+        "version": "1.0",
+        "nonce": str(uuid4().int),
+        "requested_attributes": {
+            f"0_{req_attr['name']}_uuid": req_attr for req_attr in req_attrs
+        },
+        "requested_predicates": {},
+    }
+    print("Asking for this proof: ", indy_proof_request)
+    await agent.admin_POST(
+        "/present-proof/send-request",
+        {"connection_id": agent.active_connection_id, "proof_request": indy_proof_request},
+    )
+
+
+async def create_invitation(agent):
+    with log_timer("Generate invitation duration:"):
+        log_status("#5 Create a connection for a hospital and print out the invite details")
+        connection = await agent.admin_POST("/connections/create-invitation")
+
+    agent.active_connection_id = connection["connection_id"]
+    agent._connection_ready = asyncio.Future()
+    log_json(connection, label="Invitation response:")
+    log_msg("*****************")
+    log_msg(json.dumps(connection["invitation"]), label="Invitation:", color=None)
+    log_msg("*****************")
+
+    log_msg("Waiting for connection...")
+    await agent.detect_connection()
+
+
+async def input_invitation(agent):
+    async for details in prompt_loop("Invite details: "):
+        b64_invite = None
+        try:
+            url = urlparse(details)
+            query = url.query
+            if query and "c_i=" in query:
+                pos = query.index("c_i=") + 4
+                b64_invite = query[pos:]
+            else:
+                b64_invite = details
+        except ValueError:
+            b64_invite = details
+
+        if b64_invite:
+            try:
+                invite_json = base64.urlsafe_b64decode(b64_invite)
+                details = invite_json.decode("utf-8")
+            except binascii.Error:
+                pass
+            except UnicodeDecodeError:
+                pass
+
+        if details:
+            try:
+                json.loads(details)
+                break
+            except json.JSONDecodeError as e:
+                log_msg("Invalid invitation:", str(e))
+
+    with log_timer("Connect duration:"):
+        connection = await agent.admin_POST("/connections/receive-invitation", details)
+        agent.active_connection_id = connection["connection_id"]
+        agent._connection_ready = asyncio.Future()
+        log_json(connection, label="Invitation response:")
+
+        await agent.detect_connection()
+
+
+async def main(start_port: int, show_timing: bool = False):
+
+    genesis = await default_genesis_txns()
+    if not genesis:
+        print("Error retrieving ledger genesis transactions")
+        sys.exit(1)
+
+    agent = None
+
+    try:
+        log_status("#1 Provision an agent and wallet, get back configuration details")
+        agent = AggregatorAgent(
+            start_port, start_port + 1, genesis_data=genesis, timing=show_timing
+        )
+        await agent.listen_webhooks(start_port + 2)
+
+        with log_timer("Startup duration:"):
+            await agent.start_process()
+        log_msg("Admin url is at:", agent.admin_url)
+        log_msg("Endpoint url is at:", agent.endpoint)
+
+        async for option in prompt_loop(
+            "(1) Input New Invitation (regulator or coordinator) \n"
+            + "(2) Create New Invitation (hospital) \n"
+            + "(3) Request proof of Verified Hospital \n"
+            + "(4) Request proof of Certified Researcher \n"
+            + "(5) List trusted connections \n"
+            + "(X) Exit? \n[1/2/3/4/5/X] "
+        ):
+            if option is None or option in "xX":
+                break
+            elif option == "1":
+                log_status("Input new invitation details")
+                await input_invitation(agent)
+            elif option == "2":
+                await create_invitation(agent)
+            elif option == "3":
+                log_status("#20 Request proof of Verified Hospital")
+                await request_proof(
+                    agent,
+                    "Proof of Verified Hospital",
+                    [
+                        {"name": "date", "restrictions": [{"issuer_did": agent.nhsheadoffice_did}]},
+                        {"name": "hospital_name", "restrictions": [{"issuer_did": agent.nhsheadoffice_did}]},
+                    ],
+                )
+            elif option == "4":
+                log_status("#20 Request proof of Research Certification")
+                await request_proof(
+                    agent,
+                    "Proof of Verified Research Institution",
+                    [
+                        {"name": "date", "restrictions": [{"issuer_did": agent.regulator_did}]},
+                        {"name": "institution", "restrictions": [{"issuer_did": agent.regulator_did}]},
+                    ],
+                )
+            elif option == "5":
+                log_status("Trusted Connections")
+                log_msg("Hospitals:", agent.trusted_hospitals)
+                log_msg("Researchers:", agent.trusted_researcher_connection_ids)
+
+        if show_timing:
+            timing = await agent.fetch_timing()
+            if timing:
+                for line in agent.format_timing(timing):
+                    log_msg(line)
+
+    finally:
+        terminated = True
+        try:
+            if agent:
+                await agent.terminate()
+        except Exception:
+            LOGGER.exception("Error terminating agent:")
+            terminated = False
+
+    await asyncio.sleep(0.1)
+
+    if not terminated:
+        os._exit(1)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Runs a regional aggregator demo agent.")
+    parser.add_argument(
+        "-p",
+        "--port",
+        type=int,
+        default=8180,
+        metavar=("<port>"),
+        help="Choose the starting port number to listen on",
+    )
+    parser.add_argument(
+        "--timing", action="store_true", help="Enable timing information"
+    )
+    args = parser.parse_args()
+
+    require_indy()
+
+    try:
+        asyncio.get_event_loop().run_until_complete(main(args.port, args.timing))
+    except KeyboardInterrupt:
+        os._exit(1)
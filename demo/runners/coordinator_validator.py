@@ -6,12 +6,24 @@ import random
 import sys
 import base64
 import binascii
+import time
 from urllib.parse import urlparse
 from uuid import uuid4
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # noqa
 
-from data.validate_model import validate_model
+from data.validate_model import log_result, validate_model
 from data.generate_model import generate_model
+from data.convergence import ConvergenceMonitor
+from data.federated_average import federated_async_update, federated_average
+from data.federated_evaluation import check_counts, merge, summarize
+from data import model_format
+from data.model_format import MODEL_MIME_TYPE, NEED_FULL_MODEL
+from data.model_store import ModelStore
+from data.parameter_groups import FROZEN_GROUPS, frozen_sha256, parse_groups
+from data.participant_selector import DEFAULT_PARTICIPANTS, DEFAULT_POLICY, POLICIES, ParticipantSelector
+from data.preprocessing import read_vocabulary
+from data.server_optimizer import DEFAULT_SERVER_OPTIMIZER, SERVER_OPTIMIZERS, ServerOptimizer
+from data.update_codec import codec_from_mime_type, decode_model_bytes, is_sparse, parse_update
 
 
 
@@ -32,21 +44,69 @@ CRED_PREVIEW_TYPE = (
 
 LOGGER = logging.getLogger(__name__)
 
+# Sequential: the model is passed along the hospitals one after another
+# Parallel: every hospital trains the same global model, updates are averaged
+# Async: each update is merged as it arrives and its hospital gets the new model
+ROUND_MODE_SEQUENTIAL = "sequential"
+ROUND_MODE_PARALLEL = "parallel"
+ROUND_MODE_ASYNC = "async"
+ROUND_MODES = (ROUND_MODE_SEQUENTIAL, ROUND_MODE_PARALLEL, ROUND_MODE_ASYNC)
+# Models sent out per hospital in an async round; the budget is shared, so
+# faster hospitals end up training more of them
+ASYNC_UPDATES_PER_HOSPITAL = int(os.getenv("FL_ASYNC_UPDATES_PER_HOSPITAL", "3"))
+# A round ends at its deadline (in seconds, 0 for none) with the updates it has:
+# they are used if at least MIN_QUORUM of the round's hospitals answered, else
+# the round leaves the model as it was. Updates that come in after the deadline
+# are dropped, or merged with a staleness weight like async updates (stale).
+ROUND_DEADLINE = float(os.getenv("FL_ROUND_DEADLINE", "600"))
+MIN_QUORUM = float(os.getenv("FL_MIN_QUORUM", "0.5"))
+LATE_UPDATES_DROP = "drop"
+LATE_UPDATES_STALE = "stale"
+LATE_UPDATES = os.getenv("FL_LATE_UPDATES", LATE_UPDATES_DROP)
+# Where round metrics come from: the coordinator's own validation set (local),
+# or the hospitals' holdouts, which score the model and send back counts only
+# (federated, see data/federated_evaluation.py). Hospitals that have not
+# answered within EVALUATION_DEADLINE seconds are left out of the evaluation.
+VALIDATION_LOCAL = "local"
+VALIDATION_FEDERATED = "federated"
+VALIDATION_MODES = (VALIDATION_LOCAL, VALIDATION_FEDERATED)
+DEFAULT_VALIDATION = os.getenv("FL_VALIDATION", VALIDATION_LOCAL)
+EVALUATION_DEADLINE = float(os.getenv("FL_EVALUATION_DEADLINE", "120"))
+
 
 class CoordinatorAgent(DemoAgent):
 
 
-    def __init__(self, http_port: int, admin_port: int, **kwargs):
+    def __init__(
+        self,
+        http_port: int,
+        admin_port: int,
+        round_mode: str = ROUND_MODE_SEQUENTIAL,
+        selector: ParticipantSelector = None,
+        frozen_groups: str = FROZEN_GROUPS,
+        server_optimizer: ServerOptimizer = None,
+        validation: str = DEFAULT_VALIDATION,
+        **kwargs
+    ):
         super().__init__(
             "Coordinator Agent",
             http_port,
             admin_port,
             seed=None,
             prefix="Coordinator",
-            extra_args=["--auto-accept-invites", "--auto-accept-requests", "--auto-store-credential"],
+            extra_args=[
+                "--auto-accept-invites",
+                "--auto-accept-requests",
+                "--auto-store-credential",
+                # Checkpoints are kept with the wallet's job records, not in a temp dir
+                "--fl-model-dir",
+                os.getcwd() + "/model/agent",
+            ],
             **kwargs,
         )
         self.nhsheadoffice_did = "DukExq9foGb5DjDoRXx8G8"
+        # Regional aggregators prove they are certified researchers, see aggregator.py
+        self.regulator_did = "FEgQXGPN7gpbPqAU65weBT"
         self.active_connection_id = None
         self.connection_list = []
         self.trusted_connection_ids = []
@@ -58,7 +118,53 @@ class CoordinatorAgent(DemoAgent):
         self.cred_attrs = {}
         self.learning_complete = asyncio.Future()
         self.current_learner_index = 0
-        self.current_model_file = os.getcwd() + "/model/model.pt"
+        self.current_model_file = os.getcwd() + "/model/model.fltm"
+        # Every model of every round is kept by hash, see data/model_store.py
+        self.model_store = ModelStore()
+        self.current_model_hash = None
+        self.round = 0
+        self.round_mode = round_mode
+        # Chooses which trusted hospitals train each round, see data/participant_selector.py
+        self.selector = selector or ParticipantSelector()
+        # Sent with every model so that all hospitals encode their data the same
+        # way, see data/preprocessing.py; None lets each fit its own
+        self.vocabulary = read_vocabulary()
+        # Parameter groups the job does not train, see data/parameter_groups.py,
+        # and connection_id -> hash of the frozen weights that hospital was sent
+        self.frozen_groups = parse_groups(frozen_groups)
+        self.frozen_pinned = {}
+        # Applies each parallel round's average, see data/server_optimizer.py
+        self.server_optimizer = server_optimizer or ServerOptimizer()
+        # Model bytes sent to and received from the hospitals, for byte budgets
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        # connection_id -> (model file, number of samples) for the parallel round
+        self.round_participants = []
+        self.round_updates = {}
+        # Async rounds: the global model's version, bumped by every merge, and
+        # connection_id -> (version, model hash) of the model each hospital trains
+        self.model_version = 0
+        self.async_dispatched = {}
+        self.async_dispatches_left = 0
+        # accuracy, AUC and loss of every model validated, see data/validate_model.py
+        self.validation_results = []
+        # Round metrics from the local validation set or the hospitals' holdouts,
+        # and thread_id -> (connection_id, future) of the evaluations awaited
+        self.validation = validation
+        self.pending_evaluations = {}
+        # The round's deadline: the model it started from, who answered in time,
+        # connection_id -> (round, model hash) of models whose update is late,
+        # and a record of each round's participation
+        self.round_started = None
+        self.round_start_hash = None
+        self.round_responded = set()
+        self.late_updates = {}
+        self.participation_log = []
+        self.aggregating = False
+        # The job and round records in the agent's wallet, which a restarted
+        # coordinator resumes from
+        self.job_id = None
+        self.job_participants = []
 
 
     async def detect_connection(self):
@@ -223,50 +329,702 @@ class CoordinatorAgent(DemoAgent):
                 request,
             )
 
+    def set_current_model(self, model_bytes, connection_id=None):
+        # The store holds a reference to the current model, so it is never evicted
+        model_hash = self.model_store.put(
+            model_bytes,
+            round=self.round,
+            parent=self.current_model_hash,
+            connection_id=connection_id,
+            ref=True,
+        )
+        if self.current_model_hash:
+            self.model_store.release(self.current_model_hash)
+        self.current_model_hash = model_hash
+        self.current_model_file = self.model_store.path(model_hash)
+        return model_hash
+
+    async def validate(self, model_file):
+        result = await validate_model(model_file)
+        self.validation_results.append(result)
+        return result
+
+    async def request_evaluation(self, connection_id, model_bytes):
+        # The hospital's counts for the model on its holdout. The whole model is
+        # sent, by link: its agent downloads it only if it does not hold it yet
+        future = asyncio.Future()
+        sent = await self.admin_POST_binary(
+            f"/connections/{connection_id}/send-fl-evaluation-request",
+            model_bytes,
+            params={
+                "content": json.dumps(self.model_metadata()),
+                "job_id": self.job_id,
+                "round_number": str(self.round),
+                "mime_type": MODEL_MIME_TYPE,
+            },
+        )
+        self.bytes_sent += len(model_bytes)
+        self.pending_evaluations[sent["thread_id"]] = (connection_id, future)
+        try:
+            return await future
+        finally:
+            self.pending_evaluations.pop(sent["thread_id"], None)
+
+    async def handle_fl_evaluation_results(self, message):
+        connection_id, future = self.pending_evaluations.get(message["thread_id"], (None, None))
+        if connection_id != message["connection_id"] or future.done():
+            self.log("Ignoring evaluation result not awaited from", message["connection_id"])
+            return
+        self.bytes_received += len(json.dumps(message.get("metrics") or {}))
+        if message.get("error"):
+            future.set_exception(Exception(message["error"]))
+        else:
+            future.set_result(message.get("metrics") or {})
+
+    async def evaluate_federated(self, model_file=None):
+        # Scores the model on the trusted hospitals' holdouts at once, and merges
+        # the counts of those that answered by the deadline
+        model_file = model_file or self.current_model_file
+        connection_ids = list(self.trusted_connection_ids)
+        if not connection_ids:
+            self.log("No trusted hospitals to evaluate the model")
+            return None
+        with open(model_file, "rb") as f:
+            model_bytes = f.read()
+
+        self.log("Asking", len(connection_ids), "hospitals to evaluate the model")
+        started = time.monotonic()
+        tasks = [
+            asyncio.ensure_future(self.request_evaluation(connection_id, model_bytes))
+            for connection_id in connection_ids
+        ]
+        _, late = await asyncio.wait(tasks, timeout=EVALUATION_DEADLINE or None)
+        counts = []
+        for connection_id, task in zip(connection_ids, tasks):
+            if task in late:
+                task.cancel()
+                self.log("No evaluation from", connection_id, "by the deadline")
+            elif task.exception():
+                self.log("Evaluation failed at", connection_id, task.exception())
+            else:
+                try:
+                    counts.append(check_counts(task.result()))
+                except ValueError as e:
+                    self.log("Ignoring evaluation from", connection_id, e)
+
+        merged = merge(counts)
+        if not merged["samples"]:
+            self.log("No hospital evaluated the model")
+            return None
+        result = summarize(merged, model_file)
+        result["seconds"] = time.monotonic() - started
+        result["hospitals"] = len(counts)
+        result["federated"] = True
+        log_result(result)
+        self.validation_results.append(result)
+        return result
+
+    def model_metadata(self, metadata=None):
+        metadata = dict(metadata or {}, round=self.round)
+        if self.job_id:
+            # Hospitals keep their optimizer state for the job's rounds
+            metadata["job"] = self.job_id
+        if self.vocabulary:
+            metadata["vocabulary"] = self.vocabulary
+        return metadata
+
+    def exchange_model(self, connection_id, model_bytes):
+        # With frozen groups, a hospital already sent the frozen weights gets the
+        # trainable tensors only, pinning the frozen ones by hash
+        if not self.frozen_groups:
+            return model_bytes
+        model = model_format.loads(model_bytes)
+        pinned = frozen_sha256(model.state_dict(), self.frozen_groups)
+        partial = self.frozen_pinned.get(connection_id) == pinned
+        self.frozen_pinned[connection_id] = pinned
+        return model_format.dumps(model, self.frozen_groups, partial)
+
+    async def send_model(self, connection_id, model_bytes, metadata=None, resend=False):
+        # The agent serves the model from its endpoint and sends only a link
+        # and hash: every hospital in a round downloads the same stored file
+        model_bytes = self.exchange_model(connection_id, model_bytes)
+        self.bytes_sent += len(model_bytes)
+        if not resend:
+            self.selector.dispatched(connection_id)
+            self.forget_late(connection_id)
+        await self.admin_POST_binary(
+            f"/connections/{connection_id}/send-fl-message",
+            model_bytes,
+            params={
+                "content": json.dumps(self.model_metadata(metadata)),
+                "mime_type": MODEL_MIME_TYPE,
+                "by_link": "true",
+            },
+        )
+
+    async def resend_full_model(self, connection_id):
+        # The hospital lost the frozen weights the partial model pinned (a restart,
+        # a new worker): the model it is training on goes again, whole
+        self.frozen_pinned.pop(connection_id, None)
+        if connection_id not in self.round_participants or not self.selector.record(connection_id).outstanding:
+            self.log("Ignoring request for the full model from", connection_id, "which has none to train")
+            return
+        metadata = None
+        if self.round_mode == ROUND_MODE_ASYNC and connection_id in self.async_dispatched:
+            metadata = {"version": self.async_dispatched[connection_id][0]}
+        with open(self.update_base_file(connection_id), "rb") as f:
+            model_bytes = f.read()
+        self.log("Sending the full model again to", connection_id)
+        await self.send_model(connection_id, model_bytes, metadata, resend=True)
+
+    async def start_sequential_round(self, model_bytes):
+        self.round += 1
+        self.current_learner_index = 0
+        self.round_participants = self.selector.select(self.trusted_connection_ids, self.round)
+        await self.send_model(self.round_participants[0], model_bytes)
+
+    async def start_parallel_round(self, model_bytes):
+        self.round += 1
+        self.round_participants = self.selector.select(self.trusted_connection_ids, self.round)
+        for update_hash, _ in self.round_updates.values():
+            self.model_store.release(update_hash)
+        self.round_updates = {}
+
+        self.log("Sending model to", len(self.round_participants), "hospitals")
+        await asyncio.gather(
+            *[
+                self.send_model(connection_id, model_bytes)
+                for connection_id in self.round_participants
+            ]
+        )
+
+    async def start_async_round(self, model_bytes):
+        self.round += 1
+        self.round_participants = self.selector.select(self.trusted_connection_ids, self.round)
+        self.async_dispatches_left = len(self.round_participants) * ASYNC_UPDATES_PER_HOSPITAL
+
+        self.log("Sending model to", len(self.round_participants), "hospitals")
+        await asyncio.gather(
+            *[self.dispatch_async(connection_id) for connection_id in self.round_participants]
+        )
+
+    async def dispatch_async(self, connection_id):
+        # The model sent is held in the store until the update made from it is merged
+        self.async_dispatches_left -= 1
+        self.model_store.acquire(self.current_model_hash)
+        self.async_dispatched[connection_id] = (self.model_version, self.current_model_hash)
+        await self.send_model(
+            connection_id,
+            self.model_store.get(self.current_model_hash),
+            {"version": self.model_version},
+        )
+
+    async def handle_async_update(self, connection_id, model):
+        if connection_id not in self.async_dispatched:
+            self.log("Ignoring update from connection without a model in training:", connection_id)
+            return
+        version, base_hash = self.async_dispatched.pop(connection_id)
+        staleness = self.model_version - version
+
+        update_hash = None
+        merged_file = self.model_store.scratch_path()
+        try:
+            update_hash = self.model_store.put(
+                model, round=self.round, parent=base_hash, connection_id=connection_id
+            )
+            await federated_async_update(
+                self.current_model_file,
+                self.model_store.path(update_hash),
+                staleness,
+                merged_file,
+                frozen=self.frozen_groups,
+            )
+            with open(merged_file, "rb") as f:
+                self.set_current_model(f.read(), connection_id)
+            self.model_version += 1
+            self.log(
+                "Merged update from", connection_id, "trained on version", version,
+                "(staleness", str(staleness) + "), global model is now version",
+                self.model_version,
+            )
+            await self.validate(self.current_model_file)
+        except Exception as e:
+            self.log("Error merging update", e)
+        finally:
+            if os.path.exists(merged_file):
+                os.remove(merged_file)
+            self.model_store.release(base_hash)
+
+        # Straight back to work on the newest model, until the round's budget is spent
+        if self.async_dispatches_left > 0 and connection_id in self.round_participants:
+            await self.dispatch_async(connection_id)
+        elif not self.async_dispatched and not self.learning_complete.done():
+            self.log("Async round complete at model version", self.model_version)
+            self.finish_round()
+
     async def handle_basicmessages(self, message):
-        cwd = os.getcwd()
+        self.log("Received message:", message["content"])
+
+    async def handle_federatedlearningmessages(self, message):
+        if "model" in message:
+            await self.receive_update(
+                message["connection_id"],
+                base64.b64decode(message["model"]),
+                message["content"],
+                message.get("mime_type"),
+            )
+        elif message.get("model_sha256") and message["state"] == "received":
+            model = await self.fetch_model(message["model_sha256"])
+            await self.receive_update(
+                message["connection_id"], model, message["content"], message.get("mime_type")
+            )
+        elif self.message_error(message) == NEED_FULL_MODEL:
+            await self.resend_full_model(message["connection_id"])
+        else:
+            self.log("Received federated learning message:", message["content"])
+
+    def message_error(self, message):
+        try:
+            return json.loads(message.get("content") or "{}").get("error")
+        except (ValueError, AttributeError):
+            return None
+
+    async def fetch_model(self, model_hash):
+        # A model this coordinator already holds is not copied from the agent again
+        if self.model_store.has(model_hash):
+            return self.model_store.get(model_hash)
+        return await self.admin_GET_binary(f"/fl-models/{model_hash}")
+
+    async def handle_fl_model_transfer(self, transfer):
+        if transfer["role"] == "receiver" and transfer["state"] == "received":
+            model = await self.fetch_model(transfer["sha256"])
+            await self.receive_update(
+                transfer["connection_id"], model, transfer.get("content"), transfer.get("mime_type")
+            )
+        elif transfer["role"] == "sender" and transfer["state"] == "complete":
+            self.log("Model", transfer["sha256"], "delivered to", transfer["connection_id"])
+
+    async def handle_late_update(self, connection_id, model, mime_type=None):
+        late_round, base_hash = self.late_updates.pop(connection_id)
+        try:
+            if LATE_UPDATES != LATE_UPDATES_STALE:
+                self.log("Dropping update from", connection_id, "which missed round", late_round)
+                return
+            if codec_from_mime_type(mime_type):
+                model = decode_model_bytes(model, self.model_store.path(base_hash))
+            # One round stale if it arrived before the next round, more after that
+            staleness = self.round - late_round + 1
+            update_hash = self.model_store.put(
+                model, round=late_round, parent=base_hash, connection_id=connection_id
+            )
+            merged_file = self.model_store.scratch_path()
+            try:
+                await federated_async_update(
+                    self.current_model_file, self.model_store.path(update_hash), staleness, merged_file,
+                    frozen=self.frozen_groups,
+                )
+                with open(merged_file, "rb") as f:
+                    self.set_current_model(f.read(), connection_id)
+            finally:
+                if os.path.exists(merged_file):
+                    os.remove(merged_file)
+            self.log("Merged late update from", connection_id, "with staleness", staleness)
+            await self.validate(self.current_model_file)
+        except Exception as e:
+            self.log("Error merging late update from", connection_id, e)
+        finally:
+            self.model_store.release(base_hash)
+
+    def expect_late(self, connection_id, base_hash, acquire=True):
+        # base_hash is the model the hospital trains on, kept to decode its update
+        self.forget_late(connection_id)
+        if acquire:
+            self.model_store.acquire(base_hash)
+        self.late_updates[connection_id] = (self.round, base_hash)
+
+    def forget_late(self, connection_id):
+        if connection_id in self.late_updates:
+            self.model_store.release(self.late_updates.pop(connection_id)[1])
+
+    def restore_model(self, model_hash):
+        if not model_hash or model_hash == self.current_model_hash:
+            return
+        self.model_store.acquire(model_hash)
+        if self.current_model_hash:
+            self.model_store.release(self.current_model_hash)
+        self.current_model_hash = model_hash
+        self.current_model_file = self.model_store.path(model_hash)
+
+    def quorum(self):
+        return max(1, int(MIN_QUORUM * len(self.round_participants) + 0.999999))
+
+    def finish_round(self):
+        if not self.learning_complete.done():
+            self.learning_complete.set_result(True)
+
+    async def run_round(self, model_bytes):
+        # Starts a round and returns by its deadline, whether or not everyone answered
+        self.learning_complete = asyncio.Future()
+        self.round_started = time.monotonic()
+        self.round_responded = set()
+        self.round_start_hash = self.current_model_hash
+        if self.round_start_hash:
+            self.model_store.acquire(self.round_start_hash)
+        try:
+            if self.round_mode == ROUND_MODE_PARALLEL:
+                await self.start_parallel_round(model_bytes)
+            elif self.round_mode == ROUND_MODE_ASYNC:
+                await self.start_async_round(model_bytes)
+            else:
+                await self.start_sequential_round(model_bytes)
+            try:
+                await asyncio.wait_for(
+                    asyncio.shield(self.learning_complete), ROUND_DEADLINE or None
+                )
+            except asyncio.TimeoutError:
+                await self.close_round()
+                # An aggregation already under way is let finish
+                await self.learning_complete
+        finally:
+            entry = self.log_participation()
+            try:
+                await self.record_round(entry)
+            except Exception as e:
+                # Learning goes on; only the resume point is not moved forward
+                self.log("Error recording round", self.round, e)
+            if self.round_start_hash:
+                self.model_store.release(self.round_start_hash)
+
+    async def round_metrics(self):
+        # The validation of the model the round ended with, validated now if it was not
+        federated = self.validation == VALIDATION_FEDERATED
+        last = self.validation_results[-1] if self.validation_results else {}
+        if last.get("model") == self.current_model_file and bool(last.get("federated")) == federated:
+            return last
+        if federated:
+            result = await self.evaluate_federated()
+            if result:
+                return result
+            self.log("Validating on the coordinator's data instead")
+        return await self.validate(self.current_model_file)
+
+    async def run_rounds(self, monitor=None):
+        # Runs rounds one after another until the monitor stops them, see
+        # data/convergence.py, then marks the job complete
+        monitor = monitor or ConvergenceMonitor()
+        if not self.job_id:
+            await self.start_job()
+        while True:
+            with open(self.current_model_file, "rb") as f:
+                contents = f.read()
+            started = time.monotonic()
+            traffic = self.bytes_sent + self.bytes_received
+            await self.run_round(contents)
+            metrics = await self.round_metrics()
+            stop = monitor.record(
+                self.round,
+                metrics,
+                time.monotonic() - started,
+                self.bytes_sent + self.bytes_received - traffic,
+            )
+            log_json(monitor.rounds[-1], label="Round metrics:")
+            if stop:
+                break
+
+        summary = monitor.summary()
+        log_json(summary, label="Training run:")
+        try:
+            await self.admin_POST(f"/fl-jobs/{self.job_id}/update", {"state": "complete"})
+        except Exception as e:
+            self.log("Error completing FL job", self.job_id, e)
+        return summary
+
+    async def close_round(self):
+        if self.aggregating:
+            # Every update came in: the aggregation under way ends the round
+            return
+        self.log("Round", self.round, "reached its deadline of", ROUND_DEADLINE, "seconds")
+        missing = [
+            connection_id for connection_id in self.round_participants
+            if self.selector.record(connection_id).outstanding
+        ]
+        for connection_id in missing:
+            self.selector.timed_out(connection_id, self.round)
+            # It may not hold the frozen weights: it is sent them again next time
+            self.frozen_pinned.pop(connection_id, None)
+            if self.round_mode == ROUND_MODE_ASYNC and connection_id in self.async_dispatched:
+                # The reference taken when the model was sent moves to the late entry
+                self.expect_late(connection_id, self.async_dispatched.pop(connection_id)[1], acquire=False)
+            elif self.current_model_hash:
+                self.expect_late(connection_id, self.current_model_hash)
+
+        quorum_met = len(self.round_responded) >= self.quorum()
+        if self.round_mode == ROUND_MODE_PARALLEL:
+            if quorum_met:
+                self.log("Aggregating the", len(self.round_updates), "updates received in time")
+                await self.aggregate_round()
+            else:
+                for update_hash, _ in self.round_updates.values():
+                    self.model_store.release(update_hash)
+                self.round_updates = {}
+        elif self.round_mode == ROUND_MODE_ASYNC:
+            # Merges already made stay; no more models are sent
+            self.async_dispatches_left = 0
+        elif not quorum_met:
+            self.restore_model(self.round_start_hash)
+        if not quorum_met:
+            self.log(
+                "Only", len(self.round_responded), "of", len(self.round_participants),
+                "hospitals answered, short of the quorum of", self.quorum(),
+                "- the model is left as it was",
+            )
+        self.finish_round()
+
+    def log_participation(self):
+        entry = {
+            "round": self.round,
+            "mode": self.round_mode,
+            "selected": list(self.round_participants),
+            "responded": [c for c in self.round_participants if c in self.round_responded],
+            "timed_out": [c for c in self.round_participants if c in self.late_updates],
+            "quorum": self.quorum(),
+            "quorum_met": len(self.round_responded) >= self.quorum(),
+            "seconds": round(time.monotonic() - self.round_started, 2),
+            "model_hash": self.current_model_hash,
+        }
+        self.participation_log.append(entry)
+        log_json(entry, label="Round participation:")
+        return entry
+
+    async def start_job(self):
+        job = await self.admin_POST(
+            "/fl-jobs",
+            {
+                "round_mode": self.round_mode,
+                "settings": {
+                    "selection_policy": self.selector.policy,
+                    "participants": self.selector.count or self.selector.fraction,
+                    "round_deadline": ROUND_DEADLINE,
+                    "min_quorum": MIN_QUORUM,
+                    "late_updates": LATE_UPDATES,
+                    "frozen_groups": self.frozen_groups,
+                    **self.server_optimizer.settings(),
+                },
+                "participants": self.trusted_connection_ids,
+            },
+        )
+        self.job_id = job["job_id"]
+        self.job_participants = list(self.trusted_connection_ids)
+        self.server_optimizer.reset()
+        # Hospitals start the job's sessions afresh, without the frozen weights
+        self.frozen_pinned = {}
+        self.log("Started FL job", self.job_id)
+
+    async def record_round(self, entry):
+        if not self.job_id:
+            return
+        aggregated = entry["quorum_met"] and entry["model_hash"]
+        await self.admin_POST(
+            f"/fl-jobs/{self.job_id}/rounds",
+            {
+                "state": "aggregated" if aggregated else "no_quorum",
+                "round_number": entry["round"],
+                "base_sha256": self.round_start_hash,
+                "model_sha256": entry["model_hash"],
+                "selected": entry["selected"],
+                "responded": entry["responded"],
+                "timed_out": entry["timed_out"],
+                "metrics": self.validation_results[-1] if self.validation_results else {},
+                "seconds": entry["seconds"],
+            },
+        )
+        if self.trusted_connection_ids != self.job_participants:
+            await self.admin_POST(
+                f"/fl-jobs/{self.job_id}/update", {"participants": self.trusted_connection_ids}
+            )
+            self.job_participants = list(self.trusted_connection_ids)
+        if aggregated:
+            # The agent keeps the aggregate by hash: a restart resumes from here
+            await self.admin_POST_binary(
+                f"/fl-jobs/{self.job_id}/checkpoint",
+                self.model_store.get(self.current_model_hash),
+                params={"round": str(self.round)},
+            )
+            if self.server_optimizer.enabled:
+                # Its moments go with the checkpoint: a resumed job carries on with them
+                self.server_optimizer.save(self.server_optimizer_path(), self.current_model_hash)
+            self.log("Checkpointed round", self.round, "of FL job", self.job_id)
+
+    def server_optimizer_path(self):
+        return os.path.join(self.model_store.root, "server-optimizer-" + self.job_id + ".pt")
 
-        if message["connection_id"] == self.trusted_connection_ids[self.current_learner_index]:
+    async def resume_job(self, job_id=None):
+        if job_id:
+            job = await self.admin_GET(f"/fl-jobs/{job_id}")
+        else:
+            jobs = (await self.admin_GET("/fl-jobs", params={"state": "active"}))["results"]
+            if not jobs:
+                self.log("No active FL job to resume")
+                return False
+            job = max(jobs, key=lambda job: job["updated_at"])
+        if not job.get("model_sha256"):
+            self.log("FL job", job["job_id"], "has no checkpoint to resume from")
+            return False
+
+        model = await self.fetch_model(job["model_sha256"])
+        self.job_id = job["job_id"]
+        self.round = job.get("current_round") or 0
+        self.round_mode = job.get("round_mode") or self.round_mode
+        settings = job.get("settings") or {}
+        self.frozen_groups = settings.get("frozen_groups", self.frozen_groups)
+        if "server_optimizer" in settings:
+            self.server_optimizer = ServerOptimizer.from_settings(settings)
+        self.server_optimizer.restore(self.server_optimizer_path(), job["model_sha256"])
+        # Nothing sent before the restart is known to be held: full models go first
+        self.frozen_pinned = {}
+        self.set_current_model(model)
+        # Connections live in the same wallet; they were proven before the restart
+        for connection_id in job.get("participants") or []:
+            if connection_id not in self.trusted_connection_ids:
+                self.trusted_connection_ids.append(connection_id)
+                self.trusted_hospitals.append({"connection_id": connection_id})
+        self.job_participants = list(self.trusted_connection_ids)
+        self.log(
+            "Resumed FL job", self.job_id, "after round", self.round, "with",
+            len(self.trusted_connection_ids), "hospitals, in", self.round_mode, "mode",
+        )
+        return True
+
+    def update_base_file(self, connection_id):
+        # In async rounds the global model may have moved on since this hospital's
+        # model was sent; other modes wait, so the current model is the base
+        if self.round_mode == ROUND_MODE_ASYNC and connection_id in self.async_dispatched:
+            return self.model_store.path(self.async_dispatched[connection_id][1])
+        return self.current_model_file
+
+    async def receive_update(self, connection_id, model, content, mime_type=None):
+        self.bytes_received += len(model)
+        if connection_id in self.late_updates:
+            await self.handle_late_update(connection_id, model, mime_type)
+            return
+        codec = codec_from_mime_type(mime_type)
+        if codec:
+            # Updates are encoded against the model this coordinator sent out
+            try:
+                if self.round_mode == ROUND_MODE_PARALLEL and is_sparse(codec):
+                    # Kept as sent: aggregation merges it into the average directly
+                    parse_update(model, model_format.load_state(self.current_model_file)[1])
+                else:
+                    model = decode_model_bytes(model, self.update_base_file(connection_id))
+            except Exception as e:
+                self.log("Error decoding", codec, "update from", connection_id, e)
+                self.selector.failed(connection_id)
+                return
+        try:
+            num_samples = json.loads(content or "{}").get("num_samples")
+        except ValueError:
+            num_samples = None
+        if self.selector.completed(connection_id, num_samples):
+            self.round_responded.add(connection_id)
+        if self.round_mode == ROUND_MODE_PARALLEL:
+            await self.handle_parallel_update(connection_id, model, content)
+        elif self.round_mode == ROUND_MODE_ASYNC:
+            await self.handle_async_update(connection_id, model)
+        else:
+            await self.handle_sequential_update(connection_id, model)
+
+    async def handle_parallel_update(self, connection_id, model, content):
+        if connection_id not in self.round_participants:
+            self.log("Ignoring message from connection outside the current round:", connection_id)
+            return
+        if connection_id in self.round_updates:
+            self.log("Already received an update this round from", connection_id)
+            return
+
+        try:
+            metadata = json.loads(content or "{}")
+            update_hash = self.model_store.put(
+                model,
+                round=self.round,
+                parent=self.current_model_hash,
+                connection_id=connection_id,
+                ref=True,
+            )
+        except Exception as e:
+            self.log("Error storing update", e)
+            return
+
+        self.round_updates[connection_id] = (update_hash, metadata.get("num_samples") or 1)
+        self.log(
+            "Received update", len(self.round_updates), "of", len(self.round_participants),
+            "from", connection_id
+        )
+
+        if len(self.round_updates) == len(self.round_participants):
+            self.log("All updates received, aggregating")
+            await self.aggregate_round()
+            self.finish_round()
+
+    async def aggregate_round(self):
+        update_hashes, sample_counts = zip(*self.round_updates.values())
+        # Taken now, so updates arriving meanwhile wait for the next round
+        self.round_updates = {}
+        model_files = [self.model_store.path(update_hash) for update_hash in update_hashes]
+        aggregate_file = self.model_store.scratch_path()
+        self.aggregating = True
+        try:
+            await federated_average(
+                model_files, sample_counts, aggregate_file, self.frozen_groups, self.current_model_file
+            )
+            if self.server_optimizer.enabled:
+                # The average's change from the global model is the server's pseudo-gradient
+                self.server_optimizer.apply(
+                    self.current_model_file, aggregate_file, aggregate_file, self.frozen_groups
+                )
+            with open(aggregate_file, "rb") as f:
+                self.set_current_model(f.read())
+            await self.validate(self.current_model_file)
+        except Exception as e:
+            self.log("Error aggregating models", e)
+        finally:
+            self.aggregating = False
+            if os.path.exists(aggregate_file):
+                os.remove(aggregate_file)
+            for update_hash in update_hashes:
+                self.model_store.release(update_hash)
+
+    async def handle_sequential_update(self, connection_id, model):
+        if connection_id == self.round_participants[self.current_learner_index]:
             self.current_learner_index += 1
 
-            if self.current_learner_index != len(self.trusted_connection_ids):
+            if self.current_learner_index != len(self.round_participants):
                 self.log("Still learning")
-                self.current_model_file = cwd + "/model/part_trained_" + str(self.current_learner_index) + ".pt"
                 try:
-                    f = open(self.current_model_file, "wb+")
-                    byte_message = bytes.fromhex(message["content"])
-                    f.write(byte_message)
-                    f.close()
+                    self.set_current_model(model, connection_id)
                 except Exception as e:
-                    self.log("Error writing file", e)
+                    self.log("Error storing model", e)
                     return
                 # msg = await prompt("Continue Learning? Y/N ")
-                next_learner_connection_id = self.trusted_connection_ids[self.current_learner_index]
+                next_learner_connection_id = self.round_participants[self.current_learner_index]
                 self.log("Continue Learning", next_learner_connection_id)
-                await validate_model(self.current_model_file)
-                await self.admin_POST(
-                    f"/connections/{next_learner_connection_id}/send-message",
-                    {"content": message["content"]}
-                )
+                await self.validate(self.current_model_file)
+                if self.learning_complete.done():
+                    # The round's deadline passed while this update was validated
+                    return
+                await self.send_model(next_learner_connection_id, model)
             else:
                 self.log("Learning complete")
-                self.current_model_file = cwd + "/model/trained_model.pt"
                 try:
-                    f = open(self.current_model_file, "wb+")
-                    # self.log(bytes.fromhex(message["content"]))
-                    byte_message = bytes.fromhex(message["content"])
-
-                    f.write(byte_message)
-                    f.close()
-                    await validate_model(self.current_model_file)
+                    self.set_current_model(model, connection_id)
+                    await self.validate(self.current_model_file)
                 except Exception as e:
-                    self.log("Error writing file", e)
+                    self.log("Error storing model", e)
                     return
-                self.learning_complete.set_result(True)
+                self.finish_round()
 
         else:
-            self.log("Expecting Message from the current learner hospital:", self.trusted_connection_ids[self.current_learner_index])
-            self.log("Received message:", message["content"], message["connection_id"])
+            self.log("Expecting Message from the current learner hospital:", self.round_participants[self.current_learner_index])
+            self.log("Received message from:", connection_id)
 
 
 
@@ -291,7 +1049,17 @@ async def generate_new_connection(agent):
     await agent.detect_connection()
 
 
-async def main(start_port: int, show_timing: bool = False):
+async def main(
+    start_port: int,
+    show_timing: bool = False,
+    round_mode: str = ROUND_MODE_SEQUENTIAL,
+    selection_policy: str = DEFAULT_POLICY,
+    participants: str = DEFAULT_PARTICIPANTS,
+    resume: str = None,
+    frozen_groups: str = FROZEN_GROUPS,
+    server_optimizer: str = DEFAULT_SERVER_OPTIMIZER,
+    validation: str = DEFAULT_VALIDATION,
+):
 
     genesis = await default_genesis_txns()
     if not genesis:
@@ -303,7 +1071,18 @@ async def main(start_port: int, show_timing: bool = False):
     try:
         log_status("#1 Provision an agent and wallet, get back configuration details")
         agent = CoordinatorAgent(
-            start_port, start_port + 1, genesis_data=genesis, timing=show_timing
+            start_port,
+            start_port + 1,
+            round_mode=round_mode,
+            selector=ParticipantSelector(selection_policy, participants),
+            frozen_groups=frozen_groups,
+            server_optimizer=ServerOptimizer(server_optimizer),
+            validation=validation,
+            # A fixed wallet keeps FL job records across restarts, see resume_job
+            wallet_name=os.getenv("FL_WALLET_NAME"),
+            wallet_key=os.getenv("FL_WALLET_KEY"),
+            genesis_data=genesis,
+            timing=show_timing,
         )
         await agent.listen_webhooks(start_port + 2)
 
@@ -312,6 +1091,9 @@ async def main(start_port: int, show_timing: bool = False):
         log_msg("Admin url is at:", agent.admin_url)
         log_msg("Endpoint url is at:", agent.endpoint)
 
+        if resume:
+            await agent.resume_job(None if resume == "latest" else resume)
+
         with log_timer("Generate invitation duration:"):
             # Generate an invitation
             log_status(
@@ -336,7 +1118,11 @@ async def main(start_port: int, show_timing: bool = False):
             + "(4) List trusted connections \n"
             + "(5) Initiate Learning \n"
             + "(6) Reset trusted connections \n"
-            + "(X) Exit? \n[1/2/3/4/5/6/X] "
+            + "(7) Request proof of Certified Researcher (regional aggregator) \n"
+            + "(8) Resume FL job \n"
+            + "(9) Learn until convergence \n"
+            + "(E) Evaluate the model on the hospitals' data \n"
+            + "(X) Exit? \n[1/2/3/4/5/6/7/8/9/E/X] "
         ):
             if option is None or option in "xX":
                 break
@@ -401,39 +1187,86 @@ async def main(start_port: int, show_timing: bool = False):
                 # handle new invitation
                 log_status("List of Trusted Connections")
                 log_msg(agent.trusted_connection_ids)
+                for stats in agent.selector.summary(agent.trusted_connection_ids):
+                    log_msg(stats)
                 # log_msg(agent.trusted_hospitals)
-            elif option == "5":
+            elif option in ("5", "9"):
                 # handle new invitation
                 log_status("Initiate Learning")
                 # TODO Need to get the updated file somehow
                 # Some sort of await until coordinator recieved message back
 
                 successfully_generated = await generate_model()
-                successfully_validated = await validate_model(agent.current_model_file)
+                if successfully_generated and not agent.current_model_hash:
+                    # Later rounds carry on from the current model in the store
+                    with open(agent.current_model_file, "rb") as f:
+                        agent.set_current_model(f.read())
+                successfully_validated = await agent.validate(agent.current_model_file)
 
 
 
                 # f = open(agent.current_model_file, "rb")
-                if successfully_generated:
+                if not agent.trusted_connection_ids:
+                    log_msg("NO TRUSTED HOSPITALS TO LEARN FROM")
+                elif not successfully_generated:
+                    log_msg("THERE  WAS A PROBLEM WITH THE MODEL CREATION")
+                elif option == "9":
+                    # Rounds go on until the validation metric stops improving
+                    # or a budget runs out, see data/convergence.py
+                    await agent.run_rounds()
+                else:
                     log_msg("MODEL CREATED AND SAVED SUCCESSFULLY")
                     f = open(agent.current_model_file, "rb")
                     log_msg("MODEL OPENED FOR TRANSPORT")
 
                     contents = f.read()
                     f.close()
-                    await agent.admin_POST(
-                        f"/connections/{agent.trusted_connection_ids[0]}/send-message",
-                        {"content": contents.hex()}
-                    )
-                    await agent.learning_complete
-                else:
-                    log_msg("THERE  WAS A PROBLEM WITH THE MODEL CREATION")
+                    if not agent.job_id:
+                        await agent.start_job()
+                    await agent.run_round(contents)
 
             elif option == "6":
                 # handle new invitation
                 log_status("Reset trusted connection list")
                 agent.trusted_connection_ids = []
                 agent.trusted_hospitals = []
+            elif option == "7":
+                # An aggregator takes part like a hospital, sending its region's average
+                log_status("#20 Request proof of Research Certification from aggregator")
+                req_attrs = [
+                    {"name": "date", "restrictions": [{"issuer_did": agent.regulator_did}]},
+                    {"name": "institution", "restrictions": [{"issuer_did": agent.regulator_did}]},
+                ]
+                indy_proof_request = {
+                    "name": "Proof of Verified Research Institution",
+                    "version": "1.0",
+                    "nonce": str(uuid4().int),
+                    "requested_attributes": {
+                        f"0_{req_attr['name']}_uuid": req_attr for req_attr in req_attrs
+                    },
+                    "requested_predicates": {
+                    },
+                }
+                print("Asking for this proof: ", indy_proof_request)
+                proof_request_web_request = {
+                    "connection_id": agent.active_connection_id,
+                    "proof_request": indy_proof_request,
+                }
+                await agent.admin_POST(
+                    "/present-proof/send-request", proof_request_web_request
+                )
+            elif option == "8":
+                log_status("Resume FL job from its last checkpoint")
+                job_id = await prompt("FL job id (blank for the latest): ")
+                await agent.resume_job(job_id.strip() or None)
+            elif option in "eE":
+                # Hospitals score the current model on their holdouts and send
+                # back counts only, see data/federated_evaluation.py
+                log_status("Evaluate the current model on the hospitals' data")
+                if not agent.current_model_hash:
+                    log_msg("NO MODEL TO EVALUATE YET")
+                else:
+                    await agent.evaluate_federated()
 
 
 
@@ -511,11 +1344,78 @@ if __name__ == "__main__":
     parser.add_argument(
         "--timing", action="store_true", help="Enable timing information"
     )
+    parser.add_argument(
+        "--round-mode",
+        choices=ROUND_MODES,
+        default=ROUND_MODE_SEQUENTIAL,
+        help="Send the model to hospitals one after another (sequential), "
+        "to all of them at once and average the updates (parallel), "
+        "or merge each update as it arrives and send the hospital the new model (async)",
+    )
+    parser.add_argument(
+        "--selection-policy",
+        choices=POLICIES,
+        default=DEFAULT_POLICY,
+        help="Sample each round's hospitals uniformly (random), in proportion from "
+        "groups of similar dataset size (stratified), or favouring those that answer "
+        "reliably and quickly (availability)",
+    )
+    parser.add_argument(
+        "--participants",
+        default=DEFAULT_PARTICIPANTS,
+        help="Hospitals that train each round: a fraction of the trusted hospitals "
+        "(e.g. 0.1) or a number of them (e.g. 20)",
+    )
+    parser.add_argument(
+        "--resume",
+        nargs="?",
+        const="latest",
+        metavar="<job_id>",
+        help="Resume an FL job from its last checkpointed aggregation: the given "
+        "job, or the latest active one. Needs FL_WALLET_NAME and FL_WALLET_KEY "
+        "to be the same as when the job ran",
+    )
+    parser.add_argument(
+        "--frozen-groups",
+        default=FROZEN_GROUPS,
+        metavar="<groups>",
+        help="Parameter groups the hospitals do not train, as comma-separated "
+        "prefixes of the parameter names (e.g. 0,2 for the first and third "
+        "layers); after the first round only the trainable tensors are exchanged",
+    )
+    parser.add_argument(
+        "--server-optimizer",
+        choices=SERVER_OPTIMIZERS,
+        default=DEFAULT_SERVER_OPTIMIZER,
+        help="How parallel rounds apply the hospitals' average: as the new model "
+        "(none), or as a pseudo-gradient through server momentum (fedavgm), "
+        "Adam (fedadam) or Yogi (fedyogi)",
+    )
+    parser.add_argument(
+        "--validation",
+        choices=VALIDATION_MODES,
+        default=DEFAULT_VALIDATION,
+        help="Take round metrics from the coordinator's validation set (local), or "
+        "from the hospitals, which score the model on their holdout data and send "
+        "back only counts (federated)",
+    )
     args = parser.parse_args()
 
     require_indy()
 
     try:
-        asyncio.get_event_loop().run_until_complete(main(args.port, args.timing))
+        asyncio.get_event_loop().run_until_complete(
+            main(
+                args.port,
+                args.timing,
+                args.round_mode,
+                args.selection_policy,
+                args.participants,
+                args.resume,
+                args.frozen_groups,
+                args.server_optimizer,
+                args.validation,
+            )
+        )
     except KeyboardInterrupt:
         os._exit(1)
@@ -6,7 +6,13 @@ import logging
 import os
 import sys
 import torch
-from data.hospital_learn import hospital_learn
+from data.federated_evaluation import evaluate_model_bytes
+from data.model_format import NEED_FULL_MODEL, needs_full_model
+from data.model_session import train_session
+from data.model_store import ModelStore
+from data.trainer import TrainingConfig
+from data.training_executor import TrainingExecutor
+from data.update_codec import DEFAULT_CODEC, update_mime_type
 
 from urllib.parse import urlparse
 from uuid import uuid4
@@ -29,10 +35,23 @@ from runners.support.utils import (
 LOGGER = logging.getLogger(__name__)
 
 HOSPITAL_NAME = os.getenv("HOSPITAL_NAME")
+# How trained models are encoded for the coordinator, see data/update_codec.py
+UPDATE_CODEC = os.getenv("FL_UPDATE_CODEC", DEFAULT_CODEC)
+# How many models may train at once, each in its own worker process
+MAX_TRAINING_JOBS = int(os.getenv("FL_MAX_TRAINING_JOBS", "1"))
+# Processes each job trains on, sharing the data out, see data/distributed_trainer.py;
+# 0 is one per core, with a single process for small datasets
+TRAINING_WORKERS = int(os.getenv("FL_WORKERS", "0"))
 
 
 class Hospital1Agent(DemoAgent):
-    def __init__(self, http_port: int, admin_port: int, **kwargs):
+    def __init__(
+        self,
+        http_port: int,
+        admin_port: int,
+        training_workers: int = TRAINING_WORKERS,
+        **kwargs
+    ):
         super().__init__(
             HOSPITAL_NAME + " Agent",
             http_port,
@@ -52,6 +71,10 @@ class Hospital1Agent(DemoAgent):
         self._connection_ready = asyncio.Future()
         self.cred_state = {}
         self.trusted_researcher_connection_ids = []
+        self.trainer = TrainingExecutor(MAX_TRAINING_JOBS)
+        self.training_config = TrainingConfig.from_env(workers=training_workers)
+        # Received and trained models are kept by hash, see data/model_store.py
+        self.model_store = ModelStore()
 
     async def detect_connection(self):
         await self._connection_ready
@@ -202,45 +225,159 @@ class Hospital1Agent(DemoAgent):
 
 
     async def handle_basicmessages(self, message):
-        self.log(message)
-        # self.log("Received message:", message["content"])
-
-        if message["connection_id"] in self.trusted_researcher_connection_ids:
-            self.log("Research is trusted", message["connection_id"])
-            cwd = os.getcwd()
-            self.log("Open file")
+        self.log("Received message:", message["content"])
+
+    async def handle_federatedlearningmessages(self, message):
+        self.log("Received federated learning message:", message["content"])
+        if "model" in message:
+            self.start_learning(
+                message["connection_id"],
+                base64.b64decode(message["model"]),
+                message["content"],
+            )
+        elif message.get("model_sha256") and message["state"] == "received":
+            # the agent has downloaded the linked model and checked its hash
+            model = await self.fetch_model(message["model_sha256"])
+            self.start_learning(message["connection_id"], model, message["content"])
+
+    async def handle_fl_model_transfer(self, transfer):
+        if transfer["role"] == "receiver" and transfer["state"] == "received":
+            self.log("Received model", transfer["sha256"], "in chunks")
+            model = await self.fetch_model(transfer["sha256"])
+            self.start_learning(transfer["connection_id"], model, transfer.get("content"))
+
+    async def fetch_model(self, model_hash):
+        # A model this hospital already holds is not copied from the agent again
+        if self.model_store.has(model_hash):
+            return self.model_store.get(model_hash)
+        return await self.admin_GET_binary(f"/fl-models/{model_hash}")
+
+    async def handle_fl_evaluation_requests(self, request):
+        # Scoring takes a while on a large holdout: the webhook is answered meanwhile
+        asyncio.ensure_future(self.evaluate(request))
+
+    async def evaluate(self, request):
+        # Only counts go back, see data/federated_evaluation.py; the holdout rows
+        # never go into training
+        connection_id = request["connection_id"]
+        if connection_id not in self.trusted_researcher_connection_ids:
+            self.log("Untrusted Researcher - Must first authenticate as being certified by Regulator")
+            return
+        result = {"thread_id": request["thread_id"], "model_sha256": request["model_sha256"]}
+        try:
+            if request["state"] != "received":
+                raise ValueError("model could not be fetched")
             try:
-                f = open(cwd + "/model/untrained_model.pt", "wb+")
-                # self.log(bytes.fromhex(message["content"]))
-                byte_message = bytes.fromhex(message["content"])
-                f.write(byte_message)
-                f.close()
+                vocabulary = json.loads(request.get("content") or "{}").get("vocabulary")
+            except (ValueError, AttributeError):
+                vocabulary = None
+            model = await self.fetch_model(request["model_sha256"])
+            job = self.trainer.submit(
+                evaluate_model_bytes, model, vocabulary=vocabulary, affinity=connection_id
+            )
+            result["metrics"] = await job
+            self.log(
+                "Evaluated model", request["model_sha256"][:12], "on",
+                result["metrics"]["samples"], "holdout samples",
+            )
+        except Exception as e:
+            self.log("Error evaluating model", request["model_sha256"], e)
+            result["error"] = str(e) or type(e).__name__
+        await self.admin_POST(f"/connections/{connection_id}/send-fl-evaluation-result", result)
+
+    def start_learning(self, connection_id, model, content=None):
+        # Training takes a while: run it in the background so that this webhook,
+        # and the proofs and credentials that follow, are answered meanwhile
+        asyncio.ensure_future(self.learn(connection_id, model, content))
 
+    def log_training_progress(self, job, update):
+        self.log(
+            "Training job",
+            job.job_id,
+            ": epoch",
+            update["epoch"],
+            "/",
+            update["epochs"],
+            ", loss",
+            round(update["loss"], 6),
+            ",",
+            round(update["samples_per_sec"]),
+            "samples/s",
+        )
+
+    async def request_full_model(self, connection_id, fl_round=None):
+        # The worker lost the frozen weights a partial model pins, e.g. it was
+        # restarted: the coordinator sends the whole model rather than waiting
+        # for the round's deadline
+        self.log("Asking for the full model of round", fl_round)
+        await self.admin_POST(
+            f"/connections/{connection_id}/send-fl-message",
+            {"content": json.dumps({"error": NEED_FULL_MODEL, "round": fl_round})},
+        )
+
+    async def learn(self, connection_id, model, content=None):
+        if connection_id in self.trusted_researcher_connection_ids:
+            self.log("Research is trusted", connection_id)
+            try:
+                metadata = json.loads(content or "{}")
+                fl_round = metadata.get("round")
+                # Coordinators may fix the encoders, see data/preprocessing.py
+                vocabulary = metadata.get("vocabulary")
+                # Optimizer state carries on through the rounds of one job
+                job_id = metadata.get("job")
+            except (ValueError, AttributeError):
+                fl_round = vocabulary = job_id = None
+            try:
+                # Held while the round trains, so it cannot be evicted meanwhile
+                model_hash = self.model_store.put(
+                    model, round=fl_round, connection_id=connection_id, ref=True
+                )
             except Exception as e:
-                self.log("Error writing file", e)
+                self.log("Error storing model", e)
                 return
 
-            self.log("Import file")
             self.log("learning")
 
-            learnt = await hospital_learn()
-            self.log("Learnt : ", learnt)
-
-            trained_model = None
+            # The model trains in the worker's memory: jobs for this connection
+            # go to the same worker, which keeps its live model between rounds
+            job = self.trainer.submit(
+                train_session,
+                connection_id,
+                model,
+                UPDATE_CODEC,
+                config=self.training_config,
+                vocabulary=vocabulary,
+                job_id=job_id,
+                affinity=connection_id,
+                on_progress=self.log_training_progress,
+            )
+            self.log("Training job", job.job_id, "submitted")
             try:
-                trained_file = open(cwd + "/model/trained_model.pt", "rb")
-                self.log("Trained file open")
-                trained_model = trained_file.read()
-                trained_file.close()
-            except:
-                self.log("Unable to open trained model")
-
-            connection_id = message["connection_id"]
-
-            log_msg("Connection ID", message["connection_id"])
-            if trained_model:
-                await self.admin_POST(
-                    f"/connections/{connection_id}/send-message", {"content": trained_model.hex()}
+                # The update is the change from the model received this round
+                learnt, trained_model = await job
+                self.log("Learnt : ", learnt)
+            except asyncio.CancelledError:
+                self.log("Training job", job.job_id, "cancelled")
+                return
+            except Exception as e:
+                self.log("Training job", job.job_id, "failed", e)
+                if needs_full_model(e):
+                    await self.request_full_model(connection_id, fl_round)
+                return
+            finally:
+                self.model_store.release(model_hash)
+
+            log_msg("Connection ID", connection_id)
+            if learnt and trained_model:
+                # Report the sample count so the coordinator can weight the update;
+                # the agent sends the model in resumable chunks
+                await self.admin_POST_binary(
+                    f"/connections/{connection_id}/send-fl-model",
+                    trained_model,
+                    params={
+                        "content": json.dumps({"num_samples": learnt}),
+                        "mime_type": update_mime_type(UPDATE_CODEC),
+                    },
                 )
         else:
             self.log("Untrusted Researcher - Must first authenticate as being certified by Regulator")
@@ -286,7 +423,9 @@ async def input_invitation(agent):
         await agent.detect_connection()
 
 
-async def main(start_port: int, show_timing: bool = False):
+async def main(
+    start_port: int, show_timing: bool = False, training_workers: int = TRAINING_WORKERS
+):
 
     genesis = await default_genesis_txns()
     if not genesis:
@@ -298,7 +437,11 @@ async def main(start_port: int, show_timing: bool = False):
     try:
         log_status("#7 Provision an agent and wallet, get back configuration details")
         agent = Hospital1Agent(
-            start_port, start_port + 1, genesis_data=genesis, timing=show_timing
+            start_port,
+            start_port + 1,
+            training_workers=training_workers,
+            genesis_data=genesis,
+            timing=show_timing,
         )
         await agent.listen_webhooks(start_port + 2)
 
@@ -314,8 +457,9 @@ async def main(start_port: int, show_timing: bool = False):
             "(1) Request Proof of Certified Researcher \n" +
             "(2) Input New Invitation \n" +
             "(3) List trusted researcher connections \n" +
+            "(4) Cancel training \n" +
             "(X) Exit? \n" +
-            "[1/2/3/X]: "
+            "[1/2/3/4/X]: "
         ):
             if option is None or option in "xX":
                 break
@@ -351,6 +495,18 @@ async def main(start_port: int, show_timing: bool = False):
             elif option == "3":
                 log_status("Trusted Research Connections")
                 log_msg(agent.trusted_researcher_connection_ids)
+            elif option == "4":
+                jobs = agent.trainer.active_jobs()
+                if not jobs:
+                    log_msg("No training in progress")
+                for job in jobs:
+                    log_msg("Job", job.job_id, job.state, job.progress or "")
+                if jobs:
+                    job_id = await prompt("Job to cancel (empty for all): ")
+                    if job_id:
+                        agent.trainer.cancel(job_id.strip())
+                    else:
+                        agent.trainer.shutdown()
 
         if show_timing:
             timing = await agent.fetch_timing()
@@ -362,6 +518,7 @@ async def main(start_port: int, show_timing: bool = False):
         terminated = True
         try:
             if agent:
+                agent.trainer.shutdown()
                 await agent.terminate()
         except Exception:
             LOGGER.exception("Error terminating agent:")
@@ -388,11 +545,21 @@ if __name__ == "__main__":
     parser.add_argument(
         "--timing", action="store_true", help="Enable timing information"
     )
+    parser.add_argument(
+        "--training-workers",
+        type=int,
+        default=TRAINING_WORKERS,
+        metavar=("<workers>"),
+        help="Train each model on this many processes, sharing the data out "
+        "(0 for one per core; small datasets train in one process)",
+    )
     args = parser.parse_args()
 
     require_indy()
 
     try:
-        asyncio.get_event_loop().run_until_complete(main(args.port, args.timing))
+        asyncio.get_event_loop().run_until_complete(
+            main(args.port, args.timing, args.training_workers)
+        )
     except KeyboardInterrupt:
         os._exit(1)
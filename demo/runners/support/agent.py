@@ -329,10 +329,19 @@ class DemoAgent:
                     f"to handle webhook on topic {topic}"
                 )
 
-    async def admin_request(self, method, path, data=None, text=False, params=None):
+    async def admin_request(
+        self, method, path, data=None, text=False, params=None, binary=None
+    ):
         params = {k: v for (k, v) in (params or {}).items() if v is not None}
+        if binary is not None:
+            body = {
+                "data": binary,
+                "headers": {"Content-Type": "application/octet-stream"},
+            }
+        else:
+            body = {"json": data}
         async with self.client_session.request(
-            method, self.admin_url + path, json=data, params=params
+            method, self.admin_url + path, params=params, **body
         ) as resp:
             if resp.status < 200 or resp.status > 299:
                 raise Exception(f"Unexpected HTTP response: {resp.status}")
@@ -352,6 +361,17 @@ class DemoAgent:
     async def admin_POST(self, path, data=None, text=False, params=None):
         return await self.admin_request("POST", path, data, text, params)
 
+    async def admin_POST_binary(self, path, binary, text=False, params=None):
+        return await self.admin_request("POST", path, None, text, params, binary)
+
+    async def admin_GET_binary(self, path, params=None):
+        async with self.client_session.get(
+            self.admin_url + path, params=params
+        ) as resp:
+            if resp.status < 200 or resp.status > 299:
+                raise Exception(f"Unexpected HTTP response: {resp.status}")
+            return await resp.read()
+
     async def detect_process(self):
         text = None
         self.log("Detect Process")